@@ -0,0 +1,100 @@
+'''
+Fleet-wide command throughput against simulated SwitchBots
+
+Runs run_batch over thousands of SwitchBots served by the in-process simulated
+transport, through a connection capped SwitchBotPool, and reports throughput and
+per-device latency percentiles. Link latencies are configurable to approximate a
+real adapter.
+
+    $ python benchmarks/fleet_throughput.py --bots 2000 --max-connections 8 --response-latency 0.05
+'''
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from typing import Dict, List
+
+from switchbot_api import SwitchBotPool, VirtualSwitchBot, run_batch
+from switchbot_api.bot_types import SwitchBotAction
+from switchbot_api.simulation import SimulatedSwitchBot, SimulatedTransport
+from switchbot_api.switchbot_batch import SwitchBotBatchResult
+
+
+def random_mac(rng: random.Random) -> str:
+    return ":".join(f"{rng.randrange(256):02X}" for _ in range(6))
+
+
+def make_transport(args: argparse.Namespace) -> SimulatedTransport:
+    rng = random.Random(0)
+    transport = SimulatedTransport(
+        connect_latency_s=args.connect_latency,
+        write_response_latency_s=args.write_latency,
+    )
+    while len(transport.bots) < args.bots:
+        transport.add_bot(
+            SimulatedSwitchBot(
+                random_mac(rng),
+                password_str=args.password,
+                response_latency_s=args.response_latency,
+                busy_probability=args.busy_probability,
+                rng=random.Random(len(transport.bots)),
+            )
+        )
+    return transport
+
+
+def report(name: str, results: Dict[str, SwitchBotBatchResult], elapsed_s: float):
+    latencies = sorted(result.latency_s for result in results.values())
+    failures = sum(1 for result in results.values() if not result.success)
+
+    def percentile(p: float) -> float:
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    print(
+        f"{name:<8} {len(results) / elapsed_s:10.1f} bots/s  failures={failures:<5d} "
+        f"mean={statistics.mean(latencies) * 1000:9.3f} ms  p50={percentile(0.50):9.3f} ms  "
+        f"p95={percentile(0.95):9.3f} ms  p99={percentile(0.99):9.3f} ms"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bots", type=int, default=2000, help="Simulated SwitchBots in the fleet")
+    parser.add_argument("--max-connections", type=int, default=8, help="Pool connection cap (and batch concurrency)")
+    parser.add_argument("--connect-latency", type=float, default=0.0, help="Seconds to establish a connection")
+    parser.add_argument("--write-latency", type=float, default=0.0, help="Seconds for an ATT write response")
+    parser.add_argument("--response-latency", type=float, default=0.0, help="Seconds until the notification")
+    parser.add_argument("--busy-probability", type=float, default=0.0, help="Probability of a BUSY response")
+    parser.add_argument("--password", type=str, default=None, help="Password of every simulated SwitchBot")
+    parser.add_argument(
+        "--write-without-response", action="store_true", help="Rely on the notification alone (no ATT write response)"
+    )
+    args = parser.parse_args()
+
+    transport = make_transport(args)
+    addresses: List[str] = list(transport.bots)
+
+    pool = SwitchBotPool(
+        max_connections=args.max_connections,
+        bot_factory=lambda mac: VirtualSwitchBot(
+            mac,
+            password_str=args.password,
+            transport=transport,
+            write_with_response=not args.write_without_response,
+        ),
+    )
+
+    print(f"{args.bots} simulated SwitchBots, {args.max_connections} connections")
+    for name, action in (("ON", SwitchBotAction.ON), ("OFF", SwitchBotAction.OFF)):
+        start = time.perf_counter()
+        results = await run_batch(addresses, action, max_concurrency=args.max_connections, pool=pool)
+        elapsed_s = time.perf_counter() - start
+        report(name, results, elapsed_s)
+
+    await pool.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,233 @@
+'''
+Minimal micro-benchmark harness shared by the benchmark scripts
+
+Each case is a zero-argument callable (or coroutine function) run repeatedly. The harness
+reports operations per second (best of several rounds, to filter scheduler noise) and
+allocations per operation measured with tracemalloc, stores results as a JSON baseline and
+flags regressions against it.
+'''
+
+import argparse
+import asyncio
+import contextlib
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+# Relative slowdown (or allocation growth) reported as a regression
+DEFAULT_THRESHOLD = 0.25
+
+# Timed batches are grown until they last at least this long
+MIN_BATCH_S = 0.2
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    ops_per_s: float
+    # Peak memory allocated while running one operation (temporaries included)
+    peak_alloc_bytes_per_op: float
+    # Memory still allocated after the operations, divided by the operation count (leaks, caches)
+    retained_bytes_per_op: float
+
+
+@dataclass
+class Benchmark:
+    name: str
+    func: Callable[[], Any]
+    # Operations per timed batch, grown until the batch lasts MIN_BATCH_S
+    number: int = 1000
+    is_async: bool = False
+
+
+class BenchmarkSuite:
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._benchmarks: List[Benchmark] = []
+
+    def add(self, name: str, number: int = 1000) -> Callable[[Callable[[], Any]], Callable[[], Any]]:
+        """
+        Decorator registering a benchmark case
+        """
+        def register(func: Callable[[], Any]) -> Callable[[], Any]:
+            self._benchmarks.append(Benchmark(name, func, number, asyncio.iscoroutinefunction(func)))
+            return func
+
+        return register
+
+    def _time_batch(self, benchmark: Benchmark, loop: asyncio.AbstractEventLoop, number: int) -> float:
+        func = benchmark.func
+        if benchmark.is_async:
+            async def batch():
+                for _ in range(number):
+                    await func()
+
+            start = time.perf_counter()
+            loop.run_until_complete(batch())
+            return time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        return time.perf_counter() - start
+
+    def _autorange(self, benchmark: Benchmark, loop: asyncio.AbstractEventLoop) -> int:
+        number = benchmark.number
+        while self._time_batch(benchmark, loop, number) < MIN_BATCH_S:
+            number *= 2
+        return number
+
+    def _measure_allocations(self, benchmark: Benchmark, loop: asyncio.AbstractEventLoop, number: int):
+        func = benchmark.func
+
+        def run_once():
+            if benchmark.is_async:
+                loop.run_until_complete(func())
+            else:
+                func()
+
+        # Warm up caches so only steady state allocations are counted
+        run_once()
+        gc.collect()
+
+        tracemalloc.start()
+        try:
+            before, _ = tracemalloc.get_traced_memory()
+            peak_total = 0
+            for _ in range(number):
+                if hasattr(tracemalloc, "reset_peak"):
+                    tracemalloc.reset_peak()
+                start, _ = tracemalloc.get_traced_memory()
+                run_once()
+                _, peak = tracemalloc.get_traced_memory()
+                peak_total += peak - start
+            gc.collect()
+            after, _ = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        return peak_total / number, max(0, after - before) / number
+
+    def run(self, selected: Optional[List[str]] = None, rounds: int = 7, exact: bool = False) -> List[BenchmarkResult]:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        results = []
+        try:
+            for benchmark in self._benchmarks:
+                if selected:
+                    if exact and benchmark.name not in selected:
+                        continue
+                    if not exact and not any(pattern in benchmark.name for pattern in selected):
+                        continue
+
+                # Whatever the library prints is part of the measured cost, but not of the report
+                with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                    number = self._autorange(benchmark, loop)  # Also warms up
+                    best_s = min(self._time_batch(benchmark, loop, number) for _ in range(rounds))
+                    peak, retained = self._measure_allocations(benchmark, loop, 200)
+                results.append(BenchmarkResult(benchmark.name, number / best_s, peak, retained))
+                print(f"  {benchmark.name}", file=sys.stderr)
+        finally:
+            loop.close()
+            asyncio.set_event_loop(None)
+        return results
+
+
+def environment() -> Dict[str, str]:
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "system": platform.system(),
+    }
+
+
+def load_baseline(path: str) -> Dict[str, Dict[str, float]]:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as baseline_file:
+        return json.load(baseline_file).get("results", {})
+
+
+def save_baseline(path: str, results: List[BenchmarkResult]):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    data = {
+        "environment": environment(),
+        "results": {result.name: {k: v for k, v in asdict(result).items() if k != "name"} for result in results},
+    }
+    with open(path, "w") as baseline_file:
+        json.dump(data, baseline_file, indent=2, sort_keys=True)
+        baseline_file.write("\n")
+
+
+def _regression_flags(result: BenchmarkResult, base: Optional[Dict[str, float]], threshold: float) -> List[str]:
+    if base is None:
+        return []
+    flags = []
+    if result.ops_per_s / base["ops_per_s"] - 1 < -threshold:
+        flags.append("SLOWER")
+    # Small absolute allocation changes are noise
+    if result.peak_alloc_bytes_per_op > base["peak_alloc_bytes_per_op"] * (1 + threshold) + 64:
+        flags.append("MORE ALLOCATIONS")
+    return flags
+
+
+def compare(
+    results: List[BenchmarkResult], baseline: Dict[str, Dict[str, float]], threshold: float
+) -> List[str]:
+    """
+    Report every result and return the names of regressed benchmarks
+    """
+    regressions = []
+    print(f"{'benchmark':<40} {'ops/s':>14} {'vs base':>8} {'peak B/op':>10} {'kept B/op':>10}")
+    for result in results:
+        base = baseline.get(result.name)
+        change = f"{(result.ops_per_s / base['ops_per_s'] - 1) * 100:+.0f}%" if base is not None else ""
+        flags = _regression_flags(result, base, threshold)
+        if flags:
+            regressions.append(result.name)
+
+        print(
+            f"{result.name:<40} {result.ops_per_s:14,.0f} {change:>8} "
+            f"{result.peak_alloc_bytes_per_op:10.0f} {result.retained_bytes_per_op:10.1f}"
+            + (f"  <-- {', '.join(flags)}" if flags else "")
+        )
+    return regressions
+
+
+def main(suite: BenchmarkSuite, default_baseline: str, description: str = ""):
+    parser = argparse.ArgumentParser(description=description, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("filters", nargs="*", help="Only run benchmarks whose name contains one of these")
+    parser.add_argument("--baseline", default=default_baseline, help="Baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="Store the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Relative change flagged")
+    parser.add_argument("--rounds", type=int, default=7, help="Timed rounds per benchmark (best is kept)")
+    args = parser.parse_args()
+
+    baseline = load_baseline(args.baseline)
+    results = suite.run(args.filters, args.rounds)
+
+    if not args.save_baseline:
+        # Confirm apparent regressions with a second measurement, keeping the better one
+        suspects = [r.name for r in results if _regression_flags(r, baseline.get(r.name), args.threshold)]
+        if suspects:
+            retried = {r.name: r for r in suite.run(suspects, args.rounds, exact=True)}
+            results = [
+                retried[r.name] if r.name in retried and retried[r.name].ops_per_s > r.ops_per_s else r
+                for r in results
+            ]
+
+    regressions = compare(results, baseline, args.threshold)
+
+    if args.save_baseline:
+        save_baseline(args.baseline, results)
+        print(f"Saved baseline to {args.baseline}")
+    elif regressions:
+        print(f"{len(regressions)} regression(s) against {args.baseline}: {', '.join(regressions)}")
+        sys.exit(1)
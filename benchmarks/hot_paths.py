@@ -0,0 +1,222 @@
+'''
+CPU hot paths of the library: packet building, advertisement decoding and notification dispatch
+
+Measures operations per second and allocations per operation, and compares them with the
+stored baseline (exit code 1 on regression). Cases involving I/O use the simulated transport.
+
+    $ python benchmarks/hot_paths.py                    # compare with the baseline
+    $ python benchmarks/hot_paths.py notification      # only matching cases
+    $ python benchmarks/hot_paths.py --save-baseline    # store a new baseline
+'''
+
+import asyncio
+import os
+import random
+import tempfile
+
+from harness import BenchmarkSuite, main
+
+from switchbot_api import VirtualSwitchBot
+from switchbot_api.bot_information import BotInformation
+from switchbot_api.bot_types import SwitchBotAction, SwitchBotMetadata, SwitchBotReqType
+from switchbot_api.device_registry import SwitchBotRegistry
+from switchbot_api.metrics import SwitchBotMetrics
+from switchbot_api.scan_session import SwitchBotScanSession
+from switchbot_api.simulation import (
+    SimulatedAdvertisement,
+    SimulatedDevice,
+    SimulatedSwitchBot,
+    SimulatedTransport,
+)
+from switchbot_api.switchbot import _PendingRequest
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "hot_paths.json")
+
+# Unrelated advertisers per SwitchBot advertisement in the dense environment case
+UNRELATED_PER_SWITCHBOT = 50
+
+MAC = "F6:9A:4E:9C:3F:3B"
+
+# SwitchBots in the fleet wide packet building cases
+FLEET_SIZE = 1000
+
+suite = BenchmarkSuite("hot_paths")
+
+plain_bot = VirtualSwitchBot(MAC, transport=SimulatedTransport())
+encrypted_bot = VirtualSwitchBot(MAC, password_str="1234", transport=SimulatedTransport())
+
+
+@suite.add("build_request_msg")
+def build_request_msg():
+    plain_bot._build_request_msg(SwitchBotReqType.COMMAND, bytearray([SwitchBotAction.ON.value]))
+
+
+@suite.add("build_request_msg.encrypted")
+def build_request_msg_encrypted():
+    payload = encrypted_bot._check_append_pass_check([SwitchBotAction.ON.value], preappend=True)
+    encrypted_bot._build_request_msg(SwitchBotReqType.COMMAND, payload)
+
+
+@suite.add("action_packet")
+def action_packet():
+    plain_bot._action_packet(SwitchBotAction.ON)
+
+
+@suite.add("action_packet.encrypted")
+def action_packet_encrypted():
+    encrypted_bot._action_packet(SwitchBotAction.ON)
+
+
+# Alternating ON/OFF commands to a fleet of password protected SwitchBots, compare with fleet_build_packets
+fleet_transport = SimulatedTransport()
+fleet = [
+    VirtualSwitchBot(f"F6:9A:4E:9C:{i >> 8:02X}:{i & 0xFF:02X}", password_str=f"pass{i}", transport=fleet_transport)
+    for i in range(FLEET_SIZE)
+]
+
+
+@suite.add(f"fleet_action_packets_x{FLEET_SIZE}", number=10)
+def fleet_action_packets():
+    for i, bot in enumerate(fleet):
+        bot._action_packet(SwitchBotAction.ON if i & 1 else SwitchBotAction.OFF)
+
+
+@suite.add(f"fleet_build_packets_x{FLEET_SIZE}", number=10)
+def fleet_build_packets():
+    # What every command cost before packets were cached
+    for i, bot in enumerate(fleet):
+        action = SwitchBotAction.ON if i & 1 else SwitchBotAction.OFF
+        payload = bot._check_append_pass_check([action.value], preappend=True)
+        bot._build_request_msg(SwitchBotReqType.COMMAND, payload)
+
+
+# The registry file a previous process left for the whole fleet
+registry_path = os.path.join(tempfile.mkdtemp(), "switchbots.json")
+fleet_registry = SwitchBotRegistry(registry_path)
+for bot in fleet:
+    fleet_registry.record(bot)
+fleet_registry.save()
+
+
+@suite.add(f"registry_load_x{FLEET_SIZE}", number=10)
+def registry_load():
+    SwitchBotRegistry(registry_path).load()
+
+
+@suite.add(f"registry_restore_x{FLEET_SIZE}", number=10)
+def registry_restore():
+    # Startup of a process that uses every known SwitchBot
+    registry = SwitchBotRegistry(registry_path)
+    registry.load()
+    for bot in fleet:
+        registry.get(bot.mac_address).apply_to(bot.info)
+
+
+@suite.add("check_append_pass_check.list")
+def check_append_pass_check_list():
+    encrypted_bot._check_append_pass_check([SwitchBotAction.ON.value], preappend=True)
+
+
+@suite.add("check_append_pass_check.bytearray")
+def check_append_pass_check_bytearray():
+    encrypted_bot._check_append_pass_check(bytearray([0x01, 0x04]))
+
+
+session = SwitchBotScanSession(transport=SimulatedTransport())
+switchbot_device = SimulatedDevice(MAC)
+switchbot_adv = SimulatedSwitchBot(MAC).advertisement()
+
+_rng = random.Random(0)
+unrelated = [
+    (
+        SimulatedDevice(":".join(f"{_rng.randrange(256):02X}" for _ in range(6)), None),
+        SimulatedAdvertisement(
+            manufacturer_data={0x004C: bytes(_rng.randrange(256) for _ in range(20))} if i % 2 == 0 else {},
+            service_data={},
+        ),
+    )
+    for i in range(UNRELATED_PER_SWITCHBOT)
+]
+
+
+@suite.add("filter_advertisement.switchbot")
+def filter_advertisement_switchbot():
+    session.filter_advertisement(switchbot_device, switchbot_adv)
+
+
+@suite.add("filter_advertisement.unrelated")
+def filter_advertisement_unrelated():
+    device, adv = unrelated[0]
+    session.filter_advertisement(device, adv)
+
+
+@suite.add(f"on_detection.dense_x{UNRELATED_PER_SWITCHBOT + 1}")
+def on_detection_dense():
+    # One SwitchBot advertisement among a crowd of unrelated ones
+    for device, adv in unrelated:
+        session._on_detection(device, adv)
+    session._on_detection(switchbot_device, switchbot_adv)
+
+
+service_bytes = bytearray(switchbot_adv.service_data[SwitchBotScanSession.UNKNOWN_SERVICE_DATA_UUID])
+info = BotInformation()
+
+
+@suite.add("read_service_bytes")
+def read_service_bytes():
+    info.read_service_bytes(service_bytes)
+
+
+alarm_payload = bytes.fromhex("02 01 15 08 1e 01 02 03 00 05 0a")
+
+
+@suite.add("update_alarm")
+def update_alarm():
+    info.update_alarm(alarm_payload)
+
+
+basic_info_notification = bytearray.fromhex("01 64 3f 64 00 00 00 c7 00 10 00 48 90")
+command_notification = bytearray.fromhex("01 48 90")
+# Futures are only resolved, never awaited, so any loop will do
+loop = asyncio.new_event_loop()
+
+
+def dispatch(request_type: SwitchBotReqType, notification: bytearray):
+    plain_bot._request_response_queue.append(_PendingRequest(request_type, loop.create_future()))
+    plain_bot._notif_callback_handler(None, notification)
+
+
+@suite.add("notification.command")
+def notification_command():
+    dispatch(SwitchBotReqType.COMMAND, command_notification)
+
+
+# Same bot recording metrics, compare with notification.command (metrics disabled)
+metrics_bot = VirtualSwitchBot(MAC, transport=SimulatedTransport(), metrics=SwitchBotMetrics())
+
+
+@suite.add("notification.command.metrics")
+def notification_command_metrics():
+    metrics_bot._request_response_queue.append(_PendingRequest(SwitchBotReqType.COMMAND, loop.create_future()))
+    metrics_bot._notif_callback_handler(None, command_notification)
+
+
+@suite.add("notification.basic_info")
+def notification_basic_info():
+    dispatch(SwitchBotReqType.GET_BASIC_INFO, basic_info_notification)
+
+
+simulated = SimulatedSwitchBot(MAC, password_str="1234")
+round_trip_bot = VirtualSwitchBot(MAC, password_str="1234", transport=SimulatedTransport([simulated]))
+
+
+@suite.add("round_trip.set_bot_state", number=100)
+async def round_trip_set_bot_state():
+    # Connects on the first (warm up) call
+    if not round_trip_bot.is_connected:
+        await round_trip_bot.connect(prefetch=SwitchBotMetadata.NONE)
+    await round_trip_bot.set_bot_state(SwitchBotAction.ON)
+
+
+if __name__ == "__main__":
+    main(suite, BASELINE, __doc__)
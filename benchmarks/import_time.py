@@ -0,0 +1,114 @@
+'''
+Cold import time of the library
+
+Imports the package in a fresh interpreter with ``-X importtime``, keeps the best of several
+runs and compares it with the stored baseline. Also fails if an import pulls in a module that
+must stay lazy (bleak is only needed once a BleakTransport is used, enum_tools only by docs builds).
+
+    $ python benchmarks/import_time.py                  # compare with the baseline
+    $ python benchmarks/import_time.py --top 15         # also list the slowest imports
+    $ python benchmarks/import_time.py switchbot_api.btsnoop  # other modules
+    $ python benchmarks/import_time.py --save-baseline  # store a new baseline
+'''
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+from harness import DEFAULT_THRESHOLD, environment
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE = os.path.join(ROOT, "benchmarks", "baselines", "import_time.json")
+
+# Must not be imported by importing the library
+LAZY_MODULES = ["bleak", "enum_tools", "sphinx"]
+
+# Import times are small, so changes below this are noise whatever the relative change
+MIN_REGRESSION_US = 5000
+
+
+def import_once(module: str) -> Tuple[int, Dict[str, int], List[str]]:
+    """
+    Import a module in a new interpreter
+
+    :return: Cumulative import time (us), self time of every imported module (us) and the lazy modules loaded
+    """
+    code = f"import sys, {module}; print(' '.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True, check=True,
+    )
+
+    self_us: Dict[str, int] = {}
+    cumulative_us = 0
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_time, cumulative, name = line[len("import time:"):].split("|")
+        self_us[name.strip()] = int(self_time)
+        if name.strip() == module:
+            cumulative_us = int(cumulative)
+    return cumulative_us, self_us, process.stdout.split()
+
+
+def measure(module: str, runs: int) -> Tuple[int, Dict[str, int], List[str]]:
+    # Compiles the .pyc files, so they are not part of the measurement
+    import_once(module)
+    return min((import_once(module) for _ in range(runs)), key=lambda run: run[0])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("modules", nargs="*", default=["switchbot_api"], help="Modules to import")
+    parser.add_argument("--baseline", default=BASELINE, help="Baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="Store the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Relative change flagged")
+    parser.add_argument("--runs", type=int, default=15, help="Imports per module (best is kept)")
+    parser.add_argument("--top", type=int, default=0, help="List the N slowest imported modules")
+    args = parser.parse_args()
+
+    baseline: Dict[str, float] = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file).get("results", {})
+
+    failures = []
+    results: Dict[str, float] = {}
+    print(f"{'module':<32} {'import ms':>10} {'vs base':>8}")
+    for module in args.modules:
+        cumulative_us, self_us, lazy_loaded = measure(module, args.runs)
+        results[module] = cumulative_us / 1000
+
+        base = baseline.get(module)
+        change = f"{(results[module] / base - 1) * 100:+.0f}%" if base else ""
+        flags = []
+        if lazy_loaded:
+            flags.append(f"IMPORTS {', '.join(lazy_loaded)}")
+        if base and cumulative_us > base * 1000 * (1 + args.threshold) + MIN_REGRESSION_US:
+            flags.append("SLOWER")
+        if flags:
+            failures.append(module)
+        print(f"{module:<32} {results[module]:10.1f} {change:>8}" + (f"  <-- {', '.join(flags)}" if flags else ""))
+
+        for name, us in sorted(self_us.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+            print(f"    {name:<40} {us / 1000:8.1f} ms")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        with open(args.baseline, "w") as baseline_file:
+            # Modules that were not measured keep their previous baseline
+            data = {"environment": environment(), "results": {**baseline, **results}}
+            json.dump(data, baseline_file, indent=2, sort_keys=True)
+            baseline_file.write("\n")
+        print(f"Saved baseline to {args.baseline}")
+    elif failures:
+        print(f"{len(failures)} regression(s) against {args.baseline}: {', '.join(failures)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+'''
+Discovery latency of SwitchBotScanner with thousands of unrelated advertisers nearby
+
+Compares the previous 1 second polling loop (re-walking every discovered device each
+tick) against the detection callback path, without a radio: advertisements are fed
+straight into the scan session's detection callback.
+
+    $ python benchmarks/scanner_discovery.py --advertisers 5000
+'''
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from typing import Dict, List, Tuple
+
+from bleak import BLEDevice, AdvertisementData
+
+from switchbot_api import SwitchBotScanner
+from switchbot_api.scan_session import SwitchBotScanSession
+
+APPLE_MANUFACTURER_ID = 0x004C
+POLL_INTERVAL_S = 1.0
+
+
+def random_mac(rng: random.Random) -> str:
+    return ":".join(f"{rng.randrange(256):02X}" for _ in range(6))
+
+
+def make_advertisement(manufacturer_data: Dict[int, bytes], service_data: Dict[str, bytes]) -> AdvertisementData:
+    return AdvertisementData(
+        local_name=None,
+        manufacturer_data=manufacturer_data,
+        service_data=service_data,
+        service_uuids=[],
+        tx_power=None,
+        rssi=-70,
+        platform_data=(),
+    )
+
+
+def make_unrelated(rng: random.Random, count: int) -> List[Tuple[BLEDevice, AdvertisementData]]:
+    advertisers = []
+    for i in range(count):
+        device = BLEDevice(random_mac(rng), f"Device {i}", None)
+        # Mix of phones/TVs (Apple style manufacturer data) and devices with no data at all
+        if i % 2 == 0:
+            adv = make_advertisement({APPLE_MANUFACTURER_ID: bytes(rng.randrange(256) for _ in range(20))}, {})
+        else:
+            adv = make_advertisement({}, {})
+        advertisers.append((device, adv))
+    return advertisers
+
+
+def make_switchbot(rng: random.Random) -> Tuple[BLEDevice, AdvertisementData]:
+    mac = random_mac(rng)
+    device = BLEDevice(mac, "WoHand", None)
+    adv = make_advertisement(
+        {SwitchBotScanner.NORDIC_MANUFACTURER_ID: bytes.fromhex(mac.replace(":", ""))},
+        {SwitchBotScanner.UNKNOWN_SERVICE_DATA_UUID: bytes([0x48, 0x40, 0x64])},
+    )
+    return device, adv
+
+
+def bench_polling(unrelated: List[Tuple[BLEDevice, AdvertisementData]], switchbot, trials: int) -> List[float]:
+    """
+    Latency of the polling loop: wait for the next tick, then walk every discovered device
+    """
+    session = SwitchBotScanSession()
+    discovered = {device.address: (device, adv) for device, adv in unrelated}
+    discovered[switchbot[0].address] = switchbot
+
+    rng = random.Random(1)
+    latencies = []
+    for _ in range(trials):
+        start = time.perf_counter()
+        for _, (device, adv) in discovered.items():
+            if session.filter_advertisement(device, adv) is not None:
+                break
+        walk_s = time.perf_counter() - start
+        # The advertisement arrives at a uniformly random point between ticks
+        latencies.append(rng.uniform(0, POLL_INTERVAL_S) + walk_s)
+    return latencies
+
+
+async def bench_callback(unrelated: List[Tuple[BLEDevice, AdvertisementData]], switchbot, trials: int) -> List[float]:
+    """
+    Latency of the detection callback: from the SwitchBot's advertisement to the bot being yielded
+    """
+    latencies = []
+    for _ in range(trials):
+        session = SwitchBotScanSession()
+        scanner = SwitchBotScanner(session=session)
+        scanner._matches = asyncio.Queue()
+        session.subscribe(scanner._on_advertisement)
+        waiter = asyncio.ensure_future(scanner._wait_for_match())
+
+        for device, adv in unrelated:
+            session._on_detection(device, adv)
+
+        start = time.perf_counter()
+        session._on_detection(*switchbot)
+        await waiter
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def bench_filter_throughput(unrelated: List[Tuple[BLEDevice, AdvertisementData]]) -> float:
+    session = SwitchBotScanSession()
+    start = time.perf_counter()
+    for device, adv in unrelated:
+        session._on_detection(device, adv)
+    return len(unrelated) / (time.perf_counter() - start)
+
+
+def report(name: str, latencies: List[float]):
+    latencies = sorted(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(
+        f"{name:<10} mean={statistics.mean(latencies) * 1000:10.3f} ms  "
+        f"p50={statistics.median(latencies) * 1000:10.3f} ms  p99={p99 * 1000:10.3f} ms"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--advertisers", type=int, default=5000, help="Unrelated advertisers nearby")
+    parser.add_argument("--trials", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    unrelated = make_unrelated(rng, args.advertisers)
+    switchbot = make_switchbot(rng)
+
+    print(f"Discovery latency with {args.advertisers} unrelated advertisers ({args.trials} trials)")
+    report("polling", bench_polling(unrelated, switchbot, args.trials))
+    report("callback", await bench_callback(unrelated, switchbot, args.trials))
+    print(f"Callback filter throughput: {bench_filter_throughput(unrelated):,.0f} advertisements/s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,94 @@
+'''
+Command latency with and without ATT write responses
+
+Sends the same commands to a simulated SwitchBot once waiting for the write response of every
+request (the default) and once relying on the response notification alone
+(``write_with_response=False``), and reports the latency of each mode. The simulated link adds
+``--write-latency`` to writes with response and ``--response-latency`` to every notification.
+
+A command waits for the slower of the write response and the notification, so one at a time the
+saving is the time the write response arrives after the notification. With ``--pipeline-depth``
+above 1 every write also holds the write lock for its write response round trip, which is where
+skipping it pays the most.
+
+    $ python benchmarks/write_latency.py --write-latency 0.045 --response-latency 0.03
+    $ python benchmarks/write_latency.py --pipeline-depth 4
+'''
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Dict, List
+
+from switchbot_api import VirtualSwitchBot
+from switchbot_api.bot_types import SwitchBotAction, SwitchBotMetadata
+from switchbot_api.simulation import SimulatedSwitchBot, SimulatedTransport
+
+MAC = "F6:9A:4E:9C:3F:3B"
+
+
+async def measure(args: argparse.Namespace, write_with_response: bool) -> List[float]:
+    transport = SimulatedTransport(
+        [SimulatedSwitchBot(MAC, password_str=args.password, response_latency_s=args.response_latency)],
+        write_response_latency_s=args.write_latency,
+    )
+    bot = VirtualSwitchBot(
+        MAC,
+        password_str=args.password,
+        pipeline_depth=args.pipeline_depth,
+        transport=transport,
+        write_with_response=write_with_response,
+    )
+    await bot.connect(prefetch=SwitchBotMetadata.NONE)
+
+    async def command(i: int) -> float:
+        start = time.perf_counter()
+        await bot.set_bot_state(SwitchBotAction.ON if i & 1 else SwitchBotAction.OFF)
+        return time.perf_counter() - start
+
+    latencies = []
+    for first in range(0, args.commands, args.pipeline_depth):
+        batch = range(first, min(args.commands, first + args.pipeline_depth))
+        latencies.extend(await asyncio.gather(*(command(i) for i in batch)))
+
+    await bot.disconnect()
+    return sorted(latencies)
+
+
+def report(name: str, latencies: List[float], elapsed_s: float):
+    def percentile(p: float) -> float:
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    print(
+        f"{name:<22} {len(latencies) / elapsed_s:8.1f} cmd/s  mean={statistics.mean(latencies) * 1000:8.2f} ms  "
+        f"p50={percentile(0.50):8.2f} ms  p95={percentile(0.95):8.2f} ms  p99={percentile(0.99):8.2f} ms"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--commands", type=int, default=200, help="Commands sent in each mode")
+    parser.add_argument("--write-latency", type=float, default=0.03, help="Seconds for an ATT write response")
+    parser.add_argument("--response-latency", type=float, default=0.05, help="Seconds until the notification")
+    parser.add_argument("--pipeline-depth", type=int, default=1, help="Commands in flight at once")
+    parser.add_argument("--password", type=str, default=None, help="Password of the simulated SwitchBot")
+    args = parser.parse_args()
+
+    print(
+        f"{args.commands} commands, write response {args.write_latency * 1000:.0f} ms, "
+        f"notification {args.response_latency * 1000:.0f} ms, pipeline depth {args.pipeline_depth}"
+    )
+    means: Dict[bool, float] = {}
+    for name, write_with_response in (("with response", True), ("without response", False)):
+        start = time.perf_counter()
+        latencies = await measure(args, write_with_response)
+        report(name, latencies, time.perf_counter() - start)
+        means[write_with_response] = statistics.mean(latencies)
+
+    print(f"without response saves {(means[True] - means[False]) * 1000:.2f} ms per command "
+          f"({(1 - means[False] / means[True]) * 100:.0f}%)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,26 @@
+import asyncio
+import logging
+
+from switchbot_api import SwitchBotScanner, run_batch
+from switchbot_api.bot_types import SwitchBotAction
+
+
+async def start():
+
+    # Find two SwitchBots, then drive them at the same time instead of one after another
+    bots = [switchbot async for switchbot in SwitchBotScanner(bot_count=2)]
+
+    for action in [SwitchBotAction.ON, SwitchBotAction.OFF]:
+        results = await run_batch(bots, action, max_concurrency=2, timeout=20)
+
+        for result in results.values():
+            status = result.status.name if result.status is not None else repr(result.error)
+            print(f"{result.mac_address}: {action.name} -> {status} in {result.latency_s:.2f}s")
+
+        await asyncio.sleep(5)
+
+
+if __name__ == "__main__":
+    # The library logs through the "switchbot_api" logger, DEBUG shows every request and response
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(start())
@@ -1,4 +1,5 @@
 import asyncio
+import logging
 from typing import Optional
 
 from switchbot_api import VirtualSwitchBot
@@ -18,18 +19,16 @@ async def start():
     print("Connecting...")
     await virtual_bot.connect()
 
-    # Set the SwitchBot to ON
-    await virtual_bot.set_bot_state(SwitchBotAction.ON)
-
-    # Sleep is necsessary to allow the SwitchBot to physcially change state
-    await asyncio.sleep(5)
+    # Set the SwitchBot to ON, returning once the SwitchBot reports it has physically changed state
+    await virtual_bot.set_bot_state(SwitchBotAction.ON, wait_for_state=True)
 
     # Set the SwitchBot to OFF
-    await virtual_bot.set_bot_state(SwitchBotAction.OFF)
-    await asyncio.sleep(5)
+    await virtual_bot.set_bot_state(SwitchBotAction.OFF, wait_for_state=True)
 
     # Disconnect from the switchbot
     await virtual_bot.disconnect()
 
 if __name__ == "__main__":
+    # The library logs through the "switchbot_api" logger, DEBUG shows every request and response
+    logging.basicConfig(level=logging.INFO)
     asyncio.run(start())
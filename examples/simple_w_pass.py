@@ -1,4 +1,5 @@
 import asyncio
+import logging
 
 from switchbot_api import SwitchBotScanner
 from switchbot_api.bot_types import SwitchBotAction
@@ -34,4 +35,6 @@ async def start():
     await virtual_bot.disconnect()
 
 if __name__ == "__main__":
+    # The library logs through the "switchbot_api" logger, DEBUG shows every request and response
+    logging.basicConfig(level=logging.INFO)
     asyncio.run(start())
\ No newline at end of file
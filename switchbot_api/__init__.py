@@ -1,13 +1,162 @@
+from typing import TYPE_CHECKING, Any, Dict, List
+import importlib
+
 from .switchbot import VirtualSwitchBot
 from .switchbot_scanner import SwitchBotScanner
+from .metrics import MetricsRegistry, SwitchBotMetrics, enable_metrics, disable_metrics, default_metrics
+from .tracing import Tracer, RecordingTracer, enable_tracing, disable_tracing, default_tracer
+from .scan_session import SwitchBotScanSession, SwitchBotAdvertisement, default_scan_session
+from .state_cache import SwitchBotStateCache, CachedBotState
+from .bot_response import (
+    SwitchBotResponse,
+    SwitchBotError,
+    SwitchBotResponseError,
+    SwitchBotDecodeError,
+    SwitchBotTimeoutError,
+    SwitchBotNotFoundError,
+    SwitchBotDisconnectedError,
+    SwitchBotCircuitOpenError,
+    SwitchBotReplayError,
+)
+from .retry_policy import RetryPolicy, CircuitBreaker, RetryStats
+from .transport import SwitchBotTransport, BleakTransport, default_transport
+from .response_decoders import ResponseDecoder, ResponseDecoderRegistry, default_decoders, decoders_for
 from . import bot_types
 from . import bot_information
+from . import bot_response
 from . import alarm_info
+from . import scan_session
+from . import state_cache
+from . import retry_policy
+from . import transport
+from . import response_decoders
+from . import metrics
+from . import tracing
+
+if TYPE_CHECKING:
+    from .switchbot_pool import SwitchBotPool
+    from .switchbot_batch import SwitchBotBatchResult, run_batch
+    from .command_queue import SwitchBotCommandQueue, CommandQueueStats
+    from .action_batcher import SwitchBotActionBatcher, ActionBatcherStats
+    from .device_registry import SwitchBotRegistry, RegisteredBot
+    from .connection_supervisor import SwitchBotSupervisor, SupervisorStats
+    from . import simulation
+    from . import btsnoop
+    from . import replay
+    from . import command_queue
+    from . import action_batcher
+    from . import device_registry
+    from . import connection_supervisor
+
+# Optional subsystems, imported on first access so importing the package only loads what a bot needs
+_LAZY_ATTRIBUTES: Dict[str, str] = {
+    "SwitchBotPool": "switchbot_pool",
+    "SwitchBotBatchResult": "switchbot_batch",
+    "run_batch": "switchbot_batch",
+    "SwitchBotCommandQueue": "command_queue",
+    "CommandQueueStats": "command_queue",
+    "SwitchBotActionBatcher": "action_batcher",
+    "ActionBatcherStats": "action_batcher",
+    "SwitchBotRegistry": "device_registry",
+    "RegisteredBot": "device_registry",
+    "SwitchBotSupervisor": "connection_supervisor",
+    "SupervisorStats": "connection_supervisor",
+}
+_LAZY_SUBMODULES = frozenset(
+    {
+        "simulation",
+        "btsnoop",
+        "replay",
+        "command_queue",
+        "action_batcher",
+        "device_registry",
+        "connection_supervisor",
+    }
+)
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is not None:
+        value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    elif name in _LAZY_SUBMODULES:
+        value = importlib.import_module(f".{name}", __name__)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    # Cached, later accesses do not go through __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(__all__))
+
 
 __all__ = [
     "VirtualSwitchBot",
     "SwitchBotScanner",
+    "SwitchBotPool",
+    "SwitchBotBatchResult",
+    "run_batch",
+    "SwitchBotCommandQueue",
+    "CommandQueueStats",
+    "SwitchBotActionBatcher",
+    "ActionBatcherStats",
+    "SwitchBotRegistry",
+    "RegisteredBot",
+    "SwitchBotSupervisor",
+    "SupervisorStats",
+    "MetricsRegistry",
+    "SwitchBotMetrics",
+    "enable_metrics",
+    "disable_metrics",
+    "default_metrics",
+    "Tracer",
+    "RecordingTracer",
+    "enable_tracing",
+    "disable_tracing",
+    "default_tracer",
+    "SwitchBotScanSession",
+    "SwitchBotAdvertisement",
+    "default_scan_session",
+    "SwitchBotStateCache",
+    "CachedBotState",
+    "SwitchBotResponse",
+    "SwitchBotError",
+    "SwitchBotResponseError",
+    "SwitchBotDecodeError",
+    "SwitchBotTimeoutError",
+    "SwitchBotNotFoundError",
+    "SwitchBotDisconnectedError",
+    "SwitchBotCircuitOpenError",
+    "SwitchBotReplayError",
+    "RetryPolicy",
+    "CircuitBreaker",
+    "RetryStats",
+    "SwitchBotTransport",
+    "BleakTransport",
+    "default_transport",
+    "ResponseDecoder",
+    "ResponseDecoderRegistry",
+    "default_decoders",
+    "decoders_for",
     "bot_types",
     "bot_information",
+    "bot_response",
     "alarm_info",
-]
\ No newline at end of file
+    "scan_session",
+    "state_cache",
+    "retry_policy",
+    "transport",
+    "simulation",
+    "btsnoop",
+    "replay",
+    "response_decoders",
+    "command_queue",
+    "action_batcher",
+    "device_registry",
+    "connection_supervisor",
+    "metrics",
+    "tracing",
+]
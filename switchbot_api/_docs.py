@@ -0,0 +1,35 @@
+'''
+Python-Switchbot-BLE: A Python library for interfacing with Switchbot devices over Bluetooth Low Energy (BLE)
+Copyright (C) 2023  Benjamin Carlson
+'''
+
+import sys
+from typing import TypeVar
+
+__all__ = ["document_enum"]
+
+_EnumT = TypeVar("_EnumT")
+
+
+def document_enum(cls: _EnumT) -> _EnumT:
+    """
+    Apply ``enum_tools.documentation.document_enum`` during Sphinx builds only
+
+    enum_tools is a documentation dependency, so outside of a docs build (or without it
+    installed) the enum is returned untouched and nothing is imported.
+
+    :param cls: The enum to document
+    :type cls: Type[enum.Enum]
+    :return: The same enum
+    :rtype: Type[enum.Enum]
+    """
+    if "sphinx" not in sys.modules:
+        return cls
+
+    try:
+        import enum_tools.documentation
+    except ImportError:
+        return cls
+
+    enum_tools.documentation.INTERACTIVE = True
+    return enum_tools.documentation.document_enum(cls)
@@ -0,0 +1,255 @@
+'''
+Python-Switchbot-BLE: A Python library for interfacing with Switchbot devices over Bluetooth Low Energy (BLE)
+Copyright (C) 2023  Benjamin Carlson
+'''
+
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+import asyncio
+import logging
+import time
+
+from .bot_types import SwitchBotAction
+from .bot_response import SwitchBotResponse
+from .switchbot import VirtualSwitchBot
+
+_LOGGER = logging.getLogger(__name__)
+
+__all__ = ["SwitchBotActionBatcher", "ActionBatcherStats"]
+
+# Delays of an action set are a single byte of whole seconds
+_MAX_DELAY_S = 255
+
+# Actions set_bot_state sends on its own (a lone action of another kind goes out as a one action set)
+_STATE_ACTIONS = frozenset({SwitchBotAction.PRESS, SwitchBotAction.ON, SwitchBotAction.OFF})
+
+
+@dataclass
+class ActionBatcherStats:
+    '''
+    What a SwitchBotActionBatcher did with the actions given to it
+    '''
+
+    # Actions written to the SwitchBot
+    actions: int = 0
+
+    # Packets those actions were written in
+    packets: int = 0
+
+    # Actions dropped because their caller was cancelled before they were sent
+    abandoned: int = 0
+
+    @property
+    def writes_saved(self) -> int:
+        return self.actions - self.packets
+
+
+class _BufferedAction:
+    """
+    An action waiting to be packed, with when it was issued and the future of its caller
+    """
+
+    __slots__ = ("action", "issued_at", "future")
+
+    def __init__(
+        self,
+        action: SwitchBotAction,
+        issued_at: float,
+        future: "asyncio.Future[Optional[SwitchBotResponse]]",
+    ):
+        self.action = action
+        self.issued_at = issued_at
+        self.future = future
+
+
+class SwitchBotActionBatcher:
+    def __init__(self, bot: VirtualSwitchBot, window_s: float = 0.5) -> None:
+        """
+        Packs actions issued in quick succession to one SwitchBot into ``run_action_set`` packets
+
+        Actions are buffered while each one follows the previous within ``window_s``. The buffer is
+        then sent as few packets as possible (``VirtualSwitchBot.max_action_set_actions`` actions
+        each, fewer when encrypted), the delay before each action being the time (rounded to whole
+        seconds) between it and the previous action. When a sequence spans several packets, a packet
+        is only sent once the actions of the previous one have run. Every caller receives the
+        response to the packet its action was sent in.
+
+        The first action waits for the window to close, so the window should just cover the spacing
+        of the sequences being scripted.
+
+        .. code-block:: python
+
+            batcher = SwitchBotActionBatcher(bot, window_s=3)
+            # One packet: ON, OFF 2 seconds later
+            on = asyncio.ensure_future(batcher.set_bot_state(SwitchBotAction.ON))
+            await asyncio.sleep(2)
+            await asyncio.gather(on, batcher.set_bot_state(SwitchBotAction.OFF))
+
+        :param bot: The SwitchBot the actions are sent to
+        :type bot: VirtualSwitchBot
+        :param window_s: Longest time (seconds) between two actions packed together
+        :type window_s: float
+        :raises ValueError: The window is negative or longer than an action set delay can be
+        """
+        if not 0 <= window_s <= _MAX_DELAY_S:
+            raise ValueError(f"Invalid window ({window_s}), must be between 0 and {_MAX_DELAY_S} seconds")
+
+        self._bot = bot
+        self._window_s = window_s
+        self._buffer: List[_BufferedAction] = []
+        # Created on first use, so the batcher can be made outside of the event loop
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._stats = ActionBatcherStats()
+
+        # When the last action sent was issued, and when the packet it was sent in finishes running
+        self._last_issued_at: Optional[float] = None
+        self._busy_until = 0.0
+
+    async def set_bot_state(self, action: SwitchBotAction) -> Optional[SwitchBotResponse]:
+        """
+        Buffer an action, to be sent along with the actions issued right before or after it
+
+        :param action: The action to take (any action ``run_action_set`` accepts)
+        :type action: SwitchBotAction
+        :return: The response to the packet the action was sent in
+        :rtype: Optional[SwitchBotResponse]
+        """
+        future: "asyncio.Future[Optional[SwitchBotResponse]]" = asyncio.get_running_loop().create_future()
+        self._buffer.append(_BufferedAction(action, time.monotonic(), future))
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        self._wakeup.set()
+
+        if self._worker is None:
+            self._worker = asyncio.ensure_future(self._run())
+
+        return await future
+
+    async def _wait_for_window(self):
+        """
+        Wait until no action was issued for a window, or a full packet is buffered
+        """
+        while len(self._buffer) < self._bot.max_action_set_actions:
+            remaining = self._buffer[-1].issued_at + self._window_s - time.monotonic()
+            if remaining <= 0:
+                return
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+
+    def _pack(self, buffered: List[_BufferedAction]) -> List[List[Tuple[int, _BufferedAction]]]:
+        """
+        Split actions into packets, each action with its delay (seconds) after the previous one
+        """
+        size = self._bot.max_action_set_actions
+        previous_at = self._last_issued_at
+        delayed: List[Tuple[int, _BufferedAction]] = []
+        for entry in buffered:
+            delay = 0 if previous_at is None else min(_MAX_DELAY_S, round(entry.issued_at - previous_at))
+            delayed.append((delay, entry))
+            previous_at = entry.issued_at
+        return [delayed[index:index + size] for index in range(0, len(delayed), size)]
+
+    async def _send(self, packet: List[Tuple[int, _BufferedAction]]) -> Optional[SwitchBotResponse]:
+        if len(packet) == 1 and packet[0][1].action in _STATE_ACTIONS:
+            return await self._bot.set_bot_state(packet[0][1].action)
+        return await self._bot.run_action_set([(delay, entry.action) for delay, entry in packet])
+
+    async def _flush(self, buffered: List[_BufferedAction]):
+        """
+        Send buffered actions, as few packets as the SwitchBot accepts
+        """
+        for packet in self._pack(buffered):
+            # The first delay of a packet is not sent, it is waited for here instead
+            wait_s = self._busy_until + packet[0][0] - time.monotonic()
+            if wait_s > 0:
+                await asyncio.sleep(wait_s)
+
+            _LOGGER.debug(
+                "Packing %d action(s) for %s into one packet",
+                len(packet),
+                self._bot.mac_address,
+                extra={"event": "actions_packed", "mac_address": self._bot.mac_address, "actions": len(packet)},
+            )
+            self._stats.packets += 1
+            self._stats.actions += len(packet)
+            self._busy_until = time.monotonic() + sum(delay for delay, _ in packet[1:])
+            self._last_issued_at = packet[-1][1].issued_at
+            try:
+                response = await self._send(packet)
+            except Exception as err:
+                for _, entry in packet:
+                    if not entry.future.done():
+                        entry.future.set_exception(err)
+            else:
+                for _, entry in packet:
+                    if not entry.future.done():
+                        entry.future.set_result(response)
+
+    async def _run(self):
+        """
+        Pack and send the buffered actions until the buffer is empty
+        """
+        buffered: List[_BufferedAction] = []
+        try:
+            while len(self._buffer) > 0:
+                await self._wait_for_window()
+                buffered, self._buffer = self._buffer, []
+
+                pending = [entry for entry in buffered if not entry.future.done()]
+                self._stats.abandoned += len(buffered) - len(pending)
+                buffered = pending
+                if len(buffered) > 0:
+                    await self._flush(buffered)
+                buffered = []
+        except asyncio.CancelledError:
+            # Batcher closed, nobody is left to send the remaining actions
+            for entry in buffered + self._buffer:
+                entry.future.cancel()
+            self._buffer = []
+            raise
+        finally:
+            self._worker = None
+
+    async def close(self):
+        """
+        Stop sending, cancelling the actions still buffered (and the callers waiting for them)
+        """
+        worker = self._worker
+        if worker is not None:
+            worker.cancel()
+            try:
+                await worker
+            except asyncio.CancelledError:
+                pass
+
+    @property
+    def bot(self) -> VirtualSwitchBot:
+        return self._bot
+
+    @property
+    def window_s(self) -> float:
+        return self._window_s
+
+    @property
+    def pending(self) -> int:
+        """
+        Actions buffered and not sent yet
+
+        :return: The number of buffered actions
+        :rtype: int
+        """
+        return len(self._buffer)
+
+    @property
+    def stats(self) -> ActionBatcherStats:
+        """
+        Actions and packets sent since the batcher was created
+
+        :return: The statistics (updated in place)
+        :rtype: ActionBatcherStats
+        """
+        return self._stats
@@ -3,18 +3,15 @@ Python-Switchbot-BLE: A Python library for interfacing with Switchbot devices ov
 Copyright (C) 2023  Benjamin Carlson
 '''
 
-from dataclasses import dataclass
 from enum import Enum
-from typing import List
+from typing import Any, List, Optional, Tuple
 from datetime import timedelta
 
-import enum_tools.documentation
+from ._docs import document_enum
 
-__all__ = ["DayOfWeek", "AlarmExecType", "AlarmExecAction", "AlarmInfo"]
+__all__ = ["DayOfWeek", "AlarmExecType", "AlarmExecAction", "AlarmInfo", "days_from_mask"]
 
-enum_tools.documentation.INTERACTIVE = True
-
-@enum_tools.documentation.document_enum
+@document_enum
 class DayOfWeek(Enum):
     '''
     The day of the week to execute an alarm on
@@ -27,7 +24,26 @@ class DayOfWeek(Enum):
     SATURDAY = 5
     SUNDAY = 6
 
-@enum_tools.documentation.document_enum
+
+# The days of each value of the 7 day bits (bit n = DayOfWeek(n)), decoding is a lookup
+_DAYS_BY_MASK: Tuple[Tuple[DayOfWeek, ...], ...] = tuple(
+    tuple(dow for dow in DayOfWeek if mask & (1 << dow.value)) for mask in range(0x80)
+)
+
+
+def days_from_mask(mask: int) -> List[DayOfWeek]:
+    """
+    The days of an alarm repeat byte (bits 6-0, one per day)
+
+    :param mask: The repeat byte, its first bit (repeat flag) is ignored
+    :type mask: int
+    :return: The days whose bit is set
+    :rtype: List[DayOfWeek]
+    """
+    return list(_DAYS_BY_MASK[mask & 0x7F])
+
+
+@document_enum
 class AlarmExecType(Enum):
     '''
     The type of execution that will occur
@@ -36,7 +52,7 @@ class AlarmExecType(Enum):
     REPEAT_N_TIMES_AT_INTERVAL = 1 # doc: "Execute N times every interval"
     REPEAT_FOREVER_AT_INTERVAL = 2 # doc: "Execute forever every interval"
 
-@enum_tools.documentation.document_enum
+@document_enum
 class AlarmExecAction(Enum):
     '''
     The action to execute when the alarm is triggered
@@ -46,29 +62,161 @@ class AlarmExecAction(Enum):
     OFF = 2 # doc: "Turn off"
 
 
-@dataclass
 class AlarmInfo:
     '''
     The information for an alarm
-    '''
-
-    # If false, execute once
-    execute_repeatedly: bool
-
-    # If execute_repeatedly is true, this is the list of days to execute on
-    valid_days: List[DayOfWeek]
-
-    # The time to execute at
-    execution_time: timedelta
 
-    # The type of execution that occurs
-    exec_type: AlarmExecType
-
-    # The action to execute
-    exec_action: AlarmExecAction
-
-    # For AlarmExecType.REPEAT_N_TIMES_AT_INTERVAL
-    num_continuous_actions: int
+    Alarms decoded from a response keep the raw day mask and times, the day list and timedeltas are
+    only built when read.
+    '''
 
-    # If execute_repeatedly is true, Max 5 hours, seconds in steps of 10
-    interval: timedelta
+    __slots__ = (
+        "execute_repeatedly",
+        "exec_type",
+        "exec_action",
+        "num_continuous_actions",
+        "_valid_days",
+        "_execution_time",
+        "_interval",
+        "_repeat_byte",
+        "_execution_s",
+        "_interval_s",
+    )
+
+    def __init__(
+        self,
+        execute_repeatedly: bool,
+        valid_days: List[DayOfWeek],
+        execution_time: timedelta,
+        exec_type: AlarmExecType,
+        exec_action: AlarmExecAction,
+        num_continuous_actions: int,
+        interval: timedelta,
+    ) -> None:
+        # If false, execute once
+        self.execute_repeatedly = execute_repeatedly
+
+        # The type of execution that occurs
+        self.exec_type = exec_type
+
+        # The action to execute
+        self.exec_action = exec_action
+
+        # For AlarmExecType.REPEAT_N_TIMES_AT_INTERVAL
+        self.num_continuous_actions = num_continuous_actions
+
+        self._valid_days: Optional[List[DayOfWeek]] = valid_days
+        self._execution_time: Optional[timedelta] = execution_time
+        self._interval: Optional[timedelta] = interval
+
+        # Raw values the properties are built from when not set
+        self._repeat_byte = 0
+        self._execution_s = 0
+        self._interval_s = 0
+
+    @classmethod
+    def _from_raw(
+        cls,
+        repeat_byte: int,
+        execution_s: int,
+        exec_type: AlarmExecType,
+        exec_action: AlarmExecAction,
+        num_continuous_actions: int,
+        interval_s: int,
+    ) -> "AlarmInfo":
+        """
+        An alarm whose days and times are built from the response values on first read
+
+        :param repeat_byte: The repeat byte (repeat flag and day bits)
+        :type repeat_byte: int
+        :param execution_s: The time to execute at, in seconds since midnight
+        :type execution_s: int
+        :param exec_type: The type of execution that occurs
+        :type exec_type: AlarmExecType
+        :param exec_action: The action to execute
+        :type exec_action: AlarmExecAction
+        :param num_continuous_actions: For AlarmExecType.REPEAT_N_TIMES_AT_INTERVAL
+        :type num_continuous_actions: int
+        :param interval_s: The interval in seconds
+        :type interval_s: int
+        :return: The alarm info
+        :rtype: AlarmInfo
+        """
+        info = cls.__new__(cls)
+        info.execute_repeatedly = repeat_byte >> 7 == 0
+        info.exec_type = exec_type
+        info.exec_action = exec_action
+        info.num_continuous_actions = num_continuous_actions
+        info._valid_days = None
+        info._execution_time = None
+        info._interval = None
+        info._repeat_byte = repeat_byte
+        info._execution_s = execution_s
+        info._interval_s = interval_s
+        return info
+
+    @property
+    def valid_days(self) -> List[DayOfWeek]:
+        """
+        If execute_repeatedly is true, this is the list of days to execute on
+        """
+        if self._valid_days is None:
+            self._valid_days = days_from_mask(self._repeat_byte)
+        return self._valid_days
+
+    @valid_days.setter
+    def valid_days(self, valid_days: List[DayOfWeek]):
+        self._valid_days = valid_days
+
+    @property
+    def execution_time(self) -> timedelta:
+        """
+        The time to execute at
+        """
+        if self._execution_time is None:
+            self._execution_time = timedelta(seconds=self._execution_s)
+        return self._execution_time
+
+    @execution_time.setter
+    def execution_time(self, execution_time: timedelta):
+        self._execution_time = execution_time
+
+    @property
+    def interval(self) -> timedelta:
+        """
+        If execute_repeatedly is true, Max 5 hours, seconds in steps of 10
+        """
+        if self._interval is None:
+            self._interval = timedelta(seconds=self._interval_s)
+        return self._interval
+
+    @interval.setter
+    def interval(self, interval: timedelta):
+        self._interval = interval
+
+    def _values(self) -> Tuple[Any, ...]:
+        return (
+            self.execute_repeatedly,
+            self.valid_days,
+            self.execution_time,
+            self.exec_type,
+            self.exec_action,
+            self.num_continuous_actions,
+            self.interval,
+        )
+
+    def __eq__(self, other: object) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self._values() == other._values()
+
+    # Mutable, like the dataclass it replaces
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return (
+            f"AlarmInfo(execute_repeatedly={self.execute_repeatedly!r}, valid_days={self.valid_days!r}, "
+            f"execution_time={self.execution_time!r}, exec_type={self.exec_type!r}, "
+            f"exec_action={self.exec_action!r}, num_continuous_actions={self.num_continuous_actions!r}, "
+            f"interval={self.interval!r})"
+        )
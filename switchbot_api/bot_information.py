@@ -3,15 +3,64 @@ Python-Switchbot-BLE: A Python library for interfacing with Switchbot devices ov
 Copyright (C) 2023  Benjamin Carlson
 '''
 
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Tuple, Union
+import logging
+import struct
 import zlib
-from datetime import timedelta
 
 from .bot_types import SwitchBotDeviceType, SwitchBotMode, SwitchBotGroup
-from .alarm_info import AlarmInfo, AlarmExecAction, AlarmExecType, DayOfWeek
+from .alarm_info import AlarmInfo, AlarmExecAction, AlarmExecType
+
+_LOGGER = logging.getLogger(__name__)
+
+# Buffers the decoders accept, memoryviews let callers decode part of a notification without copying it
+ByteData = Union[bytes, bytearray, memoryview]
+
+# Battery, firmware, strength, ADC value, motor calibration, timer number, action mode,
+# hold-and-press times, encryption/device type byte, status byte
+_BASIC_INFO = struct.Struct(">BBBHHBBBBB")
+
+# Alarm count, alarm index, repeat/days byte, hour, minute, execution type, action,
+# number of actions, interval hours, interval minutes, interval seconds
+_ALARM_INFO = struct.Struct(">11B")
+
+_DEVICE_TYPES = {device_type.value: device_type for device_type in SwitchBotDeviceType}
+
+_BOT_MODES = (SwitchBotMode.ONE_STATE, SwitchBotMode.ON_OFF_STATE)
+
+# Group membership for each value of the 4 group bits of the status byte
+_GROUPS_BY_BITS = tuple(
+    tuple(group for group in SwitchBotGroup if (bits & group.value) == group.value) for bits in range(16)
+)
+
+# Smallest group bits decoding to each membership, for encoding
+_BITS_BY_GROUPS = {groups: bits for bits, groups in reversed(list(enumerate(_GROUPS_BY_BITS)))}
 
 
 class BotInformation:
+    __slots__ = (
+        "_remaining_battery_percent",
+        "_firmware_version",
+        "_push_button_strength",
+        "_sensor_adc_value",
+        "_motor_calibration_val",
+        "_time_number",
+        "_bot_act_mode",
+        "_hold_and_press_times",
+        "_is_encrypted",
+        "_device_type",
+        "_bot_mode",
+        "_is_off",
+        "_encryption_type",
+        "_device_groups",
+        "_current_pass_str",
+        "_current_pass_checksum",
+        "_security_generation",
+        "_current_timestamp",
+        "_alarm_count",
+        "_alarm_infos",
+    )
+
     def __init__(self, get_info_byte_array: Optional[bytearray] = None):
         """
         Initialize information class with "Get Information" bytes if present
@@ -41,11 +90,15 @@ class BotInformation:
 
         self._encryption_type = 0  # (0 = standard checksum, 1 = TBD)
 
-        self._device_groups: List[SwitchBotGroup] = []
+        # Shared tuples of _GROUPS_BY_BITS, no allocation per snapshot
+        self._device_groups: Tuple[SwitchBotGroup, ...] = ()
 
         self._current_pass_str: Optional[str] = None
         self._current_pass_checksum: Optional[bytearray] = None
 
+        # Incremented when the password or the encryption flag changes
+        self._security_generation = 0
+
         # End Device Info
 
         # Start time management info
@@ -55,50 +108,91 @@ class BotInformation:
 
         self._alarm_count = 0
 
-        self._alarm_infos: Dict[int, AlarmInfo] = {}
+        # Created with the first alarm, most snapshots never hold any
+        self._alarm_infos: Optional[Dict[int, AlarmInfo]] = None
         # End time management info
 
         if get_info_byte_array is not None:
             self._init_from_byte_array(get_info_byte_array)
 
-    def _init_from_byte_array(self, get_info_byte_array: bytearray):
+    def update_basic_info(self, get_info_byte_array: ByteData) -> None:
+        """
+        Update the basic device info from "Get Information" bytes, keeping password and time management info
+
+        :param get_info_byte_array: The byte data from the Get Information request
+        :type get_info_byte_array: Union[bytes, bytearray, memoryview]
+        """
+        curr_password = self.password_str
+        was_encrypted = self._is_encrypted
+        generation = self._security_generation
+        self._init_from_byte_array(get_info_byte_array)
+        # The password is not part of the response, restore it (and the encryption flag derived from it)
+        self.password_str = curr_password
+        # Reading the flag and restoring it is one change at most, packets only go stale if it differs
+        self._security_generation = generation if self._is_encrypted == was_encrypted else generation + 1
+
+    def _init_from_byte_array(self, get_info_byte_array: ByteData):
         """
         Initialize data from "Get Information" bytes
 
         :param get_info_byte_array: The byte data from the Get Information request
-        :type get_info_byte_array: bytearray
+        :type get_info_byte_array: Union[bytes, bytearray, memoryview]
         """
         if len(get_info_byte_array) != 12:
             raise ValueError(
                 f"Invalid byte array length ({len(get_info_byte_array)})for BotInformation"
             )
 
-        # For 1 byte values
-        int_data = [int(byte) for byte in get_info_byte_array]
+        (
+            self._remaining_battery_percent,  # 0-100
+            firmware_version,
+            self._push_button_strength,  # 0-100
+            self._sensor_adc_value,  # Analog Digital Converter value
+            self._motor_calibration_val,  # Motor calibration value
+            self._time_number,  # Number of the timer?
+            self._bot_act_mode,  # Bot action mode, TOOD: Convert to new enum
+            self._hold_and_press_times,  # Hold-and-press times
+            enc_dev_type_byte,
+            status_byte,
+        ) = _BASIC_INFO.unpack(get_info_byte_array)
 
-        self._remaining_battery_percent = int_data[0]  # 0-100
-        self._firmware_version: float = int_data[1] * 0.1  # 44 * 0.1 = 4.4 Firmware version
-        self._push_button_strength = int_data[2]  # 0-100
+        self._firmware_version = firmware_version * 0.1  # 44 * 0.1 = 4.4 Firmware version
 
-        self._sensor_adc_value = int.from_bytes(
-            get_info_byte_array[3:5], byteorder="big"
-        )  # Analog Digital Converter value
-        self._motor_calibration_val = int.from_bytes(
-            get_info_byte_array[5:7], byteorder="big"
-        )  # Motor calibration value
+        self._read_service_header(enc_dev_type_byte, status_byte)
 
-        self._time_number = int_data[7]  # Number of the timer?
-        self._bot_act_mode = int_data[8]  # Bot action mode, TOOD: Convert to new enum
-        self._hold_and_press_times = int_data[9]  # Hold-and-press times
+    def basic_info_bytes(self) -> bytes:
+        """
+        Encode the basic device info as "Get Information" bytes (the inverse of ``update_basic_info``)
 
-        self.read_service_bytes(get_info_byte_array[10:12])
+        :return: The 12 bytes of a Get Information response payload
+        :rtype: bytes
+        """
+        enc_dev_type_byte = (0x80 if self._is_encrypted else 0x00) | self._device_type.value
+        status_byte = (
+            _BOT_MODES.index(self._bot_mode) << 7
+            | (0x40 if self._is_off else 0x00)
+            | (0x20 if self._encryption_type else 0x00)
+            | _BITS_BY_GROUPS.get(self._device_groups, 0)
+        )
+        return _BASIC_INFO.pack(
+            self._remaining_battery_percent,
+            round(self._firmware_version * 10),
+            self._push_button_strength,
+            self._sensor_adc_value,
+            self._motor_calibration_val,
+            self._time_number,
+            self._bot_act_mode,
+            self._hold_and_press_times,
+            enc_dev_type_byte,
+            status_byte,
+        )
 
-    def read_service_bytes(self, service_bytes: bytearray) -> None:
+    def read_service_bytes(self, service_bytes: ByteData) -> None:
         """
         Update object from service bytes (either from advertisement or Get Information)
 
         :param service_bytes: Service byte array
-        :type service_bytes: bytearray
+        :type service_bytes: Union[bytes, bytearray, memoryview]
         """
         if len(service_bytes) < 2 or len(service_bytes) > 3:
             raise ValueError(
@@ -106,26 +200,41 @@ class BotInformation:
             )
 
         # Might be little endian for broadcasting, currently assuming big endian (from BLE requests)
+        self._read_service_header(service_bytes[0], service_bytes[1])
 
-        # Handle Encrypted/Device Type Byte
-        enc_dev_type_byte = service_bytes[0]
+        if len(service_bytes) > 2:
+            update_utc_flag_bat_byte = service_bytes[2]
 
-        self._is_encrypted = (enc_dev_type_byte & 0x80) == 0x80  # First bit is 1 if encrypted
-        device_type_int = int(enc_dev_type_byte & 0x7F)  # Last 7 bits are the device type
-        try:
-            self._device_type = SwitchBotDeviceType(device_type_int)
-        except ValueError:
-            print(f"Unknown device type: {device_type_int}")
-            pass
-        # End Encrypted/Device Type Byte
+            does_require_utc_sync = (
+                update_utc_flag_bat_byte & 0x80
+            ) == 0x80  # First bit is if the device requires a UTC sync
 
-        # Handle Status Byte
-        status_byte = service_bytes[1]
+            self._remaining_battery_percent = (
+                update_utc_flag_bat_byte & 0x7F
+            )  # Last 7 bits are the remaining battery percent
 
-        bot_mode_int = int(
-            (status_byte & 0x80) == 0x80
-        )  # First bit is the bot mode (0 = one state, 1 = on/off state)
-        self._bot_mode = SwitchBotMode(bot_mode_int)
+    def _read_service_header(self, enc_dev_type_byte: int, status_byte: int) -> None:
+        """
+        Update object from the encryption/device type byte and the status byte
+
+        :param enc_dev_type_byte: First bit is the encryption flag, the last 7 bits are the device type
+        :type enc_dev_type_byte: int
+        :param status_byte: Bot mode, state, encryption type, update flag and group bits
+        :type status_byte: int
+        """
+        is_encrypted = (enc_dev_type_byte & 0x80) == 0x80  # First bit is 1 if encrypted
+        if is_encrypted != self._is_encrypted:
+            self._is_encrypted = is_encrypted
+            self._security_generation += 1
+        device_type_int = enc_dev_type_byte & 0x7F  # Last 7 bits are the device type
+        device_type = _DEVICE_TYPES.get(device_type_int)
+        if device_type is not None:
+            self._device_type = device_type
+        else:
+            _LOGGER.debug("Unknown device type: %d", device_type_int)
+
+        # First bit is the bot mode (0 = one state, 1 = on/off state)
+        self._bot_mode = _BOT_MODES[status_byte >> 7 & 0x01]
 
         self._is_off = (
             status_byte & 0x40
@@ -140,22 +249,7 @@ class BotInformation:
             status_byte & 0x10
         ) == 0x10  # Fourth bit is if the service data has been updated (0 = no, 1 = yes)
 
-        self._device_groups = [
-            group for group in SwitchBotGroup if (status_byte & group.value) == group.value
-        ]  # Last 4 bits are the device group membership
-
-        # End Status Byte
-
-        if len(service_bytes) > 2:
-            update_utc_flag_bat_byte = service_bytes[2]
-
-            does_require_utc_sync = (
-                update_utc_flag_bat_byte & 0x80
-            ) == 0x80  # First bit is if the device requires a UTC sync
-
-            self._remaining_battery_percent = int(
-                update_utc_flag_bat_byte & 0x7F
-            )  # Last 7 bits are the remaining battery percent
+        self._device_groups = _GROUPS_BY_BITS[status_byte & 0x0F]  # Last 4 bits are the device group membership
 
     # Basic Info Properties
 
@@ -173,17 +267,20 @@ class BotInformation:
         :type password_str: Optional[str]
         """
         if password_str is None:
-            self._is_encrypted = False
-            self._current_pass_str = None
-            self._current_pass_checksum = None
-            return
+            checksum = None
+        elif password_str == self._current_pass_str:
+            checksum = self._current_pass_checksum
+        else:
+            checksum = zlib.crc32(password_str.encode()).to_bytes(4, byteorder="big")
+        is_encrypted = password_str is not None
 
-        self._current_pass_str = password_str
-        self._current_pass_checksum = zlib.crc32(self._current_pass_str.encode()).to_bytes(
-            4, byteorder="big"
-        )
+        # Re-assigning the same password (e.g. update_basic_info) keeps packets built for it valid
+        if checksum != self._current_pass_checksum or is_encrypted != self._is_encrypted:
+            self._security_generation += 1
 
-        self._is_encrypted = True
+        self._current_pass_str = password_str
+        self._current_pass_checksum = checksum
+        self._is_encrypted = is_encrypted
 
     @property
     def password_checksum(self) -> Optional[bytearray]:
@@ -193,6 +290,16 @@ class BotInformation:
     def is_encrypted(self) -> bool:
         return self._is_encrypted
 
+    @property
+    def security_generation(self) -> int:
+        """
+        Changes whenever the password or the encryption flag changes, packets built before are stale
+
+        :return: The generation of the password and encryption state
+        :rtype: int
+        """
+        return self._security_generation
+
     @property
     def remaining_battery_percent(self) -> int:
         return self._remaining_battery_percent
@@ -243,7 +350,7 @@ class BotInformation:
 
     @property
     def device_groups(self) -> List[SwitchBotGroup]:
-        return self._device_groups
+        return list(self._device_groups)
 
     # End Basic Info Properties
 
@@ -262,7 +369,6 @@ class BotInformation:
         :type count: int
         """
         if count < 0 or count > 4:
-            print(f"Invalid alarm count {count}, must be between 0 and 4!")
             raise UserWarning(f"Invalid alarm count {count}, must be between 0 and 4!")
 
         self._alarm_count = count
@@ -280,57 +386,94 @@ class BotInformation:
         :type timestamp: int
         """
         if timestamp < 0:
-            print(f"Invalid timestamp {timestamp}, must be greater than 0!")
             raise UserWarning(f"Invalid timestamp {timestamp}, must be greater than 0!")
         self._current_timestamp = timestamp
 
     @property
     def active_alarms(self) -> List[AlarmInfo]:
-        return [info for _, info in self._alarm_infos.items()]
+        if self._alarm_infos is None:
+            return []
+        return list(self._alarm_infos.values())
 
-    def update_alarm(self, response_data: bytearray):
+    def update_alarm(self, response_data: ByteData) -> AlarmInfo:
         """
         Update alarm info from fetch alarm info request
 
         :param response_data: response bytes
-        :type response_data: bytearray
+        :type response_data: Union[bytes, bytearray, memoryview]
+        :return: The updated alarm info
+        :rtype: AlarmInfo
         """
         if len(response_data) != 11:
-            print(
-                f"Could not update alarm, invalid response data length {len(response_data)} (Must be 11)"
-            )
-
-        alarm_count = response_data[0]
-        alarm_idx = response_data[1]
-
-        exec_repeatedly = response_data[2] >> 7 == 0
-
-        valid_days: List[DayOfWeek] = []
-
-        for dow in DayOfWeek:
-            if response_data[2] & (1 << dow.value) == 1:
-                valid_days.append(dow)
-
-        exec_time = timedelta(hours=response_data[3], minutes=response_data[4])
-
-        exec_type = AlarmExecType(response_data[5])
-        exec_action = AlarmExecAction(response_data[6])
-
-        action_count = response_data[7]
-
-        exec_interval = timedelta(
-            hours=response_data[8], minutes=response_data[9], seconds=response_data[10]
-        )
-
-        info = AlarmInfo(
-            exec_repeatedly,
-            valid_days,
-            exec_time,
+            _LOGGER.warning("Could not update alarm, invalid response data length %d (Must be 11)", len(response_data))
+
+        (
+            alarm_count,
+            alarm_idx,
+            repeat_byte,
+            exec_hours,
+            exec_minutes,
             exec_type,
             exec_action,
             action_count,
-            exec_interval,
+            interval_hours,
+            interval_minutes,
+            interval_seconds,
+        ) = _ALARM_INFO.unpack_from(response_data)
+
+        # The days and timedeltas are built when read
+        info = AlarmInfo._from_raw(
+            repeat_byte,
+            exec_hours * 3600 + exec_minutes * 60,
+            AlarmExecType(exec_type),
+            AlarmExecAction(exec_action),
+            action_count,
+            interval_hours * 3600 + interval_minutes * 60 + interval_seconds,
         )
 
         self._alarm_count = alarm_count
+        if self._alarm_infos is None:
+            self._alarm_infos = {}
         self._alarm_infos[alarm_idx] = info
+
+        return info
+
+    def alarm_info_bytes(self, alarm_id: int) -> bytes:
+        """
+        Encode a known alarm as "Get Alarm Info" bytes (the inverse of ``update_alarm``)
+
+        :param alarm_id: The ID of the alarm
+        :type alarm_id: int
+        :raises KeyError: The alarm has not been fetched
+        :return: The 11 bytes of an alarm info response payload
+        :rtype: bytes
+        """
+        if self._alarm_infos is None:
+            raise KeyError(alarm_id)
+        info = self._alarm_infos[alarm_id]
+
+        repeat_byte = 0x00 if info.execute_repeatedly else 0x80
+        for dow in info.valid_days:
+            repeat_byte |= 0x1 << dow.value
+
+        exec_seconds = info.execution_time.seconds
+        interval_seconds = info.interval.seconds
+        return _ALARM_INFO.pack(
+            self._alarm_count,
+            alarm_id,
+            repeat_byte,
+            exec_seconds // 3600,
+            exec_seconds // 60 % 60,
+            info.exec_type.value,
+            info.exec_action.value,
+            info.num_continuous_actions,
+            interval_seconds // 3600,
+            interval_seconds // 60 % 60,
+            interval_seconds % 60,
+        )
+
+    @property
+    def alarm_ids(self) -> List[int]:
+        if self._alarm_infos is None:
+            return []
+        return list(self._alarm_infos)
@@ -0,0 +1,148 @@
+'''
+Python-Switchbot-BLE: A Python library for interfacing with Switchbot devices over Bluetooth Low Energy (BLE)
+Copyright (C) 2023  Benjamin Carlson
+'''
+
+from dataclasses import dataclass
+from typing import Generic, Optional, TypeVar
+
+from .bot_types import SwitchBotReqType, SwitchBotRespStatus
+
+__all__ = [
+    "SwitchBotResponse",
+    "SwitchBotError",
+    "SwitchBotResponseError",
+    "SwitchBotDecodeError",
+    "SwitchBotTimeoutError",
+    "SwitchBotNotFoundError",
+    "SwitchBotDisconnectedError",
+    "SwitchBotCircuitOpenError",
+    "SwitchBotReplayError",
+]
+
+
+# The type of the decoded payload, set by the request's ResponseDecoder
+_ValueT = TypeVar("_ValueT")
+
+
+@dataclass
+class SwitchBotResponse(Generic[_ValueT]):
+    '''
+    A decoded response to a single request sent to the SwitchBot
+    '''
+
+    # The type of request this is the response to
+    request_type: SwitchBotReqType
+
+    # The status byte of the response
+    status: SwitchBotRespStatus
+
+    # The raw response payload (without the status byte)
+    data: bytes
+
+    # The decoded payload (e.g. alarm count, timestamp, AlarmInfo), None if the response has no payload
+    value: Optional[_ValueT] = None
+
+    @property
+    def is_ok(self) -> bool:
+        return self.status == SwitchBotRespStatus.OK
+
+
+class SwitchBotError(UserWarning):
+    '''
+    Base class for errors raised while communicating with a SwitchBot
+    '''
+
+
+class SwitchBotResponseError(SwitchBotError):
+    '''
+    Raised when the SwitchBot answers a request with a non-OK status
+    '''
+
+    def __init__(self, response: SwitchBotResponse):
+        super().__init__(
+            f"{response.request_type.name} request failed with status {response.status.name} ({response.status.value})"
+        )
+        self.response = response
+
+    @property
+    def status(self) -> SwitchBotRespStatus:
+        return self.response.status
+
+
+class SwitchBotDecodeError(SwitchBotError):
+    '''
+    Raised when an OK response cannot be decoded (e.g. a payload too short for the request type)
+    '''
+
+    def __init__(self, response: SwitchBotResponse, error: Exception):
+        super().__init__(
+            f"Could not decode {response.request_type.name} response {response.data.hex()} ({error!r})"
+        )
+        self.response = response
+        self.error = error
+
+    @property
+    def data(self) -> bytes:
+        return self.response.data
+
+
+class SwitchBotTimeoutError(SwitchBotError):
+    '''
+    Raised when no response (or awaited state) is received in time
+    '''
+
+    def __init__(
+        self,
+        request_type: Optional[SwitchBotReqType],
+        timeout: float,
+        waiting_for: Optional[str] = None,
+    ):
+        if waiting_for is None:
+            name = request_type.name if request_type is not None else "Unknown"
+            waiting_for = f"{name} response"
+        super().__init__(f"Timed out after {timeout}s waiting for {waiting_for}")
+        self.request_type = request_type
+        self.timeout = timeout
+
+
+class SwitchBotNotFoundError(SwitchBotError):
+    '''
+    Raised when the SwitchBot could not be found by scanning
+    '''
+
+    def __init__(self, mac_address: str):
+        super().__init__(f"Device not found for MAC Address {mac_address}")
+        self.mac_address = mac_address
+
+
+
+class SwitchBotDisconnectedError(SwitchBotError):
+    '''
+    Raised in requests still waiting for a response when the connection to the SwitchBot is closed or lost
+    '''
+
+    def __init__(self, mac_address: str):
+        super().__init__(f"Disconnected from SwitchBot ({mac_address})")
+        self.mac_address = mac_address
+
+
+class SwitchBotCircuitOpenError(SwitchBotError):
+    '''
+    Raised instead of sending a request to a SwitchBot that keeps failing
+    '''
+
+    def __init__(self, retry_in_s: float):
+        super().__init__(f"SwitchBot keeps failing, not sending requests for another {retry_in_s:.1f}s")
+        self.retry_in_s = retry_in_s
+
+
+class SwitchBotReplayError(SwitchBotError):
+    '''
+    Raised when a request does not match the next request of a replayed capture
+    '''
+
+    def __init__(self, message: str, expected: Optional[bytes] = None, actual: Optional[bytes] = None):
+        super().__init__(message)
+        self.expected = expected
+        self.actual = actual
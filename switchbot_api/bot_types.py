@@ -4,13 +4,12 @@ Copyright (C) 2023  Benjamin Carlson
 '''
 
 import enum
-import enum_tools.documentation
 
-__all__ = ["SwitchBotCommand", "SwitchBotReqType", "SwitchBotAction", "SwitchBotMode", "TimeManagementInfoSubCommand", "SwitchBotGroup", "SwitchBotDeviceType", "SwitchBotRespStatus", "f_bytes"]
+from ._docs import document_enum
 
-enum_tools.documentation.INTERACTIVE = True
+__all__ = ["SwitchBotCommand", "SwitchBotReqType", "SwitchBotAction", "SwitchBotMode", "TimeManagementInfoSubCommand", "SwitchBotGroup", "SwitchBotDeviceType", "SwitchBotRespStatus", "SwitchBotMetadata", "f_bytes", "LazyHex"]
 
-@enum_tools.documentation.document_enum
+@document_enum
 class SwitchBotCommand(enum.Enum):
     '''
     Generally known UUIDS for the SwitchBot (Bot)
@@ -26,7 +25,7 @@ class SwitchBotCommand(enum.Enum):
     CLIENT_CHAR_CONFIG_UUID = "00002902-0000-1000-8000-00805f9b34fb"
     GENERIC_ATTRIB_PROFILE_UUID = "00001801-0000-1000-8000-00805f9b34fb"
 
-@enum_tools.documentation.document_enum
+@document_enum
 class SwitchBotReqType(enum.Enum):
     '''
     The type of request to send to the SwitchBot
@@ -40,7 +39,7 @@ class SwitchBotReqType(enum.Enum):
     EXTENDED_COMMAND = 0x0F
     CLEAR_PASSWORD = 0x17
 
-@enum_tools.documentation.document_enum
+@document_enum
 class SwitchBotAction(enum.Enum):
     '''
     The action to execute on a COMMAND request
@@ -51,7 +50,7 @@ class SwitchBotAction(enum.Enum):
     PUSH_STOP = 0x03 # doc: Push and leave
     BACK = 0x04 # doc: Pull and leave
 
-@enum_tools.documentation.document_enum
+@document_enum
 class SwitchBotMode(enum.Enum):
     '''
     The type of mode to enable for the SwitchBot
@@ -59,7 +58,7 @@ class SwitchBotMode(enum.Enum):
     ONE_STATE = 0x0 # doc: Single action state
     ON_OFF_STATE = 0x1 # doc: On/Off state
 
-@enum_tools.documentation.document_enum
+@document_enum
 class TimeManagementInfoSubCommand(enum.Enum):
     '''
     The subcommand to send to the SwitchBot for time management
@@ -70,7 +69,7 @@ class TimeManagementInfoSubCommand(enum.Enum):
 
 
 # Unsure on the use of this, probbaly a larger ecosystem thing
-@enum_tools.documentation.document_enum
+@document_enum
 class SwitchBotGroup(enum.Enum):
     '''
     The group that the device belongs to
@@ -82,7 +81,7 @@ class SwitchBotGroup(enum.Enum):
 
 
 
-@enum_tools.documentation.document_enum
+@document_enum
 class SwitchBotDeviceType(enum.Enum):
     '''
     The type of device that the SwitchBot is
@@ -108,7 +107,7 @@ class SwitchBotDeviceType(enum.Enum):
     MOTION_SENSOR_PAIR = 0x53  # Pair mode
     MOTION_SENSOR = 0x73
 
-@enum_tools.documentation.document_enum
+@document_enum
 class SwitchBotRespStatus(enum.Enum):
     '''
     The status of the response from the SwitchBot
@@ -127,6 +126,17 @@ class SwitchBotRespStatus(enum.Enum):
     NO_NEARBY_MESH_DEVICE = 0x0B
     FAILED_NETWORK_CONNECTION = 0x0C
 
+@document_enum
+class SwitchBotMetadata(enum.Flag):
+    '''
+    The device metadata that can be fetched when connecting (or lazily afterwards)
+    '''
+    NONE = 0 # doc: Fetch nothing
+    BASIC_INFO = 1 # doc: Battery, firmware, mode and state
+    ALARM_COUNT = 2 # doc: Number of alarms set
+    SYSTEM_TIME = 4 # doc: Device unix timestamp
+    ALL = BASIC_INFO | ALARM_COUNT | SYSTEM_TIME # doc: Fetch everything
+
 
 # Technically doesn't belong here but should be accessible everywhere
 def f_bytes(data: bytearray) -> str:
@@ -139,3 +149,23 @@ def f_bytes(data: bytearray) -> str:
     :rtype: str
     """
     return " ".join(hex(x) for x in data)
+
+
+class LazyHex:
+    '''
+    Defers ``f_bytes`` formatting until the value is rendered, for log arguments
+
+    .. code-block:: python
+
+        _LOGGER.debug("Sent %s", LazyHex(packet))  # Only formatted if DEBUG is enabled
+    '''
+
+    __slots__ = ("_data",)
+
+    def __init__(self, data: bytes) -> None:
+        self._data = data
+
+    def __str__(self) -> str:
+        return f_bytes(self._data)
+
+    __repr__ = __str__
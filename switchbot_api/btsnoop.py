@@ -0,0 +1,617 @@
+'''
+Python-Switchbot-BLE: A Python library for interfacing with Switchbot devices over Bluetooth Low Energy (BLE)
+Copyright (C) 2023  Benjamin Carlson
+'''
+
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, Optional, Tuple, Union
+import mmap
+import os
+import struct
+import uuid
+
+from .bot_types import (
+    SwitchBotCommand,
+    SwitchBotReqType,
+    SwitchBotRespStatus,
+)
+from .bot_information import BotInformation
+from .response_decoders import default_decoders
+
+__all__ = [
+    "BtsnoopRecord",
+    "BtsnoopReader",
+    "CapturedAdvertisement",
+    "CapturedRequest",
+    "CapturedResponse",
+    "read_capture",
+    "decode_response",
+]
+
+BTSNOOP_MAGIC = b"btsnoop\x00"
+
+# Datalink types, H1 carries the packet type in the record flags, H4 in the first byte
+DATALINK_HCI_H1 = 1001
+DATALINK_HCI_H4 = 1002
+
+# btsnoop timestamps are microseconds since 0000-01-01, this is 1970-01-01
+_BTSNOOP_UNIX_EPOCH_US = 0x00DCDDB30F2F8000
+
+_FILE_HEADER = struct.Struct(">8sII")
+_RECORD_HEADER = struct.Struct(">IIIIq")
+_U16 = struct.Struct("<H")
+_ACL_HEADER = struct.Struct("<HH")
+_L2CAP_HEADER = struct.Struct("<HH")
+
+_H4_ACL = 0x02
+_H4_EVENT = 0x04
+
+_HCI_EVENT_LE_META = 0x3E
+_LE_CONNECTION_COMPLETE = 0x01
+_LE_ADVERTISING_REPORT = 0x02
+_LE_ENHANCED_CONNECTION_COMPLETE = 0x0A
+_LE_EXTENDED_ADVERTISING_REPORT = 0x0D
+
+_L2CAP_ATT_CID = 0x0004
+_ACL_PB_CONTINUATION = 0x01
+
+# Requests whose first payload byte is a subcommand
+_SUBCOMMAND_REQUESTS = frozenset({SwitchBotReqType.GET_TIME_MGMT_INFO, SwitchBotReqType.SET_TIME_MGMT_INFO})
+
+# Byte VirtualSwitchBot writes before the payload of time management updates (subcommands are 0x1-0x3)
+_SET_TIME_MGMT_PREFIX = 0x08
+
+# Advertisers whose scan response state is kept, the least recently heard are forgotten beyond it
+DEFAULT_MAX_ADVERTISERS = 4096
+
+_ATT_READ_BY_TYPE_RESPONSE = 0x09
+_ATT_WRITE_REQUEST = 0x12
+_ATT_WRITE_COMMAND = 0x52
+_ATT_HANDLE_VALUE_NOTIFICATION = 0x1B
+
+_AD_SHORT_LOCAL_NAME = 0x08
+_AD_COMPLETE_LOCAL_NAME = 0x09
+_AD_SERVICE_DATA_16 = 0x16
+_AD_SERVICE_DATA_128 = 0x21
+_AD_MANUFACTURER_DATA = 0xFF
+
+_REQ_CHAR_UUID_BYTES = uuid.UUID(SwitchBotCommand.REQ_CHAR_UUID.value).bytes[::-1]
+_RESP_CHAR_UUID_BYTES = uuid.UUID(SwitchBotCommand.RESP_CHAR_UUID.value).bytes[::-1]
+
+
+@dataclass
+class BtsnoopRecord:
+    '''
+    A raw HCI packet of a btsnoop capture
+    '''
+
+    # Packet type as an H4 indicator (0x01 command, 0x02 ACL, 0x03 SCO, 0x04 event)
+    packet_type: int
+
+    # True if the packet was received from the controller, False if sent by the host
+    is_received: bool
+
+    # Capture time (UNIX seconds)
+    timestamp: float
+
+    # The HCI packet without its type indicator, a view into the capture valid until the reader is closed
+    data: memoryview
+
+
+@dataclass
+class CapturedAdvertisement:
+    '''
+    An LE advertising report (scan responses merged in), usable as ``bleak.AdvertisementData``
+    '''
+
+    timestamp: float
+    address: str
+    rssi: int
+    manufacturer_data: Dict[int, bytes] = field(default_factory=dict)
+    service_data: Dict[str, bytes] = field(default_factory=dict)
+    local_name: Optional[str] = None
+
+    def bot_information(self, service_uuid: str = "00000d00-0000-1000-8000-00805f9b34fb") -> Optional[BotInformation]:
+        """
+        Decode the advertised SwitchBot state
+
+        :param service_uuid: UUID of the SwitchBot service data
+        :type service_uuid: str
+        :return: The advertised state, None if the advertisement has no SwitchBot service data
+        :rtype: Optional[BotInformation]
+        """
+        service_data = self.service_data.get(service_uuid)
+        if service_data is None:
+            return None
+
+        info = BotInformation()
+        info.read_service_bytes(bytearray(service_data))
+        return info
+
+
+@dataclass
+class CapturedRequest:
+    '''
+    A request written to the REQ characteristic
+    '''
+
+    timestamp: float
+    connection_handle: int
+    att_handle: int
+    data: bytes
+    # Peer address of the connection, None if the connection was established before the capture started
+    address: Optional[str] = None
+
+    @property
+    def request_type(self) -> Optional[SwitchBotReqType]:
+        if len(self.data) < 2:
+            return None
+        try:
+            return SwitchBotReqType(self.data[1] & 0x0F)
+        except ValueError:
+            return None
+
+    @property
+    def is_encrypted(self) -> bool:
+        return len(self.data) >= 2 and (self.data[1] >> 4) & 0x01 == 0x01
+
+    @property
+    def subcommand(self) -> Optional[int]:
+        """
+        The subcommand of time management requests (low 4 bits of the first payload byte)
+
+        :return: The subcommand (see TimeManagementInfoSubCommand), None for other requests
+        :rtype: Optional[int]
+        """
+        request_type = self.request_type
+        if request_type not in _SUBCOMMAND_REQUESTS:
+            return None
+        index = 2
+        if request_type == SwitchBotReqType.SET_TIME_MGMT_INFO and self.data[2:3] == bytes([_SET_TIME_MGMT_PREFIX]):
+            index += 1
+        # The password checksum comes first in encrypted requests
+        if self.is_encrypted:
+            index += 4
+        if len(self.data) <= index:
+            return None
+        return self.data[index] & 0x0F
+
+
+@dataclass
+class CapturedResponse:
+    '''
+    A notification of the RESP characteristic, with the request it answers
+    '''
+
+    timestamp: float
+    connection_handle: int
+    att_handle: int
+    data: bytes
+    request: Optional[CapturedRequest] = None
+    address: Optional[str] = None
+
+    @property
+    def status(self) -> SwitchBotRespStatus:
+        try:
+            return SwitchBotRespStatus(self.data[0])
+        except (IndexError, ValueError):
+            return SwitchBotRespStatus.UNKNOWN
+
+    @property
+    def payload(self) -> bytes:
+        return self.data[1:]
+
+    def decode(self, info: Optional[BotInformation] = None) -> Any:
+        """
+        Decode the response payload with the library's parsers
+
+        :param info: Information to update, a new BotInformation if None
+        :type info: Optional[BotInformation]
+        :return: The decoded payload (see ``decode_response``), None if not OK or unknown
+        :rtype: Any
+        """
+        if self.status != SwitchBotRespStatus.OK or self.request is None or self.request.request_type is None:
+            return None
+        return decode_response(
+            self.request.request_type,
+            self.payload,
+            info if info is not None else BotInformation(),
+            self.request.subcommand,
+        )
+
+
+CaptureEvent = Union[CapturedAdvertisement, CapturedRequest, CapturedResponse]
+
+
+def decode_response(
+    request_type: SwitchBotReqType, payload: bytes, info: BotInformation, subcommand: Optional[int] = None
+) -> Any:
+    """
+    Decode an OK response payload into ``info`` with the library's response decoders
+
+    :param request_type: The type of request answered
+    :type request_type: SwitchBotReqType
+    :param payload: The response without its status byte
+    :type payload: bytes
+    :param info: Information updated from the payload
+    :type info: BotInformation
+    :param subcommand: The subcommand of the request (see ``CapturedRequest.subcommand``)
+    :type subcommand: Optional[int]
+    :return: ``info`` for basic info, the alarm count, system time or AlarmInfo for time management,
+        None if the request has no decoder or the payload does not match it
+    :rtype: Any
+    """
+    try:
+        return default_decoders.decode(request_type, subcommand, payload, info)
+    except (ValueError, IndexError, struct.error):
+        return None
+
+
+def _format_address(address: memoryview) -> str:
+    # Addresses are little endian on the wire
+    return ":".join(f"{byte:02X}" for byte in reversed(bytes(address)))
+
+
+def _uuid16_to_str(value: int) -> str:
+    return f"0000{value:04x}-0000-1000-8000-00805f9b34fb"
+
+
+class BtsnoopReader:
+    def __init__(self, path: Union[str, "os.PathLike[str]"]) -> None:
+        """
+        Streaming reader of btsnoop HCI captures (e.g. Android's ``btsnoop_hci.log``)
+
+        The file is memory mapped and records are decoded as they are iterated, so
+        captures of any size are read in constant memory.
+
+        .. code-block:: python
+
+            with BtsnoopReader("notes/switchbot_pass_onoff.log") as reader:
+                for event in reader.events():
+                    print(event)
+
+        :param path: Path of the capture
+        :type path: Union[str, os.PathLike[str]]
+        :raises ValueError: The file is not a supported btsnoop capture
+        """
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty file
+            self._file.close()
+            raise ValueError(f"{path} is not a btsnoop capture")
+
+        if len(self._map) < _FILE_HEADER.size:
+            self.close()
+            raise ValueError(f"{path} is not a btsnoop capture")
+
+        magic, self._version, self._datalink = _FILE_HEADER.unpack_from(self._map, 0)
+        if magic != BTSNOOP_MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a btsnoop capture")
+        if self._datalink not in (DATALINK_HCI_H1, DATALINK_HCI_H4):
+            self.close()
+            raise ValueError(f"Unsupported btsnoop datalink type {self._datalink}")
+
+        # Characteristic value handles, learnt from GATT discovery if present in the capture
+        self.req_handle: Optional[int] = None
+        self.resp_handle: Optional[int] = None
+
+    @property
+    def datalink(self) -> int:
+        return self._datalink
+
+    def records(self) -> Iterator[BtsnoopRecord]:
+        """
+        Every HCI packet of the capture
+
+        :return: Iterator over the records, ``data`` views are only valid while the reader is open
+        :rtype: Iterator[BtsnoopRecord]
+        """
+        view = memoryview(self._map)
+        size = len(view)
+        offset = _FILE_HEADER.size
+        is_h1 = self._datalink == DATALINK_HCI_H1
+
+        try:
+            while offset + _RECORD_HEADER.size <= size:
+                _, included_len, flags, _, timestamp_us = _RECORD_HEADER.unpack_from(view, offset)
+                offset += _RECORD_HEADER.size
+                if offset + included_len > size:
+                    # Truncated capture
+                    break
+
+                data = view[offset:offset + included_len]
+                offset += included_len
+
+                if is_h1:
+                    # Bit 1: command/event (else ACL), bit 0: received (else sent)
+                    packet_type = _H4_EVENT if flags & 0x02 else _H4_ACL
+                    if flags & 0x03 == 0x02:
+                        packet_type = 0x01
+                else:
+                    if included_len == 0:
+                        continue
+                    packet_type = data[0]
+                    data = data[1:]
+
+                yield BtsnoopRecord(
+                    packet_type,
+                    flags & 0x01 == 0x01,
+                    (timestamp_us - _BTSNOOP_UNIX_EPOCH_US) / 1_000_000,
+                    data,
+                )
+        finally:
+            view.release()
+
+    def events(
+        self,
+        include_advertisements: bool = True,
+        include_att: bool = True,
+        max_advertisers: int = DEFAULT_MAX_ADVERTISERS,
+    ) -> Iterator[CaptureEvent]:
+        """
+        SwitchBot traffic of the capture: advertisements, requests and responses, in capture order
+
+        Requests are ATT writes starting with the SwitchBot magic byte (or to the REQ characteristic
+        if the capture contains GATT discovery) and responses are the notifications that follow them
+        on the same connection.
+
+        :param include_advertisements: Yield advertising reports
+        :type include_advertisements: bool
+        :param include_att: Yield requests and responses
+        :type include_att: bool
+        :param max_advertisers: Advertisers whose scan responses are merged, memory is bounded by it
+        :type max_advertisers: int
+        :return: Iterator over the events
+        :rtype: Iterator[Union[CapturedAdvertisement, CapturedRequest, CapturedResponse]]
+        """
+        # Per connection state, bounded by the number of simultaneous connections
+        peer_addresses: Dict[int, str] = {}
+        last_requests: Dict[int, CapturedRequest] = {}
+        # ACL fragments being reassembled, by (direction, connection handle)
+        fragments: Dict[Tuple[bool, int], Tuple[float, bytearray, int]] = {}
+        # Scan responses are merged into the advertising data of the same address, as bleak does.
+        # Least recently heard first, an advertiser forgotten beyond max_advertisers starts over
+        advertisements: "OrderedDict[str, CapturedAdvertisement]" = OrderedDict()
+
+        for record in self.records():
+            if record.packet_type == _H4_EVENT:
+                if not record.is_received or len(record.data) < 3 or record.data[0] != _HCI_EVENT_LE_META:
+                    continue
+
+                subevent = record.data[2]
+                if subevent in (_LE_CONNECTION_COMPLETE, _LE_ENHANCED_CONNECTION_COMPLETE):
+                    self._on_connection_complete(record.data, peer_addresses)
+                elif include_advertisements and subevent in (
+                    _LE_ADVERTISING_REPORT,
+                    _LE_EXTENDED_ADVERTISING_REPORT,
+                ):
+                    yield from self._advertising_reports(record, advertisements, max_advertisers)
+                continue
+
+            if record.packet_type != _H4_ACL or not include_att or len(record.data) < _ACL_HEADER.size:
+                continue
+
+            handle_flags, _ = _ACL_HEADER.unpack_from(record.data, 0)
+            connection_handle = handle_flags & 0x0FFF
+            key = (record.is_received, connection_handle)
+            payload = record.data[_ACL_HEADER.size:]
+
+            if (handle_flags >> 12) & 0x03 == _ACL_PB_CONTINUATION:
+                pending = fragments.get(key)
+                if pending is None:
+                    continue
+                timestamp, buffer, expected = pending
+                buffer += payload
+                if len(buffer) < expected:
+                    continue
+                del fragments[key]
+                pdu = memoryview(bytes(buffer))
+            else:
+                if len(payload) < _L2CAP_HEADER.size:
+                    continue
+                l2cap_len, _ = _L2CAP_HEADER.unpack_from(payload, 0)
+                expected = l2cap_len + _L2CAP_HEADER.size
+                if len(payload) < expected:
+                    fragments[key] = (record.timestamp, bytearray(payload), expected)
+                    continue
+                timestamp = record.timestamp
+                pdu = payload
+
+            _, cid = _L2CAP_HEADER.unpack_from(pdu, 0)
+            if cid != _L2CAP_ATT_CID:
+                continue
+
+            event = self._att_event(
+                timestamp, connection_handle, record.is_received, pdu[_L2CAP_HEADER.size:], peer_addresses, last_requests
+            )
+            if event is not None:
+                yield event
+
+    def _on_connection_complete(self, event: memoryview, peer_addresses: Dict[int, str]):
+        # Meta event: code, length, subevent, status, handle (2), role, peer address type, peer address (6)
+        if len(event) < 14 or event[3] != 0x00:
+            return
+        connection_handle = _U16.unpack_from(event, 4)[0] & 0x0FFF
+        peer_addresses[connection_handle] = _format_address(event[8:14])
+
+    def _att_event(
+        self,
+        timestamp: float,
+        connection_handle: int,
+        is_received: bool,
+        att: memoryview,
+        peer_addresses: Dict[int, str],
+        last_requests: Dict[int, CapturedRequest],
+    ) -> Optional[Union[CapturedRequest, CapturedResponse]]:
+        if len(att) < 1:
+            return None
+        opcode = att[0]
+
+        if opcode == _ATT_READ_BY_TYPE_RESPONSE and is_received:
+            self._learn_handles(att)
+            return None
+
+        if len(att) < 3:
+            return None
+        att_handle = _U16.unpack_from(att, 1)[0]
+        value = bytes(att[3:])
+
+        if opcode in (_ATT_WRITE_REQUEST, _ATT_WRITE_COMMAND) and not is_received:
+            is_request = att_handle == self.req_handle if self.req_handle is not None else value[:1] == b"\x57"
+            if not is_request:
+                return None
+            request = CapturedRequest(
+                timestamp, connection_handle, att_handle, value, peer_addresses.get(connection_handle)
+            )
+            last_requests[connection_handle] = request
+            return request
+
+        if opcode == _ATT_HANDLE_VALUE_NOTIFICATION and is_received:
+            if self.resp_handle is not None and att_handle != self.resp_handle:
+                return None
+            # Without GATT discovery, only notifications following a SwitchBot request are responses
+            request = last_requests.pop(connection_handle, None)
+            if request is None and self.resp_handle is None:
+                return None
+            return CapturedResponse(
+                timestamp, connection_handle, att_handle, value, request, peer_addresses.get(connection_handle)
+            )
+
+        return None
+
+    def _learn_handles(self, att: memoryview):
+        # Read By Type response: opcode, entry length, then (handle, value) entries
+        if len(att) < 2:
+            return
+        entry_len = att[1]
+        # Characteristic declaration with a 128 bit UUID: handle (2), properties, value handle (2), UUID (16)
+        if entry_len != 21:
+            return
+        for offset in range(2, len(att) - entry_len + 1, entry_len):
+            value_handle = _U16.unpack_from(att, offset + 3)[0]
+            char_uuid = bytes(att[offset + 5:offset + entry_len])
+            if char_uuid == _REQ_CHAR_UUID_BYTES:
+                self.req_handle = value_handle
+            elif char_uuid == _RESP_CHAR_UUID_BYTES:
+                self.resp_handle = value_handle
+
+    def _advertising_reports(
+        self,
+        record: BtsnoopRecord,
+        advertisements: "OrderedDict[str, CapturedAdvertisement]",
+        max_advertisers: int,
+    ) -> Iterator[CapturedAdvertisement]:
+        event = record.data
+        subevent = event[2]
+        report_count = event[3]
+        offset = 4
+
+        for _ in range(report_count):
+            if subevent == _LE_EXTENDED_ADVERTISING_REPORT:
+                # Event type (2), address type, address (6), PHYs (2), SID, TX power, RSSI,
+                # periodic interval (2), direct address type, direct address (6), data length
+                if offset + 24 > len(event):
+                    return
+                address = _format_address(event[offset + 3:offset + 9])
+                rssi = struct.unpack_from("b", event, offset + 13)[0]
+                data_len = event[offset + 23]
+                data_start = offset + 24
+                offset = data_start + data_len
+            else:
+                # Event type, address type, address (6), data length, data, RSSI
+                if offset + 9 > len(event):
+                    return
+                address = _format_address(event[offset + 2:offset + 8])
+                data_len = event[offset + 8]
+                data_start = offset + 9
+                offset = data_start + data_len + 1
+                if offset > len(event):
+                    return
+                rssi = struct.unpack_from("b", event, offset - 1)[0]
+
+            if data_start + data_len > len(event):
+                return
+
+            advertisement = advertisements.get(address)
+            if advertisement is None:
+                advertisement = CapturedAdvertisement(record.timestamp, address, rssi)
+                advertisements[address] = advertisement
+                if len(advertisements) > max_advertisers:
+                    advertisements.popitem(last=False)
+            else:
+                advertisements.move_to_end(address)
+            advertisement.timestamp = record.timestamp
+            advertisement.rssi = rssi
+            self._parse_ad_structures(event[data_start:data_start + data_len], advertisement)
+
+            # Copy so later reports do not change what the consumer received
+            yield CapturedAdvertisement(
+                advertisement.timestamp,
+                advertisement.address,
+                advertisement.rssi,
+                dict(advertisement.manufacturer_data),
+                dict(advertisement.service_data),
+                advertisement.local_name,
+            )
+
+    def _parse_ad_structures(self, data: memoryview, advertisement: CapturedAdvertisement):
+        offset = 0
+        while offset < len(data):
+            length = data[offset]
+            if length == 0 or offset + 1 + length > len(data):
+                return
+            ad_type = data[offset + 1]
+            value = data[offset + 2:offset + 1 + length]
+            offset += 1 + length
+
+            if ad_type == _AD_MANUFACTURER_DATA and len(value) >= 2:
+                advertisement.manufacturer_data[_U16.unpack_from(value, 0)[0]] = bytes(value[2:])
+            elif ad_type == _AD_SERVICE_DATA_16 and len(value) >= 2:
+                advertisement.service_data[_uuid16_to_str(_U16.unpack_from(value, 0)[0])] = bytes(value[2:])
+            elif ad_type == _AD_SERVICE_DATA_128 and len(value) >= 16:
+                service_uuid = str(uuid.UUID(bytes=bytes(value[:16])[::-1]))
+                advertisement.service_data[service_uuid] = bytes(value[16:])
+            elif ad_type in (_AD_SHORT_LOCAL_NAME, _AD_COMPLETE_LOCAL_NAME):
+                advertisement.local_name = bytes(value).decode("utf-8", errors="replace")
+
+    def close(self):
+        try:
+            self._map.close()
+        except BufferError:
+            # A record view is still referenced, the mapping is released with it
+            pass
+        self._file.close()
+
+    def __enter__(self) -> "BtsnoopReader":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_capture(
+    path: Union[str, "os.PathLike[str]"],
+    include_advertisements: bool = True,
+    include_att: bool = True,
+    max_advertisers: int = DEFAULT_MAX_ADVERTISERS,
+) -> Iterator[CaptureEvent]:
+    """
+    Stream the SwitchBot traffic of a btsnoop capture (see ``BtsnoopReader.events``)
+
+    :param path: Path of the capture
+    :type path: Union[str, os.PathLike[str]]
+    :param include_advertisements: Yield advertising reports
+    :type include_advertisements: bool
+    :param include_att: Yield requests and responses
+    :type include_att: bool
+    :param max_advertisers: Advertisers whose scan responses are merged, memory is bounded by it
+    :type max_advertisers: int
+    :return: Iterator over the events, the capture is closed once exhausted
+    :rtype: Iterator[Union[CapturedAdvertisement, CapturedRequest, CapturedResponse]]
+    """
+    with BtsnoopReader(path) as reader:
+        yield from reader.events(include_advertisements, include_att, max_advertisers)
@@ -0,0 +1,234 @@
+'''
+Python-Switchbot-BLE: A Python library for interfacing with Switchbot devices over Bluetooth Low Energy (BLE)
+Copyright (C) 2023  Benjamin Carlson
+'''
+
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, List, Optional, Tuple
+import asyncio
+import logging
+
+from .bot_types import SwitchBotAction
+from .bot_response import SwitchBotResponse
+from .switchbot import VirtualSwitchBot
+
+_LOGGER = logging.getLogger(__name__)
+
+__all__ = ["SwitchBotCommandQueue", "CommandQueueStats"]
+
+# Commands whose effect is the state they leave the SwitchBot in, only the last one queued matters
+_IDEMPOTENT_STATES = frozenset({SwitchBotAction.ON, SwitchBotAction.OFF})
+
+
+@dataclass
+class CommandQueueStats:
+    '''
+    What a SwitchBotCommandQueue did with the commands given to it
+    '''
+
+    # Commands submitted by callers
+    submitted: int = 0
+
+    # Commands written to the SwitchBot
+    sent: int = 0
+
+    # ON/OFF commands superseded by a later one before being sent (writes saved)
+    coalesced: int = 0
+
+    # Commands dropped because every caller waiting for them was cancelled
+    abandoned: int = 0
+
+
+class _QueuedCommand:
+    """
+    A command waiting to be sent, with the futures of every caller it answers
+    """
+
+    __slots__ = ("action", "action_set", "wait_for_state", "state_timeout", "futures")
+
+    def __init__(
+        self,
+        action: Optional[SwitchBotAction],
+        action_set: Optional[List[Tuple[float, SwitchBotAction]]],
+        wait_for_state: bool,
+        state_timeout: float,
+    ):
+        self.action = action
+        self.action_set = action_set
+        self.wait_for_state = wait_for_state
+        self.state_timeout = state_timeout
+        self.futures: List["asyncio.Future[Optional[SwitchBotResponse]]"] = []
+
+    @property
+    def is_coalescable(self) -> bool:
+        return self.action_set is None and self.action in _IDEMPOTENT_STATES
+
+
+class SwitchBotCommandQueue:
+    def __init__(self, bot: VirtualSwitchBot) -> None:
+        """
+        Sends the commands for one SwitchBot one at a time, collapsing superseded ON/OFF commands
+
+        Commands given while another is being sent wait in the queue. An ON or OFF queued right
+        behind another ON or OFF that has not been sent yet replaces it (last writer wins), and
+        the callers of both receive the response of the command actually sent. PRESS and action
+        sets are never coalesced and nothing is reordered around them.
+
+        .. code-block:: python
+
+            queue = SwitchBotCommandQueue(bot)
+            # Only ON and the final OFF are written to the SwitchBot
+            await asyncio.gather(*(queue.set_bot_state(action) for action in (ON, OFF, ON, OFF)))
+
+        :param bot: The SwitchBot the commands are sent to
+        :type bot: VirtualSwitchBot
+        """
+        self._bot = bot
+        self._queue: Deque[_QueuedCommand] = deque()
+        self._worker: Optional[asyncio.Task] = None
+        self._stats = CommandQueueStats()
+
+    async def set_bot_state(
+        self,
+        state: SwitchBotAction,
+        wait_for_state: bool = False,
+        state_timeout: float = 10.0,
+    ) -> Optional[SwitchBotResponse]:
+        """
+        Queue a "set state" command (see ``VirtualSwitchBot.set_bot_state``)
+
+        :param state: The action to take (PRESS, ON, and OFF)
+        :type state: SwitchBotAction
+        :param wait_for_state: Also wait until the SwitchBot reports the new state (ON and OFF only)
+        :type wait_for_state: bool
+        :param state_timeout: Time (seconds) to wait for the new state
+        :type state_timeout: float
+        :return: The response to the command sent (the superseding one if this command was coalesced)
+        :rtype: Optional[SwitchBotResponse]
+        """
+        return await self._submit(_QueuedCommand(state, None, wait_for_state, state_timeout))
+
+    async def run_action_set(
+        self,
+        action_set: List[Tuple[float, SwitchBotAction]],
+        wait_for_state: bool = False,
+        state_timeout: float = 10.0,
+    ) -> Optional[SwitchBotResponse]:
+        """
+        Queue a set of actions (see ``VirtualSwitchBot.run_action_set``), never coalesced
+
+        :param action_set: The set of actions to run in order with delay (seconds) between them (first ignored)
+        :type action_set: List[Tuple[float, SwitchBotAction]]
+        :param wait_for_state: Also wait until the SwitchBot reports the state of the last ON/OFF action
+        :type wait_for_state: bool
+        :param state_timeout: Time (seconds) to wait for the final state, on top of the action set delays
+        :type state_timeout: float
+        :return: The response from the SwitchBot
+        :rtype: Optional[SwitchBotResponse]
+        """
+        return await self._submit(_QueuedCommand(None, list(action_set), wait_for_state, state_timeout))
+
+    async def _submit(self, command: _QueuedCommand) -> Optional[SwitchBotResponse]:
+        future: "asyncio.Future[Optional[SwitchBotResponse]]" = asyncio.get_running_loop().create_future()
+        self._stats.submitted += 1
+
+        tail = self._queue[-1] if len(self._queue) > 0 else None
+        if command.is_coalescable and tail is not None and tail.is_coalescable:
+            _LOGGER.debug(
+                "Queued %s for %s superseded by %s",
+                tail.action.name,
+                self._bot.mac_address,
+                command.action.name,
+                extra={"event": "command_coalesced", "mac_address": self._bot.mac_address},
+            )
+            tail.action = command.action
+            tail.wait_for_state = tail.wait_for_state or command.wait_for_state
+            tail.state_timeout = max(tail.state_timeout, command.state_timeout)
+            tail.futures.append(future)
+            self._stats.coalesced += 1
+        else:
+            command.futures.append(future)
+            self._queue.append(command)
+
+        if self._worker is None:
+            self._worker = asyncio.ensure_future(self._drain())
+
+        return await future
+
+    async def _send(self, command: _QueuedCommand) -> Optional[SwitchBotResponse]:
+        if command.action_set is not None:
+            return await self._bot.run_action_set(command.action_set, command.wait_for_state, command.state_timeout)
+        return await self._bot.set_bot_state(command.action, command.wait_for_state, command.state_timeout)
+
+    async def _drain(self):
+        """
+        Send the queued commands in order until the queue is empty
+        """
+        command: Optional[_QueuedCommand] = None
+        try:
+            while len(self._queue) > 0:
+                # Removed before sending, so later commands are not coalesced into one already sent
+                command = self._queue.popleft()
+                if all(future.done() for future in command.futures):
+                    self._stats.abandoned += 1
+                    continue
+
+                self._stats.sent += 1
+                try:
+                    response = await self._send(command)
+                except Exception as err:
+                    for future in command.futures:
+                        if not future.done():
+                            future.set_exception(err)
+                else:
+                    for future in command.futures:
+                        if not future.done():
+                            future.set_result(response)
+                command = None
+        except asyncio.CancelledError:
+            # Queue closed, nobody is left to send the remaining commands
+            waiting = list(self._queue) + ([command] if command is not None else [])
+            self._queue.clear()
+            for queued in waiting:
+                for future in queued.futures:
+                    future.cancel()
+            raise
+        finally:
+            self._worker = None
+
+    async def close(self):
+        """
+        Stop sending, cancelling the commands still queued (and the callers waiting for them)
+        """
+        worker = self._worker
+        if worker is not None:
+            worker.cancel()
+            try:
+                await worker
+            except asyncio.CancelledError:
+                pass
+
+    @property
+    def bot(self) -> VirtualSwitchBot:
+        return self._bot
+
+    @property
+    def pending(self) -> int:
+        """
+        Commands queued and not sent yet
+
+        :return: The number of queued commands
+        :rtype: int
+        """
+        return len(self._queue)
+
+    @property
+    def stats(self) -> CommandQueueStats:
+        """
+        Commands submitted, sent and coalesced since the queue was created
+
+        :return: The statistics (updated in place)
+        :rtype: CommandQueueStats
+        """
+        return self._stats
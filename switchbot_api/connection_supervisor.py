@@ -0,0 +1,282 @@
+'''
+Python-Switchbot-BLE: A Python library for interfacing with Switchbot devices over Bluetooth Low Energy (BLE)
+Copyright (C) 2023  Benjamin Carlson
+'''
+
+from dataclasses import dataclass
+from typing import Callable, Optional
+import asyncio
+import logging
+import random
+
+from .bot_types import SwitchBotMetadata, SwitchBotRespStatus
+from .bot_response import SwitchBotError, SwitchBotResponseError, SwitchBotTimeoutError
+from .switchbot import VirtualSwitchBot
+
+_LOGGER = logging.getLogger(__name__)
+
+__all__ = ["SwitchBotSupervisor", "SupervisorStats"]
+
+
+@dataclass
+class SupervisorStats:
+    '''
+    Connections lost and restored by a SwitchBotSupervisor
+    '''
+
+    # Connections lost (reported by the transport, or keepalives that went unanswered)
+    disconnects: int = 0
+
+    # Connections (re)established by the supervisor
+    reconnects: int = 0
+
+    # Connection attempts that failed
+    failed_attempts: int = 0
+
+    # Keepalive reads sent
+    keepalives: int = 0
+
+
+class SwitchBotSupervisor:
+    def __init__(
+        self,
+        bot: VirtualSwitchBot,
+        prefetch: SwitchBotMetadata = SwitchBotMetadata.NONE,
+        base_delay_s: float = 0.5,
+        max_delay_s: float = 30.0,
+        jitter: float = 0.5,
+        keepalive_interval_s: Optional[float] = None,
+        keepalive_failures: int = 2,
+        wait_timeout_s: float = 30.0,
+    ) -> None:
+        """
+        Keeps a SwitchBot connected, reconnecting with backoff whenever the link is lost
+
+        Requests waiting for a response when the link is lost fail right away with
+        ``SwitchBotDisconnectedError``. Requests sent while reconnecting wait for the connection
+        (up to ``wait_timeout_s``) instead of failing. With ``keepalive_interval_s`` the basic
+        info is read periodically, so a link that died silently is noticed and re-established
+        before the next command needs it.
+
+        .. code-block:: python
+
+            supervisor = SwitchBotSupervisor(bot, keepalive_interval_s=60)
+            await supervisor.start()
+            ...
+            await supervisor.close()
+
+        :param bot: The SwitchBot to keep connected
+        :type bot: VirtualSwitchBot
+        :param prefetch: The metadata to fetch whenever the SwitchBot (re)connects
+        :type prefetch: SwitchBotMetadata
+        :param base_delay_s: Backoff after the first failed attempt, doubled for every following one
+        :type base_delay_s: float
+        :param max_delay_s: Upper bound for the backoff
+        :type max_delay_s: float
+        :param jitter: Fraction of the backoff that is randomized
+        :type jitter: float
+        :param keepalive_interval_s: Time (seconds) between keepalive reads, None for no keepalive
+        :type keepalive_interval_s: Optional[float]
+        :param keepalive_failures: Consecutive unanswered keepalives after which the connection is reopened
+        :type keepalive_failures: int
+        :param wait_timeout_s: Time (seconds) a request waits for a reconnect
+        :type wait_timeout_s: float
+        """
+        if keepalive_interval_s is not None and keepalive_interval_s <= 0:
+            raise ValueError(f"Invalid keepalive interval {keepalive_interval_s}, must be positive")
+
+        self._bot = bot
+        self._prefetch = prefetch
+        self._base_delay_s = base_delay_s
+        self._max_delay_s = max_delay_s
+        self._jitter = jitter
+        self._keepalive_interval_s = keepalive_interval_s
+        self._keepalive_failures = keepalive_failures
+        self._wait_timeout_s = wait_timeout_s
+
+        self._stats = SupervisorStats()
+        self._unsubscribe: Optional[Callable[[], None]] = None
+        self._reconnect_task: Optional[asyncio.Task] = None
+        self._keepalive_task: Optional[asyncio.Task] = None
+        # Set while connected (created on start so it is bound to the running event loop)
+        self._connected: Optional[asyncio.Event] = None
+
+    async def start(self):
+        """
+        Supervise the SwitchBot, connecting it first if needed (retrying until it connects)
+        """
+        if self._unsubscribe is not None:
+            return
+
+        self._connected = asyncio.Event()
+        self._unsubscribe = self._bot.subscribe_disconnected(self._on_disconnected)
+        self._bot.supervisor = self
+
+        if self._bot.is_connected:
+            self._connected.set()
+        else:
+            self._schedule_reconnect()
+            await self._connected.wait()
+
+        if self._keepalive_interval_s is not None:
+            self._keepalive_task = asyncio.ensure_future(self._keepalive())
+
+    def _on_disconnected(self):
+        self._stats.disconnects += 1
+        self._schedule_reconnect()
+
+    def _schedule_reconnect(self):
+        self._connected.clear()
+        if self._reconnect_task is None:
+            self._reconnect_task = asyncio.ensure_future(self._reconnect())
+
+    def backoff_s(self, attempt: int) -> float:
+        """
+        Time to wait after a failed connection attempt
+
+        :param attempt: The attempt that failed (starting at 1)
+        :type attempt: int
+        :return: Backoff in seconds
+        :rtype: float
+        """
+        delay = min(self._max_delay_s, self._base_delay_s * (2 ** (attempt - 1)))
+        return delay * (1.0 - self._jitter * random.random())
+
+    async def _reconnect(self):
+        """
+        Connect until it succeeds, with exponential backoff between attempts
+        """
+        attempt = 1
+        try:
+            while True:
+                try:
+                    await self._bot.connect(self._prefetch)
+                    break
+                except asyncio.CancelledError:
+                    raise
+                except Exception as err:
+                    self._stats.failed_attempts += 1
+                    backoff_s = self.backoff_s(attempt)
+                    _LOGGER.info(
+                        "Reconnecting to %s failed (%s), retrying in %.2fs",
+                        self._bot.mac_address,
+                        err,
+                        backoff_s,
+                        extra={
+                            "event": "reconnect_failed",
+                            "mac_address": self._bot.mac_address,
+                            "attempt": attempt,
+                            "backoff_s": backoff_s,
+                        },
+                    )
+                    # Leave no half open connection behind
+                    await self._bot.disconnect()
+                    attempt += 1
+                    await asyncio.sleep(backoff_s)
+
+            self._stats.reconnects += 1
+            _LOGGER.info(
+                "Reconnected to %s after %d attempt(s)",
+                self._bot.mac_address,
+                attempt,
+                extra={"event": "reconnected", "mac_address": self._bot.mac_address, "attempt": attempt},
+            )
+            self._connected.set()
+        finally:
+            self._reconnect_task = None
+
+    async def _keepalive(self):
+        """
+        Read the basic info every keepalive interval, reopening the connection if the reads go unanswered
+        """
+        unanswered = 0
+        while True:
+            await asyncio.sleep(self._keepalive_interval_s)
+            if not self._connected.is_set():
+                continue
+
+            self._stats.keepalives += 1
+            try:
+                await self._bot.fetch_basic_device_info()
+                unanswered = 0
+            except SwitchBotTimeoutError:
+                unanswered += 1
+            except SwitchBotResponseError as err:
+                # Answered, just not now (e.g. BUSY while the arm moves)
+                unanswered = 0
+                if err.status != SwitchBotRespStatus.BUSY:
+                    _LOGGER.debug("Keepalive of %s failed: %s", self._bot.mac_address, err)
+            except SwitchBotError as err:
+                # Disconnected meanwhile, the reconnect is already scheduled
+                _LOGGER.debug("Keepalive of %s failed: %s", self._bot.mac_address, err)
+
+            if unanswered >= self._keepalive_failures:
+                _LOGGER.warning(
+                    "SwitchBot (%s) stopped answering, reconnecting",
+                    self._bot.mac_address,
+                    extra={"event": "keepalive_lost", "mac_address": self._bot.mac_address},
+                )
+                unanswered = 0
+                self._stats.disconnects += 1
+                await self._bot.disconnect()
+                self._schedule_reconnect()
+
+    async def wait_connected(self, timeout: Optional[float] = None):
+        """
+        Wait until the SwitchBot is connected (returns right away if it is)
+
+        :param timeout: Time (seconds) to wait, defaults to ``wait_timeout_s``
+        :type timeout: Optional[float]
+        :raises SwitchBotTimeoutError: The SwitchBot did not reconnect in time
+        """
+        if self._connected is None or self._connected.is_set():
+            return
+
+        if timeout is None:
+            timeout = self._wait_timeout_s
+        try:
+            await asyncio.wait_for(self._connected.wait(), timeout)
+        except asyncio.TimeoutError:
+            raise SwitchBotTimeoutError(None, timeout, f"reconnect to {self._bot.mac_address}") from None
+
+    async def close(self):
+        """
+        Stop supervising (the SwitchBot stays connected if it is)
+        """
+        if self._unsubscribe is not None:
+            self._unsubscribe()
+            self._unsubscribe = None
+        if self._bot.supervisor is self:
+            self._bot.supervisor = None
+
+        for task in (self._reconnect_task, self._keepalive_task):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._reconnect_task = None
+        self._keepalive_task = None
+
+        # Requests waiting for a reconnect go ahead (and fail if still disconnected)
+        if self._connected is not None:
+            self._connected.set()
+
+    @property
+    def bot(self) -> VirtualSwitchBot:
+        return self._bot
+
+    @property
+    def is_reconnecting(self) -> bool:
+        return self._reconnect_task is not None
+
+    @property
+    def stats(self) -> SupervisorStats:
+        """
+        Connections lost and restored since the supervisor was created
+
+        :return: The statistics (updated in place)
+        :rtype: SupervisorStats
+        """
+        return self._stats
@@ -0,0 +1,354 @@
+'''
+Python-Switchbot-BLE: A Python library for interfacing with Switchbot devices over Bluetooth Low Energy (BLE)
+Copyright (C) 2023  Benjamin Carlson
+'''
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Union
+import json
+import logging
+import os
+import struct
+import tempfile
+import time
+
+from .bot_types import SwitchBotDeviceType, SwitchBotMetadata
+from .bot_information import BotInformation
+from .switchbot import VirtualSwitchBot
+
+_LOGGER = logging.getLogger(__name__)
+
+__all__ = ["SwitchBotRegistry", "RegisteredBot"]
+
+# Version of the file format, files of another version are ignored (the registry is only a cache)
+_FORMAT_VERSION = 1
+
+
+@dataclass(frozen=True)
+class RegisteredBot:
+    '''
+    What is known about a SwitchBot from a previous process
+
+    Information is kept in the SwitchBot's own encoding (Get Information and alarm info
+    response payloads), so loading a registry only parses JSON and hex strings.
+    '''
+
+    mac_address: str
+
+    # Payload of the last Get Information response (see BotInformation.basic_info_bytes)
+    basic_info: bytes
+
+    alarm_count: int = 0
+
+    # Device unix timestamp when the record was made
+    system_timestamp: int = 0
+
+    # Payload of the last alarm info response of each alarm ID
+    alarms: Dict[int, bytes] = field(default_factory=dict)
+
+    # When the metadata was last fetched from the SwitchBot (time.time()), 0 if never
+    updated_at: float = 0.0
+
+    @property
+    def device_type(self) -> Optional[SwitchBotDeviceType]:
+        try:
+            return SwitchBotDeviceType(self.basic_info[10] & 0x7F)
+        except ValueError:
+            return None
+
+    @property
+    def firmware_version(self) -> float:
+        return self.basic_info[1] * 0.1
+
+    @property
+    def age(self) -> float:
+        """
+        Time (seconds) since the metadata was fetched from the SwitchBot
+
+        :return: The age of the record
+        :rtype: float
+        """
+        return time.time() - self.updated_at
+
+    def apply_to(self, info: BotInformation) -> BotInformation:
+        """
+        Restore the recorded information (the password of ``info`` is kept)
+
+        The device time is advanced by the time elapsed since the record was made.
+
+        :param info: The information to update
+        :type info: BotInformation
+        :return: The updated information
+        :rtype: BotInformation
+        """
+        info.update_basic_info(self.basic_info)
+        info.alarm_count = self.alarm_count
+        if self.system_timestamp > 0:
+            info.system_timestamp = self.system_timestamp + max(0, int(self.age))
+        for alarm in self.alarms.values():
+            info.update_alarm(alarm)
+        return info
+
+    def _to_json(self) -> Dict[str, Any]:
+        return {
+            "basic_info": self.basic_info.hex(),
+            "alarm_count": self.alarm_count,
+            "system_timestamp": self.system_timestamp,
+            "alarms": {str(alarm_id): alarm.hex() for alarm_id, alarm in self.alarms.items()},
+            "updated_at": self.updated_at,
+        }
+
+    @classmethod
+    def _from_json(cls, mac_address: str, data: Dict[str, Any]) -> "RegisteredBot":
+        return cls(
+            mac_address,
+            bytes.fromhex(data["basic_info"]),
+            data.get("alarm_count", 0),
+            data.get("system_timestamp", 0),
+            {int(alarm_id): bytes.fromhex(alarm) for alarm_id, alarm in data.get("alarms", {}).items()},
+            data.get("updated_at", 0.0),
+        )
+
+
+class SwitchBotRegistry:
+    def __init__(self, path: Union[str, "os.PathLike[str]"], max_age: float = 24 * 60 * 60) -> None:
+        """
+        SwitchBots known from previous processes, persisted as a JSON file keyed by MAC address
+
+        Known SwitchBots are connected to by address and their recorded metadata is restored,
+        it is only fetched again once older than ``max_age``. Passwords are never written to
+        the file.
+
+        Connecting by address skips the library's own ``find_device`` scan, not discovery
+        itself: bleak still has to find the address before connecting on most backends (e.g.
+        BlueZ looks it up with a short scan unless the adapter already knows the device). What
+        a record saves on every start is the metadata round trips.
+
+        .. code-block:: python
+
+            registry = SwitchBotRegistry("switchbots.json")
+            registry.load()
+            bot = await registry.connect("AA:BB:CC:DD:EE:FF", password_str="secret")
+            registry.save()
+
+        :param path: The JSON file (created on the first save)
+        :type path: Union[str, os.PathLike[str]]
+        :param max_age: Age (seconds) after which recorded metadata is fetched again
+        :type max_age: float
+        """
+        self._path = path
+        self._max_age = max_age
+
+        # Records as read from the file, decoded on first use (most processes only use a few bots)
+        self._raw: Dict[str, Dict[str, Any]] = {}
+        self._bots: Dict[str, RegisteredBot] = {}
+        self._dirty = False
+
+    def load(self) -> int:
+        """
+        Read the file, replacing the known SwitchBots (a missing or unreadable file is an empty registry)
+
+        :return: The number of known SwitchBots
+        :rtype: int
+        """
+        self._bots = {}
+        self._raw = {}
+        self._dirty = False
+
+        try:
+            with open(self._path, "rb") as registry_file:
+                data = json.load(registry_file)
+        except FileNotFoundError:
+            return 0
+        except (OSError, ValueError) as err:
+            _LOGGER.warning("Ignoring unreadable SwitchBot registry %s (%r)", self._path, err)
+            return 0
+
+        bots = data.get("bots") if isinstance(data, dict) and data.get("version") == _FORMAT_VERSION else None
+        if not isinstance(bots, dict):
+            _LOGGER.warning("Ignoring SwitchBot registry %s with an unknown format", self._path)
+            return 0
+
+        self._raw = bots
+        return len(self._raw)
+
+    def save(self) -> bool:
+        """
+        Write the file if anything changed, atomically (readers see the old or the new file, never a partial one)
+
+        :return: True if the file was written
+        :rtype: bool
+        """
+        if not self._dirty:
+            return False
+
+        bots = dict(self._raw)
+        for mac_address, bot in self._bots.items():
+            bots[mac_address] = bot._to_json()
+
+        directory = os.path.dirname(os.path.abspath(self._path))
+        os.makedirs(directory, exist_ok=True)
+        descriptor, temp_path = tempfile.mkstemp(prefix=".switchbots-", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(descriptor, "w") as temp_file:
+                json.dump({"version": _FORMAT_VERSION, "bots": bots}, temp_file, separators=(",", ":"))
+                temp_file.flush()
+                os.fsync(temp_file.fileno())
+            os.replace(temp_path, self._path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+        self._dirty = False
+        return True
+
+    def get(self, mac_address: str) -> Optional[RegisteredBot]:
+        """
+        What is known about a SwitchBot
+
+        :param mac_address: The MAC address of the SwitchBot
+        :type mac_address: str
+        :return: The record, None if the SwitchBot is unknown (or its record is invalid)
+        :rtype: Optional[RegisteredBot]
+        """
+        bot = self._bots.get(mac_address)
+        if bot is not None:
+            return bot
+
+        raw = self._raw.pop(mac_address, None)
+        if raw is None:
+            return None
+        try:
+            bot = RegisteredBot._from_json(mac_address, raw)
+            # Records are checked once, when first used
+            bot.apply_to(BotInformation())
+        except (KeyError, TypeError, ValueError, struct.error, UserWarning) as err:
+            _LOGGER.warning("Ignoring invalid registry record for %s (%r)", mac_address, err)
+            self._dirty = True
+            return None
+
+        self._bots[mac_address] = bot
+        return bot
+
+    def record(self, bot: VirtualSwitchBot) -> RegisteredBot:
+        """
+        Record the information of a SwitchBot
+
+        The record is only considered fresh again if all of ``SwitchBotMetadata.ALL`` was fetched
+        since the SwitchBot connected, information restored from the registry keeps its age.
+
+        :param bot: The SwitchBot
+        :type bot: VirtualSwitchBot
+        :return: The new record
+        :rtype: RegisteredBot
+        """
+        info = bot.info
+        previous = self.get(bot.mac_address)
+        if SwitchBotMetadata.ALL in bot.loaded_metadata:
+            updated_at = time.time()
+        else:
+            updated_at = previous.updated_at if previous is not None else 0.0
+
+        registered = RegisteredBot(
+            bot.mac_address,
+            info.basic_info_bytes(),
+            info.alarm_count,
+            info.system_timestamp,
+            {alarm_id: info.alarm_info_bytes(alarm_id) for alarm_id in info.alarm_ids},
+            updated_at,
+        )
+        if registered != previous:
+            self._bots[bot.mac_address] = registered
+            self._dirty = True
+        return registered
+
+    def remove(self, mac_address: str) -> bool:
+        """
+        Forget a SwitchBot
+
+        :param mac_address: The MAC address of the SwitchBot
+        :type mac_address: str
+        :return: True if the SwitchBot was known
+        :rtype: bool
+        """
+        removed = self._bots.pop(mac_address, None) is not None
+        removed = self._raw.pop(mac_address, None) is not None or removed
+        self._dirty = self._dirty or removed
+        return removed
+
+    def is_stale(self, mac_address: str) -> bool:
+        """
+        Whether the metadata of a SwitchBot must be fetched again (always for unknown SwitchBots)
+
+        :param mac_address: The MAC address of the SwitchBot
+        :type mac_address: str
+        :return: True if the record is missing or older than ``max_age``
+        :rtype: bool
+        """
+        bot = self.get(mac_address)
+        return bot is None or bot.age > self._max_age
+
+    def create_bot(self, mac_address: str, **kwargs: Any) -> VirtualSwitchBot:
+        """
+        Create a VirtualSwitchBot, restoring what is known about it
+
+        A known SwitchBot is given its address as ``device``, so connect skips
+        ``find_device`` (the transport may still look the address up, see ``SwitchBotRegistry``).
+        If the address cannot be connected to, connect falls back to ``find_device``.
+
+        :param mac_address: The MAC address of the SwitchBot
+        :type mac_address: str
+        :param kwargs: Other VirtualSwitchBot arguments
+        :type kwargs: Any
+        :return: The SwitchBot (not connected)
+        :rtype: VirtualSwitchBot
+        """
+        registered = self.get(mac_address)
+        if registered is not None:
+            kwargs.setdefault("device", mac_address)
+
+        bot = VirtualSwitchBot(mac_address, **kwargs)
+        if registered is not None:
+            registered.apply_to(bot.info)
+        return bot
+
+    async def connect(self, mac_address: str, **kwargs: Any) -> VirtualSwitchBot:
+        """
+        Create and connect a VirtualSwitchBot, fetching its metadata only if stale, and record it
+
+        :param mac_address: The MAC address of the SwitchBot
+        :type mac_address: str
+        :param kwargs: Other VirtualSwitchBot arguments
+        :type kwargs: Any
+        :return: The connected SwitchBot
+        :rtype: VirtualSwitchBot
+        """
+        prefetch = SwitchBotMetadata.ALL if self.is_stale(mac_address) else SwitchBotMetadata.NONE
+        bot = self.create_bot(mac_address, **kwargs)
+        await bot.connect(prefetch)
+        self.record(bot)
+        return bot
+
+    @property
+    def path(self) -> Union[str, "os.PathLike[str]"]:
+        return self._path
+
+    @property
+    def max_age(self) -> float:
+        return self._max_age
+
+    @property
+    def addresses(self) -> List[str]:
+        """
+        MAC addresses of the known SwitchBots
+
+        :return: The addresses
+        :rtype: List[str]
+        """
+        return list(self._raw) + list(self._bots)
+
+    def __len__(self) -> int:
+        return len(self._raw) + len(self._bots)
+
+    def __contains__(self, mac_address: str) -> bool:
+        return mac_address in self._bots or mac_address in self._raw
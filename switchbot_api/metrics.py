@@ -0,0 +1,437 @@
+'''
+Python-Switchbot-BLE: A Python library for interfacing with Switchbot devices over Bluetooth Low Energy (BLE)
+Copyright (C) 2023  Benjamin Carlson
+'''
+
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Callable, Dict, Generic, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+from .bot_types import SwitchBotReqType, SwitchBotRespStatus
+
+__all__ = [
+    "DEFAULT_LATENCY_BUCKETS",
+    "MetricSample",
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "MetricsRegistry",
+    "SwitchBotMetrics",
+    "enable_metrics",
+    "disable_metrics",
+    "default_metrics",
+]
+
+# Upper bounds (seconds) of the latency histogram buckets, from a fast notification to a slow scan
+DEFAULT_LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+_ValueT = TypeVar("_ValueT")
+
+
+@dataclass(frozen=True)
+class MetricSample:
+    '''
+    A single value of a metric, as exported (histograms export one sample per bucket, plus sum and count)
+    '''
+
+    # Name of the sample (e.g. ``switchbot_request_latency_seconds_bucket``)
+    name: str
+
+    labels: Dict[str, str]
+
+    value: float
+
+
+class CounterValue:
+    """
+    The value of a counter for one set of labels
+    """
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def reset(self):
+        self.value = 0.0
+
+
+class GaugeValue:
+    """
+    The value of a gauge for one set of labels
+    """
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value: float):
+        self.value = value
+
+    def reset(self):
+        self.value = 0.0
+
+
+class HistogramValue:
+    """
+    The observations of a histogram for one set of labels
+    """
+
+    __slots__ = ("_bounds", "bucket_counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self._bounds = bounds
+        # Observations per bucket (not cumulative), the last one is +Inf
+        self.bucket_counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.bucket_counts[bisect_left(self._bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def reset(self):
+        self.bucket_counts = [0] * (len(self._bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+
+class _Metric(ABC, Generic[_ValueT]):
+    """
+    A metric and its values, one per set of label values
+    """
+
+    TYPE = ""
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values: Dict[Tuple[str, ...], _ValueT] = {}
+
+    @abstractmethod
+    def _new_value(self) -> _ValueT:
+        """
+        Create the value of a new set of label values
+
+        :return: The value
+        :rtype: Union[CounterValue, GaugeValue, HistogramValue]
+        """
+
+    def labels(self, *label_values: str) -> _ValueT:
+        """
+        The value for a set of label values (created on first use)
+
+        :param label_values: One value per label name, in order
+        :type label_values: str
+        :return: The value
+        :rtype: Union[CounterValue, GaugeValue, HistogramValue]
+        """
+        value = self._values.get(label_values)
+        if value is None:
+            if len(label_values) != len(self.label_names):
+                raise ValueError(f"{self.name} takes labels {self.label_names}, got {label_values}")
+            value = self._values[label_values] = self._new_value()
+        return value
+
+    def _samples(self, labels: Dict[str, str], value: _ValueT) -> Iterator[MetricSample]:
+        yield MetricSample(self.name, labels, value.value)
+
+    def samples(self) -> Iterator[MetricSample]:
+        for label_values, value in list(self._values.items()):
+            yield from self._samples(dict(zip(self.label_names, label_values)), value)
+
+    def reset(self):
+        # In place, values obtained with labels() stay valid
+        for value in self._values.values():
+            value.reset()
+
+
+class Counter(_Metric[CounterValue]):
+    TYPE = "counter"
+
+    def _new_value(self) -> CounterValue:
+        return CounterValue()
+
+
+class Gauge(_Metric[GaugeValue]):
+    TYPE = "gauge"
+
+    def _new_value(self) -> GaugeValue:
+        return GaugeValue()
+
+
+class Histogram(_Metric[HistogramValue]):
+    TYPE = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_value(self) -> HistogramValue:
+        return HistogramValue(self.buckets)
+
+    def _samples(self, labels: Dict[str, str], value: HistogramValue) -> Iterator[MetricSample]:
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), value.bucket_counts):
+            cumulative += count
+            yield MetricSample(f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative)
+        yield MetricSample(f"{self.name}_sum", labels, value.sum)
+        yield MetricSample(f"{self.name}_count", labels, value.count)
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        """
+        Counters, gauges and histograms, exported as Prometheus text or sample by sample
+        """
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            if type(existing) is not type(metric) or existing.label_names != metric.label_names:
+                raise ValueError(f"Metric {metric.name} is already registered with another type or labels")
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> Counter:
+        """
+        Register a counter (or get the one registered under the name)
+
+        :param name: Name of the metric
+        :type name: str
+        :param help_text: Description of the metric
+        :type help_text: str
+        :param label_names: Names of the labels its values are tagged with
+        :type label_names: Sequence[str]
+        :return: The counter
+        :rtype: Counter
+        """
+        return self._register(Counter(name, help_text, label_names))
+
+    def gauge(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> Gauge:
+        """
+        Register a gauge (or get the one registered under the name)
+
+        :param name: Name of the metric
+        :type name: str
+        :param help_text: Description of the metric
+        :type help_text: str
+        :param label_names: Names of the labels its values are tagged with
+        :type label_names: Sequence[str]
+        :return: The gauge
+        :rtype: Gauge
+        """
+        return self._register(Gauge(name, help_text, label_names))
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ) -> Histogram:
+        """
+        Register a histogram (or get the one registered under the name)
+
+        :param name: Name of the metric
+        :type name: str
+        :param help_text: Description of the metric
+        :type help_text: str
+        :param label_names: Names of the labels its values are tagged with
+        :type label_names: Sequence[str]
+        :param buckets: Upper bounds of the buckets (+Inf is added)
+        :type buckets: Sequence[float]
+        :return: The histogram
+        :rtype: Histogram
+        """
+        return self._register(Histogram(name, help_text, label_names, buckets))
+
+    def export(self, callback: Callable[[MetricSample], None]):
+        """
+        Call ``callback`` with every sample, to push the metrics to another system
+
+        :param callback: Called with each sample
+        :type callback: Callable[[MetricSample], None]
+        """
+        for metric in list(self._metrics.values()):
+            for sample in metric.samples():
+                callback(sample)
+
+    def collect(self) -> List[MetricSample]:
+        """
+        Every sample of every metric
+
+        :return: The samples
+        :rtype: List[MetricSample]
+        """
+        samples: List[MetricSample] = []
+        self.export(samples.append)
+        return samples
+
+    def export_prometheus(self) -> str:
+        """
+        The metrics in the Prometheus text exposition format
+
+        :return: The exposition text
+        :rtype: str
+        """
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.TYPE}")
+            for sample in metric.samples():
+                labels = ",".join(f'{name}="{_escape_label(value)}"' for name, value in sample.labels.items())
+                name = f"{sample.name}{{{labels}}}" if labels else sample.name
+                lines.append(f"{name} {_format_value(sample.value)}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        """
+        Reset every value of every metric to zero
+        """
+        for metric in self._metrics.values():
+            metric.reset()
+
+    def __iter__(self) -> Iterator[_Metric]:
+        return iter(list(self._metrics.values()))
+
+
+class SwitchBotMetrics:
+    def __init__(self, registry: Optional[MetricsRegistry] = None) -> None:
+        """
+        The metrics recorded by the library, registered in a MetricsRegistry
+
+        :param registry: The registry to register the metrics in, a new one if None
+        :type registry: Optional[MetricsRegistry]
+        """
+        self.registry = registry if registry is not None else MetricsRegistry()
+
+        self.connect_duration = self.registry.histogram(
+            "switchbot_connect_duration_seconds",
+            "Time connect() took, from finding the SwitchBot to the prefetched metadata",
+            ("mac_address",),
+        )
+        self.connects = self.registry.counter(
+            "switchbot_connects_total", "Connection attempts by result (ok or error)", ("mac_address", "result")
+        )
+        self.request_latency = self.registry.histogram(
+            "switchbot_request_latency_seconds",
+            "Time from writing a request to receiving its response notification",
+            ("mac_address", "request_type"),
+        )
+        self.responses = self.registry.counter(
+            "switchbot_responses_total", "Responses received by status", ("mac_address", "request_type", "status")
+        )
+        self.request_timeouts = self.registry.counter(
+            "switchbot_request_timeouts_total", "Requests left without a response", ("mac_address", "request_type")
+        )
+        self.pending_requests = self.registry.gauge(
+            "switchbot_pending_requests", "Requests written and waiting for their response", ("mac_address",)
+        )
+        self.discovery_duration = self.registry.histogram(
+            "switchbot_discovery_duration_seconds",
+            "Time to find a SwitchBot (source: session candidate, scan for any SwitchBot, or scan for an address)",
+            ("source",),
+        )
+
+        # Values recorded for every response, by the enum members (enum names are slow to read)
+        self._response_values: Dict[
+            Tuple[str, SwitchBotReqType, SwitchBotRespStatus], Tuple[HistogramValue, CounterValue]
+        ] = {}
+
+    def record_response(
+        self, mac_address: str, request_type: SwitchBotReqType, status: SwitchBotRespStatus, latency_s: float
+    ):
+        """
+        Record the latency and status of a response
+
+        :param mac_address: The MAC address of the SwitchBot
+        :type mac_address: str
+        :param request_type: The request answered
+        :type request_type: SwitchBotReqType
+        :param status: The status of the response
+        :type status: SwitchBotRespStatus
+        :param latency_s: Time (seconds) from writing the request to the response
+        :type latency_s: float
+        """
+        key = (mac_address, request_type, status)
+        values = self._response_values.get(key)
+        if values is None:
+            values = self._response_values[key] = (
+                self.request_latency.labels(mac_address, request_type.name),
+                self.responses.labels(mac_address, request_type.name, status.name),
+            )
+        values[0].observe(latency_s)
+        values[1].value += 1
+
+
+_default_metrics: Optional[SwitchBotMetrics] = None
+
+
+def enable_metrics(metrics: Optional[SwitchBotMetrics] = None) -> SwitchBotMetrics:
+    """
+    Record metrics for the SwitchBots and scanners created from now on
+
+    Metrics are disabled by default, costing a single ``None`` check where they would be recorded.
+
+    .. code-block:: python
+
+        metrics = enable_metrics()
+        ...
+        print(metrics.registry.export_prometheus())
+
+    :param metrics: The metrics to record into, new ones if None
+    :type metrics: Optional[SwitchBotMetrics]
+    :return: The metrics recorded into
+    :rtype: SwitchBotMetrics
+    """
+    global _default_metrics
+    _default_metrics = metrics if metrics is not None else SwitchBotMetrics()
+    return _default_metrics
+
+
+def disable_metrics():
+    """
+    Stop recording metrics for the SwitchBots and scanners created from now on
+    """
+    global _default_metrics
+    _default_metrics = None
+
+
+def default_metrics() -> Optional[SwitchBotMetrics]:
+    """
+    The metrics new SwitchBots and scanners record into
+
+    :return: The metrics, None if disabled
+    :rtype: Optional[SwitchBotMetrics]
+    """
+    return _default_metrics
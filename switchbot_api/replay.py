@@ -0,0 +1,173 @@
+'''
+Python-Switchbot-BLE: A Python library for interfacing with Switchbot devices over Bluetooth Low Energy (BLE)
+Copyright (C) 2023  Benjamin Carlson
+'''
+
+from typing import Any, Callable, Iterator, List, Optional, Union
+import asyncio
+import os
+
+from .bot_response import SwitchBotReplayError
+from .btsnoop import BtsnoopReader, CaptureEvent, CapturedRequest, CapturedResponse
+from .simulation import SimulatedDevice
+from .transport import SwitchBotTransport
+
+__all__ = ["ReplayClient", "ReplayScanner", "ReplayTransport"]
+
+
+class ReplayClient:
+    def __init__(self, transport: "ReplayTransport", address: str) -> None:
+        """
+        Fake peer answering writes with the notifications recorded in a capture
+
+        :param transport: The transport the client belongs to
+        :type transport: ReplayTransport
+        :param address: The address of the SwitchBot being replayed
+        :type address: str
+        """
+        self._transport = transport
+        self._address = address
+        self._reader: Optional[BtsnoopReader] = None
+        self._events: Optional[Iterator[CaptureEvent]] = None
+        self._peeked: Optional[CaptureEvent] = None
+        self._notify_callback: Optional[Callable[[Any, bytearray], Any]] = None
+
+    async def connect(self):
+        if self._reader is None:
+            self._reader = BtsnoopReader(self._transport.path)
+            self._events = self._reader.events(include_advertisements=False)
+
+    async def disconnect(self):
+        self._notify_callback = None
+        self._events = None
+        self._peeked = None
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+
+    @property
+    def is_connected(self) -> bool:
+        return self._reader is not None
+
+    async def start_notify(self, char_specifier: Any, callback: Callable[[Any, bytearray], Any]):
+        self._notify_callback = callback
+
+    def _next_event(self) -> Optional[CaptureEvent]:
+        if self._peeked is not None:
+            event, self._peeked = self._peeked, None
+            return event
+
+        for event in self._events:
+            # Connections to other devices in the same capture
+            if event.address is not None and event.address != self._address:
+                continue
+            return event
+        return None
+
+    def _next_exchange(self) -> Optional[CapturedRequest]:
+        while True:
+            event = self._next_event()
+            if event is None or isinstance(event, CapturedRequest):
+                return event
+
+    def _responses_to(self, request: CapturedRequest) -> List[CapturedResponse]:
+        responses = []
+        while True:
+            event = self._next_event()
+            if isinstance(event, CapturedResponse) and event.request is request:
+                responses.append(event)
+                continue
+            self._peeked = event
+            return responses
+
+    async def write_gatt_char(self, char_specifier: Any, data: Any, response: bool = False):
+        if self._events is None:
+            raise ConnectionError(f"Not connected to {self._address}")
+
+        request = self._next_exchange()
+        if request is None:
+            raise SwitchBotReplayError(f"Capture has no more requests (got {bytes(data).hex(' ')})", None, bytes(data))
+        if self._transport.strict and request.data != bytes(data):
+            raise SwitchBotReplayError(
+                f"Expected request {request.data.hex(' ')}, got {bytes(data).hex(' ')}", request.data, bytes(data)
+            )
+
+        callback = self._notify_callback
+        if callback is None:
+            return
+
+        loop = asyncio.get_running_loop()
+        for captured in self._responses_to(request):
+            delay = (captured.timestamp - request.timestamp) * self._transport.speed
+            loop.call_later(max(0.0, delay), callback, char_specifier, bytearray(captured.data))
+
+
+class ReplayScanner:
+    def __init__(self, transport: "ReplayTransport", detection_callback: Callable[[Any, Any], None]) -> None:
+        """
+        Scanner replaying the advertising reports of a capture
+
+        :param transport: The transport the scanner belongs to
+        :type transport: ReplayTransport
+        :param detection_callback: Called with ``(device, advertisement_data)`` for every advertisement
+        :type detection_callback: Callable[[Any, Any], None]
+        """
+        self._transport = transport
+        self._detection_callback = detection_callback
+        self._task: Optional[asyncio.Task] = None
+
+    async def _replay(self):
+        previous_timestamp: Optional[float] = None
+        with BtsnoopReader(self._transport.path) as reader:
+            for advertisement in reader.events(include_att=False):
+                if previous_timestamp is not None:
+                    # Always yield to the loop so consumers run between advertisements
+                    await asyncio.sleep(max(0.0, (advertisement.timestamp - previous_timestamp) * self._transport.speed))
+                previous_timestamp = advertisement.timestamp
+                self._detection_callback(SimulatedDevice(advertisement.address, advertisement.local_name), advertisement)
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._replay())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+class ReplayTransport(SwitchBotTransport):
+    def __init__(self, path: Union[str, "os.PathLike[str]"], strict: bool = True, speed: float = 0.0) -> None:
+        """
+        A transport replaying a btsnoop capture, the capture's SwitchBot acting as the peer
+
+        Each write is answered with the notifications recorded after the next captured request,
+        and scanners receive the captured advertisements.
+
+        .. code-block:: python
+
+            transport = ReplayTransport("notes/switchbot_isolated.log")
+            bot = VirtualSwitchBot("F6:9A:4E:9C:3F:3B", transport=transport)
+            await bot.connect(prefetch=SwitchBotMetadata.NONE)
+            await bot.set_bot_state(SwitchBotAction.ON)
+
+        :param path: Path of the capture
+        :type path: Union[str, os.PathLike[str]]
+        :param strict: Raise SwitchBotReplayError if a write differs from the captured request
+        :type strict: bool
+        :param speed: Multiplier of the captured delays (1 = real time, 0 = as fast as possible)
+        :type speed: float
+        """
+        self.path = path
+        self.strict = strict
+        self.speed = speed
+
+    async def find_device(self, mac_address: str, timeout: float = 10.0) -> Optional[Any]:
+        return SimulatedDevice(mac_address)
+
+    def create_client(self, device: Any, disconnected_callback: Optional[Callable[[Any], None]] = None) -> Any:
+        # A capture never loses its connection
+        return ReplayClient(self, device if isinstance(device, str) else device.address)
+
+    def create_scanner(self, detection_callback: Callable[[Any, Any], None], **kwargs: Any) -> Any:
+        return ReplayScanner(self, detection_callback)
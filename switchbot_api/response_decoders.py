@@ -0,0 +1,194 @@
+'''
+Python-Switchbot-BLE: A Python library for interfacing with Switchbot devices over Bluetooth Low Energy (BLE)
+Copyright (C) 2023  Benjamin Carlson
+'''
+
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+import enum
+import struct
+
+from .bot_types import SwitchBotReqType, SwitchBotDeviceType, TimeManagementInfoSubCommand
+from .bot_information import BotInformation
+from .alarm_info import AlarmInfo
+
+__all__ = ["ResponseDecoder", "ResponseDecoderRegistry", "default_decoders", "decoders_for"]
+
+# Decodes the payload of an OK response (without the status byte), updating the device's BotInformation.
+# The payload is a view of the notification, copy it (bytes(payload)) to keep it
+DecodeFunc = Callable[[BotInformation, memoryview], Any]
+
+_U64 = struct.Struct(">Q")
+
+
+@dataclass(frozen=True)
+class ResponseDecoder:
+    '''
+    How the payload of an OK response to one kind of request is decoded
+    '''
+
+    decode: DecodeFunc
+
+    # The type of the decoded value (SwitchBotResponse.value), None if the response has no payload
+    result_type: Optional[type] = None
+
+
+class ResponseDecoderRegistry:
+    def __init__(self, parent: Optional["ResponseDecoderRegistry"] = None) -> None:
+        """
+        Decoders keyed by request type and subcommand
+
+        Requests without subcommands are registered with ``subcommand=None``. Kinds that are not
+        registered are looked up in the parent registry, so a device type only registers what
+        differs from the default.
+
+        :param parent: Registry consulted for kinds not registered here
+        :type parent: Optional[ResponseDecoderRegistry]
+        """
+        self._parent = parent
+        self._decoders: Dict[Tuple[SwitchBotReqType, Optional[int]], ResponseDecoder] = {}
+
+    @staticmethod
+    def _key(
+        request_type: SwitchBotReqType, subcommand: Union[enum.Enum, int, None]
+    ) -> Tuple[SwitchBotReqType, Optional[int]]:
+        if isinstance(subcommand, enum.Enum):
+            subcommand = subcommand.value
+        return request_type, subcommand
+
+    def register(
+        self,
+        request_type: SwitchBotReqType,
+        subcommand: Union[enum.Enum, int, None] = None,
+        result_type: Optional[type] = None,
+    ) -> Callable[[DecodeFunc], DecodeFunc]:
+        """
+        Decorator registering the decoder of a request kind (replacing any previous one)
+
+        .. code-block:: python
+
+            @decoders_for(SwitchBotDeviceType.METER).register(SwitchBotReqType.GET_BASIC_INFO, result_type=bytes)
+            def decode_meter_info(info: BotInformation, payload: memoryview) -> bytes:
+                return bytes(payload)
+
+        :param request_type: The request answered
+        :type request_type: SwitchBotReqType
+        :param subcommand: The subcommand of the request (e.g. TimeManagementInfoSubCommand), None if it has none
+        :type subcommand: Union[enum.Enum, int, None]
+        :param result_type: The type of the decoded value
+        :type result_type: Optional[type]
+        :return: The decorator
+        :rtype: Callable[[DecodeFunc], DecodeFunc]
+        """
+        key = self._key(request_type, subcommand)
+
+        def register(decode: DecodeFunc) -> DecodeFunc:
+            self._decoders[key] = ResponseDecoder(decode, result_type)
+            return decode
+
+        return register
+
+    def get(
+        self, request_type: SwitchBotReqType, subcommand: Union[enum.Enum, int, None] = None
+    ) -> Optional[ResponseDecoder]:
+        """
+        The decoder of a request kind
+
+        :param request_type: The request answered
+        :type request_type: SwitchBotReqType
+        :param subcommand: The subcommand of the request, None if it has none
+        :type subcommand: Union[enum.Enum, int, None]
+        :return: The decoder, None if the response has no payload to decode
+        :rtype: Optional[ResponseDecoder]
+        """
+        key = self._key(request_type, subcommand)
+        registry: Optional[ResponseDecoderRegistry] = self
+        while registry is not None:
+            decoder = registry._decoders.get(key)
+            if decoder is not None:
+                return decoder
+            registry = registry._parent
+        return None
+
+    def decode(
+        self,
+        request_type: SwitchBotReqType,
+        subcommand: Optional[int],
+        payload: Union[bytes, memoryview],
+        info: BotInformation,
+    ) -> Any:
+        """
+        Decode an OK response payload into ``info``
+
+        :param request_type: The request answered
+        :type request_type: SwitchBotReqType
+        :param subcommand: The subcommand value of the request, None if it has none
+        :type subcommand: Optional[int]
+        :param payload: The response without its status byte
+        :type payload: Union[bytes, memoryview]
+        :param info: Information updated from the payload
+        :type info: BotInformation
+        :raises ValueError: The payload does not match the request (also ``struct.error``, ``IndexError``)
+        :return: The decoded value, None if the request kind has no decoder
+        :rtype: Any
+        """
+        # Called for every response, so the key is not normalized as in get()
+        key = (request_type, subcommand)
+        registry: Optional[ResponseDecoderRegistry] = self
+        while registry is not None:
+            decoder = registry._decoders.get(key)
+            if decoder is not None:
+                return decoder.decode(info, payload)
+            registry = registry._parent
+        return None
+
+
+default_decoders = ResponseDecoderRegistry()
+
+_DEVICE_DECODERS: Dict[SwitchBotDeviceType, ResponseDecoderRegistry] = {}
+
+
+def decoders_for(device_type: SwitchBotDeviceType) -> ResponseDecoderRegistry:
+    """
+    The decoders used for a device type, falling back to ``default_decoders``
+
+    :param device_type: The type of device
+    :type device_type: SwitchBotDeviceType
+    :return: The registry of the device type (created empty on first use)
+    :rtype: ResponseDecoderRegistry
+    """
+    registry = _DEVICE_DECODERS.get(device_type)
+    if registry is None:
+        registry = _DEVICE_DECODERS[device_type] = ResponseDecoderRegistry(default_decoders)
+    return registry
+
+
+@default_decoders.register(SwitchBotReqType.GET_BASIC_INFO, result_type=BotInformation)
+def _decode_basic_info(info: BotInformation, payload: memoryview) -> BotInformation:
+    info.update_basic_info(payload)
+    return info
+
+
+@default_decoders.register(
+    SwitchBotReqType.GET_TIME_MGMT_INFO, TimeManagementInfoSubCommand.DEVICE_TIME, result_type=int
+)
+def _decode_system_time(info: BotInformation, payload: memoryview) -> int:
+    info.system_timestamp = _U64.unpack(payload)[0]
+    return info.system_timestamp
+
+
+@default_decoders.register(
+    SwitchBotReqType.GET_TIME_MGMT_INFO, TimeManagementInfoSubCommand.ALARM_COUNT, result_type=int
+)
+def _decode_alarm_count(info: BotInformation, payload: memoryview) -> int:
+    if len(payload) != 1:
+        raise ValueError(f"Invalid alarm count length ({len(payload)}), must be 1")
+    info.alarm_count = payload[0]
+    return info.alarm_count
+
+
+@default_decoders.register(
+    SwitchBotReqType.GET_TIME_MGMT_INFO, TimeManagementInfoSubCommand.ALARM_INFO, result_type=AlarmInfo
+)
+def _decode_alarm_info(info: BotInformation, payload: memoryview) -> AlarmInfo:
+    return info.update_alarm(payload)
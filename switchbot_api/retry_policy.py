@@ -0,0 +1,219 @@
+'''
+Python-Switchbot-BLE: A Python library for interfacing with Switchbot devices over Bluetooth Low Energy (BLE)
+Copyright (C) 2023  Benjamin Carlson
+'''
+
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, Optional
+import logging
+import random
+import time
+
+from .bot_types import SwitchBotReqType, SwitchBotRespStatus
+from .bot_response import (
+    SwitchBotResponseError,
+    SwitchBotTimeoutError,
+    SwitchBotCircuitOpenError,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+__all__ = [
+    "RETRYABLE_STATUSES",
+    "COMMAND_RETRYABLE_STATUSES",
+    "RetryPolicy",
+    "CircuitBreaker",
+    "RetryStats",
+]
+
+# Statuses where the SwitchBot did not act on the request and trying again later may succeed
+RETRYABLE_STATUSES: FrozenSet[SwitchBotRespStatus] = frozenset(
+    {
+        SwitchBotRespStatus.UNKNOWN,
+        SwitchBotRespStatus.ERROR,
+        SwitchBotRespStatus.BUSY,
+        SwitchBotRespStatus.NO_NEARBY_MESH_DEVICE,
+        SwitchBotRespStatus.FAILED_NETWORK_CONNECTION,
+    }
+)
+
+# Commands move the arm, so they are only retried when the SwitchBot certainly did not act on them
+# (ERROR/UNKNOWN may come after the arm moved, and retrying would press twice)
+COMMAND_RETRYABLE_STATUSES: FrozenSet[SwitchBotRespStatus] = frozenset({SwitchBotRespStatus.BUSY})
+
+
+@dataclass
+class RetryPolicy:
+    '''
+    How requests answered with a transient status are retried
+    '''
+
+    # Total attempts per request (1 = never retry)
+    max_attempts: int = 3
+
+    # Backoff before the first retry, doubled for every following retry
+    base_delay_s: float = 0.2
+
+    # Upper bound for the backoff
+    max_delay_s: float = 2.0
+
+    # Fraction of the backoff that is randomized (0 = fixed delays, 1 = anywhere from 0 to the backoff)
+    jitter: float = 0.5
+
+    # Statuses that are retried, every other non-OK status is fatal
+    retryable_statuses: FrozenSet[SwitchBotRespStatus] = RETRYABLE_STATUSES
+
+    # Statuses retried for specific request types instead of ``retryable_statuses``
+    retryable_statuses_by_type: Dict[SwitchBotReqType, FrozenSet[SwitchBotRespStatus]] = field(
+        default_factory=lambda: {SwitchBotReqType.COMMAND: COMMAND_RETRYABLE_STATUSES}
+    )
+
+    # Whether requests without a response are retried (a timed out command may still have been executed)
+    retry_on_timeout: bool = False
+
+    def is_retryable(self, error: Exception) -> bool:
+        """
+        Whether a failed attempt should be retried
+
+        :param error: The error the attempt failed with
+        :type error: Exception
+        :return: True if the request may succeed when retried
+        :rtype: bool
+        """
+        if isinstance(error, SwitchBotResponseError):
+            statuses = self.retryable_statuses_by_type.get(error.response.request_type, self.retryable_statuses)
+            return error.status in statuses
+        if isinstance(error, SwitchBotTimeoutError):
+            return self.retry_on_timeout
+        return False
+
+    def backoff_s(self, attempt: int) -> float:
+        """
+        Time to wait after a failed attempt
+
+        :param attempt: The attempt that failed (starting at 1)
+        :type attempt: int
+        :return: Backoff in seconds
+        :rtype: float
+        """
+        delay = min(self.max_delay_s, self.base_delay_s * (2 ** (attempt - 1)))
+        return delay * (1.0 - self.jitter * random.random())
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 5, reset_timeout_s: float = 30.0) -> None:
+        """
+        Stops sending requests to a SwitchBot after repeated failures
+
+        After ``failure_threshold`` consecutive failed requests the circuit opens and requests
+        fail immediately. Once ``reset_timeout_s`` has passed a single trial request is let
+        through, closing the circuit again if it succeeds.
+
+        :param failure_threshold: Consecutive failed requests that open the circuit
+        :type failure_threshold: int
+        :param reset_timeout_s: Time (seconds) the circuit stays open before a trial request
+        :type reset_timeout_s: float
+        """
+        self._failure_threshold = failure_threshold
+        self._reset_timeout_s = reset_timeout_s
+
+        self._consecutive_failures = 0
+        # time.monotonic() when the circuit opened, None while closed
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    def before_request(self):
+        """
+        Check that a request may be sent
+
+        :raises SwitchBotCircuitOpenError: The circuit is open
+        """
+        if self._opened_at is None:
+            return
+
+        open_for = time.monotonic() - self._opened_at
+        if open_for < self._reset_timeout_s or self._trial_in_flight:
+            raise SwitchBotCircuitOpenError(max(0.0, self._reset_timeout_s - open_for))
+
+        # Half open, let one trial request through
+        self._trial_in_flight = True
+
+    def record_success(self):
+        self._consecutive_failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    def record_inconclusive(self):
+        """
+        A request let through ended without showing whether the SwitchBot works (cancelled, connection
+        lost, ...), it counts as neither success nor failure (a half open circuit lets the next request
+        through as its trial)
+        """
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self._consecutive_failures += 1
+        if self._trial_in_flight or self._consecutive_failures >= self._failure_threshold:
+            if self._opened_at is None:
+                _LOGGER.warning("Opening circuit after %d consecutive failures", self._consecutive_failures)
+            self._opened_at = time.monotonic()
+        self._trial_in_flight = False
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    @property
+    def consecutive_failures(self) -> int:
+        return self._consecutive_failures
+
+
+@dataclass
+class RetryStats:
+    '''
+    How many attempts requests needed, for tuning the retry policy
+    '''
+
+    # Completed requests by request type and number of attempts used
+    attempts: Dict[SwitchBotReqType, Dict[int, int]] = field(default_factory=dict)
+
+    # Requests that failed after all attempts, by request type
+    failures: Dict[SwitchBotReqType, int] = field(default_factory=dict)
+
+    # Retries performed, by the status (or "TIMEOUT") that caused them
+    retries_by_cause: Dict[str, int] = field(default_factory=dict)
+
+    def record(self, request_type: SwitchBotReqType, attempts: int, success: bool):
+        """
+        Record a completed request
+
+        :param request_type: The type of request
+        :type request_type: SwitchBotReqType
+        :param attempts: Attempts used
+        :type attempts: int
+        :param success: Whether the request eventually succeeded
+        :type success: bool
+        """
+        by_attempts = self.attempts.setdefault(request_type, {})
+        by_attempts[attempts] = by_attempts.get(attempts, 0) + 1
+        if not success:
+            self.failures[request_type] = self.failures.get(request_type, 0) + 1
+
+    def record_retry(self, error: Exception):
+        """
+        Record a retry
+
+        :param error: The error that caused the retry
+        :type error: Exception
+        """
+        if isinstance(error, SwitchBotResponseError):
+            cause = error.status.name
+        elif isinstance(error, SwitchBotTimeoutError):
+            cause = "TIMEOUT"
+        else:
+            cause = type(error).__name__
+        self.retries_by_cause[cause] = self.retries_by_cause.get(cause, 0) + 1
+
+    @property
+    def total_retries(self) -> int:
+        return sum(self.retries_by_cause.values())
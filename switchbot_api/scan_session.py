@@ -0,0 +1,312 @@
+'''
+Python-Switchbot-BLE: A Python library for interfacing with Switchbot devices over Bluetooth Low Energy (BLE)
+Copyright (C) 2023  Benjamin Carlson
+'''
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
+import asyncio
+import logging
+import platform
+import time
+
+if TYPE_CHECKING:
+    from bleak import BLEDevice, AdvertisementData
+
+from .transport import SwitchBotTransport, default_transport
+
+_LOGGER = logging.getLogger(__name__)
+
+__all__ = ["SwitchBotAdvertisement", "SwitchBotScanSession", "default_scan_session"]
+
+# macOS does not provide the MAC address, only a "UUID", so we can't check it
+_CHECK_MAC_ADDRESS = platform.system() != "Darwin"
+
+
+@dataclass
+class SwitchBotAdvertisement:
+    '''
+    An advertisement received from a SwitchBot
+    '''
+
+    # The advertising device
+    device: "BLEDevice"
+
+    # The full advertisement
+    advertisement_data: "AdvertisementData"
+
+    # The SwitchBot service data (readable with BotInformation.read_service_bytes)
+    service_data: bytearray
+
+    # When the advertisement was received (time.monotonic())
+    discovered_at: float
+
+    @property
+    def address(self) -> str:
+        return self.device.address
+
+
+class SwitchBotScanSession:
+    # Service UUID
+    UNKNOWN_SERVICE_DATA_UUID = "00000d00-0000-1000-8000-00805f9b34fb"
+    # Manufacturer ID for Nordic Semiconductors
+    NORDIC_MANUFACTURER_ID = 0x59
+
+    def __init__(
+        self,
+        linger_s: float = 5.0,
+        transport: Optional[SwitchBotTransport] = None,
+        **scanner_kwargs: Any,
+    ) -> None:
+        """
+        A BLE scan shared by every consumer of SwitchBot advertisements (discovery, state monitoring, ...)
+
+        The scan runs while at least one consumer holds it (``acquire``/``release`` or ``async with``)
+        and keeps running for ``linger_s`` afterwards, so back-to-back users do not restart the radio.
+
+        :param linger_s: Time (seconds) to keep scanning after the last consumer releases the session
+        :type linger_s: float
+        :param transport: The transport to scan with, defaults to bleak
+        :type transport: Optional[SwitchBotTransport]
+        :param scanner_kwargs: Extra arguments for the transport's scanner (e.g. bleak's ``scanning_mode``)
+        :type scanner_kwargs: Any
+        """
+        self._linger_s = linger_s
+        self._transport = transport if transport is not None else default_transport()
+        self._scanner_kwargs = scanner_kwargs
+
+        # Scan state, bound to the event loop that started the scan (see _bind_loop)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._scanner: Optional[Any] = None
+        self._users = 0
+        self._lock: Optional[asyncio.Lock] = None
+        self._stop_handle: Optional[asyncio.TimerHandle] = None
+        self._stop_task: Optional[asyncio.Task] = None
+
+        self._subscribers: List[Callable[[SwitchBotAdvertisement], None]] = []
+
+        # Latest advertisement of every SwitchBot seen, by address
+        self._candidates: Dict[str, SwitchBotAdvertisement] = {}
+
+    def filter_advertisement(self, device: "BLEDevice", adv: "AdvertisementData") -> Optional[bytearray]:
+        """
+        Determines if device is a SwitchBot or not
+
+        :param device: Device object
+        :type device: BLEDevice
+        :param adv: Device advertisement data
+        :type adv: AdvertisementData
+        :return: The SwitchBot service data, None if the device is not a SwitchBot
+        :rtype: Optional[bytearray]
+        """
+        # Cheapest rejection first, almost every other nearby device fails here
+        man_data = adv.manufacturer_data.get(self.NORDIC_MANUFACTURER_ID)
+        if man_data is None:
+            return None
+
+        service_data = adv.service_data.get(self.UNKNOWN_SERVICE_DATA_UUID)
+        if service_data is None:
+            return None
+
+        if _CHECK_MAC_ADDRESS:
+            # I am not sure if this is only for SwitchBot or is a general pattern
+            if bytes.fromhex(device.address.replace(":", "")) != man_data:
+                return None
+
+        return bytearray(service_data)
+
+    def _on_detection(self, device: "BLEDevice", adv: "AdvertisementData"):
+        """
+        Detection callback, filters each advertisement as it arrives and notifies subscribers of SwitchBots
+
+        :param device: Device object
+        :type device: BLEDevice
+        :param adv: Device advertisement data
+        :type adv: AdvertisementData
+        """
+        service_data = self.filter_advertisement(device, adv)
+        if service_data is None:
+            return
+
+        advertisement = SwitchBotAdvertisement(device, adv, service_data, time.monotonic())
+        self._candidates[device.address] = advertisement
+
+        # Copy so callbacks can unsubscribe while being notified
+        for callback in list(self._subscribers):
+            try:
+                callback(advertisement)
+            except Exception:
+                # A failing subscriber must not stop delivery to the others (nor the scanner's callback)
+                _LOGGER.exception(
+                    "Scan session subscriber %r failed on advertisement from %s",
+                    callback,
+                    device.address,
+                    extra={"event": "subscriber_failed", "mac_address": device.address},
+                )
+
+    def subscribe(self, callback: Callable[[SwitchBotAdvertisement], None]) -> Callable[[], None]:
+        """
+        Call ``callback`` for every SwitchBot advertisement received
+
+        Subscribing does not start the scan, see ``acquire``.
+
+        :param callback: Called with each SwitchBot advertisement
+        :type callback: Callable[[SwitchBotAdvertisement], None]
+        :return: Function that unsubscribes the callback
+        :rtype: Callable[[], None]
+        """
+        self._subscribers.append(callback)
+
+        def unsubscribe():
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+        return unsubscribe
+
+    def candidates(self, max_age_s: Optional[float] = None) -> List[SwitchBotAdvertisement]:
+        """
+        SwitchBots already seen by this session (latest advertisement of each)
+
+        :param max_age_s: Only return advertisements received in the last ``max_age_s`` seconds, None for all
+        :type max_age_s: Optional[float]
+        :return: Buffered advertisements, oldest discovery first
+        :rtype: List[SwitchBotAdvertisement]
+        """
+        if max_age_s is None:
+            return list(self._candidates.values())
+
+        now = time.monotonic()
+        return [adv for adv in self._candidates.values() if now - adv.discovered_at <= max_age_s]
+
+    def _bind_loop(self) -> bool:
+        """
+        Bind the scan state to the running event loop, forgetting the state of a previous loop
+
+        A session outliving its event loop (e.g. the default session across ``asyncio.run`` calls)
+        cannot use the scanner, lock or timer of the old loop.
+
+        :return: False if state of a previous loop was dropped
+        :rtype: bool
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return True
+
+        was_bound = self._loop is not None
+        self._loop = loop
+        self._scanner = None
+        self._users = 0
+        self._lock = asyncio.Lock()
+        self._stop_handle = None
+        self._stop_task = None
+        return not was_bound
+
+    async def acquire(self):
+        """
+        Register a consumer, starting the scan if it is not running
+        """
+        self._bind_loop()
+
+        async with self._lock:
+            if self._stop_handle is not None:
+                self._stop_handle.cancel()
+                self._stop_handle = None
+
+            if self._scanner is None:
+                scanner = self._transport.create_scanner(self._on_detection, **self._scanner_kwargs)
+                await scanner.start()
+                self._scanner = scanner
+
+            # Only counted once the scan runs, a failed start leaves nothing to release
+            self._users += 1
+
+    async def release(self):
+        """
+        Unregister a consumer, the scan stops ``linger_s`` after the last one leaves
+        """
+        if not self._bind_loop() or self._users == 0:
+            return
+
+        self._users -= 1
+        if self._users > 0 or self._scanner is None:
+            return
+
+        if self._linger_s <= 0:
+            await self._stop_if_unused()
+            return
+
+        if self._stop_handle is not None:
+            self._stop_handle.cancel()
+        self._stop_handle = self._loop.call_later(self._linger_s, self._on_linger_expired)
+
+    def _on_linger_expired(self):
+        self._stop_handle = None
+        self._stop_task = asyncio.ensure_future(self._stop_if_unused())
+
+    async def _stop_if_unused(self):
+        """
+        Stop the scan if no consumer acquired it in the meantime
+        """
+        async with self._lock:
+            if self._users > 0 or self._scanner is None:
+                return
+
+            scanner = self._scanner
+            self._scanner = None
+            await scanner.stop()
+
+    async def close(self):
+        """
+        Stop the scan immediately, regardless of consumers
+        """
+        if not self._bind_loop():
+            return
+
+        self._users = 0
+        if self._stop_handle is not None:
+            self._stop_handle.cancel()
+            self._stop_handle = None
+
+        stop_task = self._stop_task
+        self._stop_task = None
+        if stop_task is not None and not stop_task.done():
+            await stop_task
+
+        await self._stop_if_unused()
+
+    @property
+    def is_scanning(self) -> bool:
+        return self._scanner is not None
+
+    @property
+    def transport(self) -> SwitchBotTransport:
+        """
+        The transport the session scans with, SwitchBots it finds are connected to through it
+
+        :return: The transport
+        :rtype: SwitchBotTransport
+        """
+        return self._transport
+
+    async def __aenter__(self) -> "SwitchBotScanSession":
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.release()
+
+
+_default_session: Optional[SwitchBotScanSession] = None
+
+
+def default_scan_session() -> SwitchBotScanSession:
+    """
+    The process wide scan session, shared by consumers that are not given their own
+
+    :return: The default scan session
+    :rtype: SwitchBotScanSession
+    """
+    global _default_session
+    if _default_session is None:
+        _default_session = SwitchBotScanSession()
+    return _default_session
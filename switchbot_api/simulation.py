@@ -0,0 +1,493 @@
+'''
+Python-Switchbot-BLE: A Python library for interfacing with Switchbot devices over Bluetooth Low Energy (BLE)
+Copyright (C) 2023  Benjamin Carlson
+'''
+
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+import asyncio
+import random
+import time
+import zlib
+
+from .bot_types import (
+    SwitchBotReqType,
+    SwitchBotRespStatus,
+    SwitchBotAction,
+    SwitchBotMode,
+    SwitchBotDeviceType,
+    TimeManagementInfoSubCommand,
+)
+from .scan_session import SwitchBotScanSession
+from .transport import SwitchBotTransport
+
+__all__ = [
+    "SimulatedDevice",
+    "SimulatedAdvertisement",
+    "SimulatedSwitchBot",
+    "SimulatedClient",
+    "SimulatedScanner",
+    "SimulatedTransport",
+]
+
+
+@dataclass
+class SimulatedDevice:
+    '''
+    Stand-in for ``bleak.BLEDevice``
+    '''
+
+    address: str
+    name: Optional[str] = "WoHand"
+
+
+@dataclass
+class SimulatedAdvertisement:
+    '''
+    Stand-in for ``bleak.AdvertisementData``
+    '''
+
+    manufacturer_data: Dict[int, bytes]
+    service_data: Dict[str, bytes]
+    rssi: int = -60
+    local_name: Optional[str] = None
+    service_uuids: List[str] = field(default_factory=list)
+    tx_power: Optional[int] = None
+
+
+class SimulatedSwitchBot:
+    def __init__(
+        self,
+        mac_address: str,
+        password_str: Optional[str] = None,
+        bot_mode: SwitchBotMode = SwitchBotMode.ON_OFF_STATE,
+        is_off: bool = True,
+        battery_percent: int = 100,
+        firmware_version: float = 6.3,
+        response_latency_s: float = 0.0,
+        actuation_s: float = 0.0,
+        busy_probability: float = 0.0,
+        rng: Optional[random.Random] = None,
+    ) -> None:
+        """
+        A software SwitchBot (Bot) speaking the same protocol as the real device
+
+        :param mac_address: The MAC address the bot advertises with
+        :type mac_address: str
+        :param password_str: The bot's password, None if not encrypted
+        :type password_str: Optional[str]
+        :param bot_mode: The bot's mode
+        :type bot_mode: SwitchBotMode
+        :param is_off: Initial state
+        :type is_off: bool
+        :param battery_percent: Reported battery (0-100)
+        :type battery_percent: int
+        :param firmware_version: Reported firmware version
+        :type firmware_version: float
+        :param response_latency_s: Time (seconds) between a request being written and its notification
+        :type response_latency_s: float
+        :param actuation_s: Time (seconds) the arm takes to move, the bot answers BUSY meanwhile
+        :type actuation_s: float
+        :param busy_probability: Probability of answering any request with BUSY
+        :type busy_probability: float
+        :param rng: Random source for BUSY injection
+        :type rng: Optional[random.Random]
+        """
+        self.mac_address = mac_address
+        self.bot_mode = bot_mode
+        self.is_off = is_off
+        self.battery_percent = battery_percent
+        self.firmware_version = firmware_version
+        self.response_latency_s = response_latency_s
+        self.actuation_s = actuation_s
+        self.busy_probability = busy_probability
+        self._rng = rng if rng is not None else random.Random()
+
+        self.password_checksum: Optional[bytes] = None
+        if password_str is not None:
+            self.password_checksum = zlib.crc32(password_str.encode()).to_bytes(4, byteorder="big")
+
+        self.push_button_strength = 100
+        self.is_inverse = False
+        # Offset between the bot's clock and the host's
+        self.time_offset_s = 0
+        self.alarm_count = 0
+        self.alarms: Dict[int, bytes] = {}
+
+        # time.monotonic() until which the arm is moving
+        self._busy_until = 0.0
+
+        # Counters
+        self.requests_handled = 0
+        self.actions_executed: List[SwitchBotAction] = []
+
+    @property
+    def is_encrypted(self) -> bool:
+        return self.password_checksum is not None
+
+    def service_data(self) -> bytes:
+        """
+        The SwitchBot service data advertised (and returned in basic info)
+
+        :return: Encryption/device type, status and battery bytes
+        :rtype: bytes
+        """
+        enc_dev_type = SwitchBotDeviceType.BOT.value | (0x80 if self.is_encrypted else 0x00)
+        status = (0x80 if self.bot_mode == SwitchBotMode.ON_OFF_STATE else 0x00) | (0x40 if self.is_off else 0x00)
+        return bytes([enc_dev_type, status, self.battery_percent & 0x7F])
+
+    def advertisement(self, rssi: int = -60) -> SimulatedAdvertisement:
+        """
+        The advertisement the bot currently broadcasts
+
+        :param rssi: Signal strength to report
+        :type rssi: int
+        :return: The advertisement
+        :rtype: SimulatedAdvertisement
+        """
+        return SimulatedAdvertisement(
+            manufacturer_data={
+                SwitchBotScanSession.NORDIC_MANUFACTURER_ID: bytes.fromhex(self.mac_address.replace(":", ""))
+            },
+            service_data={SwitchBotScanSession.UNKNOWN_SERVICE_DATA_UUID: self.service_data()},
+            rssi=rssi,
+        )
+
+    def handle_request(self, data: bytes) -> bytes:
+        """
+        Process a request written to the REQ characteristic
+
+        :param data: The request packet
+        :type data: bytes
+        :return: The notification sent on the RESP characteristic (status byte first)
+        :rtype: bytes
+        """
+        self.requests_handled += 1
+
+        if len(data) < 2 or data[0] != 0x57:
+            return bytes([SwitchBotRespStatus.ERROR.value])
+
+        command = data[1] & 0x0F
+        is_encrypted_req = (data[1] >> 4) & 0x01 == 0x01
+        body = bytes(data[2:])
+
+        # VirtualSwitchBot sends an extra 0x08 byte before the body of time management updates
+        if command == SwitchBotReqType.SET_TIME_MGMT_INFO.value and body[:1] == b"\x08":
+            if not is_encrypted_req or body[1:5] == self.password_checksum:
+                body = body[1:]
+
+        if is_encrypted_req:
+            if not self.is_encrypted:
+                return bytes([SwitchBotRespStatus.DEV_UNENCRYPTED.value])
+            if body[:4] != self.password_checksum:
+                return bytes([SwitchBotRespStatus.ENC_WRONG_PASSWORD.value])
+            body = body[4:]
+        elif self.is_encrypted:
+            return bytes([SwitchBotRespStatus.PASSWORD_ERROR.value])
+
+        if self.busy_probability > 0 and self._rng.random() < self.busy_probability:
+            return bytes([SwitchBotRespStatus.BUSY.value])
+
+        handler = self._HANDLERS.get(command)
+        if handler is None:
+            return bytes([SwitchBotRespStatus.COMMAND_NOT_SUPPORTED.value])
+        return handler(self, body)
+
+    def _ok(self, payload: bytes = b"") -> bytes:
+        return bytes([SwitchBotRespStatus.OK.value]) + payload
+
+    def _handle_command(self, body: bytes) -> bytes:
+        if time.monotonic() < self._busy_until:
+            return bytes([SwitchBotRespStatus.BUSY.value])
+
+        if len(body) == 0:
+            actions = [SwitchBotAction.PRESS]
+        else:
+            # First action, then (delay, action) pairs
+            actions = [SwitchBotAction(body[0])] + [SwitchBotAction(a) for a in body[2::2]]
+
+        for action in actions:
+            self.actions_executed.append(action)
+            if action == SwitchBotAction.ON:
+                self.is_off = False
+            elif action == SwitchBotAction.OFF:
+                self.is_off = True
+
+        self._busy_until = time.monotonic() + self.actuation_s + sum(body[1::2])
+        return self._ok()
+
+    def _handle_get_basic_info(self, body: bytes) -> bytes:
+        act_mode = (self.bot_mode.value << 4) | (0x01 if self.is_inverse else 0x00)
+        info = bytes(
+            [
+                self.battery_percent,
+                int(round(self.firmware_version * 10)),
+                self.push_button_strength,
+                0x00, 0x00,  # ADC value
+                0x00, 0xA1,  # Motor calibration
+                self.alarm_count,
+                act_mode,
+                0x00,  # Hold and press times
+            ]
+        )
+        return self._ok(info + self.service_data()[:2])
+
+    def _handle_set_basic_info(self, body: bytes) -> bytes:
+        if len(body) < 2:
+            return bytes([SwitchBotRespStatus.ERROR.value])
+        self.push_button_strength = body[0]
+        self.bot_mode = SwitchBotMode((body[1] >> 4) & 0x01)
+        self.is_inverse = body[1] & 0x01 == 0x01
+        return self._ok()
+
+    def _handle_set_password(self, body: bytes) -> bytes:
+        if len(body) == 0:
+            self.password_checksum = None
+            return self._ok()
+        if len(body) < 6 or body[:2] != b"\x01\x04":
+            return bytes([SwitchBotRespStatus.ERROR.value])
+        self.password_checksum = bytes(body[2:6])
+        return self._ok()
+
+    def _handle_get_time_mgmt_info(self, body: bytes) -> bytes:
+        if len(body) < 1:
+            return bytes([SwitchBotRespStatus.ERROR.value])
+
+        subcommand = body[0] & 0x0F
+        if subcommand == TimeManagementInfoSubCommand.DEVICE_TIME.value:
+            return self._ok((int(time.time()) + self.time_offset_s).to_bytes(8, byteorder="big"))
+        if subcommand == TimeManagementInfoSubCommand.ALARM_COUNT.value:
+            return self._ok(bytes([self.alarm_count]))
+        if subcommand == TimeManagementInfoSubCommand.ALARM_INFO.value:
+            alarm_id = body[0] >> 4
+            alarm = self.alarms.get(alarm_id, bytes([self.alarm_count, alarm_id]) + bytes(9))
+            return self._ok(alarm)
+        return bytes([SwitchBotRespStatus.COMMAND_NOT_SUPPORTED.value])
+
+    def _handle_set_time_mgmt_info(self, body: bytes) -> bytes:
+        if len(body) < 1:
+            return bytes([SwitchBotRespStatus.ERROR.value])
+
+        subcommand = body[0] & 0x0F
+        data = body[1:]
+        if subcommand == TimeManagementInfoSubCommand.DEVICE_TIME.value and len(data) == 8:
+            self.time_offset_s = int.from_bytes(data, byteorder="big") - int(time.time())
+            return self._ok()
+        if subcommand == TimeManagementInfoSubCommand.ALARM_COUNT.value and len(data) == 1:
+            self.alarm_count = data[0]
+            return self._ok()
+        if subcommand == TimeManagementInfoSubCommand.ALARM_INFO.value and len(data) == 11:
+            self.alarms[body[0] >> 4] = bytes(data)
+            return self._ok()
+        return bytes([SwitchBotRespStatus.ERROR.value])
+
+    def _handle_extended_command(self, body: bytes) -> bytes:
+        return self._ok()
+
+    _HANDLERS: Dict[int, Callable[["SimulatedSwitchBot", bytes], bytes]] = {
+        SwitchBotReqType.COMMAND.value: _handle_command,
+        SwitchBotReqType.GET_BASIC_INFO.value: _handle_get_basic_info,
+        SwitchBotReqType.SET_BASIC_INFO.value: _handle_set_basic_info,
+        SwitchBotReqType.SET_PASSWORD.value: _handle_set_password,
+        SwitchBotReqType.GET_TIME_MGMT_INFO.value: _handle_get_time_mgmt_info,
+        SwitchBotReqType.SET_TIME_MGMT_INFO.value: _handle_set_time_mgmt_info,
+        SwitchBotReqType.EXTENDED_COMMAND.value: _handle_extended_command,
+    }
+
+
+class SimulatedClient:
+    def __init__(
+        self,
+        bot: SimulatedSwitchBot,
+        transport: "SimulatedTransport",
+        disconnected_callback: Optional[Callable[[Any], None]] = None,
+    ) -> None:
+        """
+        Connection to a SimulatedSwitchBot, with the ``bleak.BleakClient`` methods VirtualSwitchBot uses
+
+        :param bot: The simulated bot
+        :type bot: SimulatedSwitchBot
+        :param transport: The transport the client belongs to (provides link latencies)
+        :type transport: SimulatedTransport
+        :param disconnected_callback: Called with the client when it disconnects or its link is dropped
+        :type disconnected_callback: Optional[Callable[[Any], None]]
+        """
+        self._bot = bot
+        self._transport = transport
+        self._disconnected_callback = disconnected_callback
+        self._is_connected = False
+        self._notify_callback: Optional[Callable[[Any, bytearray], Any]] = None
+
+    async def connect(self):
+        if self._transport.connect_latency_s > 0:
+            await asyncio.sleep(self._transport.connect_latency_s)
+        if not self._transport.is_reachable(self._bot.mac_address):
+            raise ConnectionError(f"Could not connect to {self._bot.mac_address}")
+        self._is_connected = True
+        self._transport._clients.setdefault(self._bot.mac_address, set()).add(self)
+
+    async def disconnect(self):
+        self.drop()
+
+    def drop(self):
+        """
+        Close the connection, calling the disconnected callback (like bleak, also for requested disconnects)
+        """
+        if not self._is_connected:
+            return
+        self._is_connected = False
+        self._notify_callback = None
+        self._transport._clients.get(self._bot.mac_address, set()).discard(self)
+        if self._disconnected_callback is not None:
+            asyncio.get_running_loop().call_soon(self._disconnected_callback, self)
+
+    @property
+    def is_connected(self) -> bool:
+        return self._is_connected
+
+    async def start_notify(self, char_specifier: Any, callback: Callable[[Any, bytearray], Any]):
+        self._notify_callback = callback
+
+    def _notify(self, char_specifier: Any, notification: bytearray):
+        # Notifications in flight are lost with the link
+        if self._notify_callback is not None:
+            self._notify_callback(char_specifier, notification)
+
+    async def write_gatt_char(self, char_specifier: Any, data: Any, response: bool = False):
+        if not self._is_connected:
+            raise ConnectionError(f"Not connected to {self._bot.mac_address}")
+
+        notification = bytearray(self._bot.handle_request(bytes(data)))
+        if self._notify_callback is not None and not self._transport._take_dropped_notification(self._bot.mac_address):
+            loop = asyncio.get_running_loop()
+            delay = self._bot.response_latency_s
+            if delay > 0:
+                loop.call_later(delay, self._notify, char_specifier, notification)
+            else:
+                loop.call_soon(self._notify, char_specifier, notification)
+
+        # A write with response waits for the ATT write response round trip
+        if response and self._transport.write_response_latency_s > 0:
+            await asyncio.sleep(self._transport.write_response_latency_s)
+
+
+class SimulatedScanner:
+    def __init__(self, transport: "SimulatedTransport", detection_callback: Callable[[Any, Any], None]) -> None:
+        """
+        Scanner receiving the advertisements of every bot of a SimulatedTransport
+
+        :param transport: The transport whose bots are advertising
+        :type transport: SimulatedTransport
+        :param detection_callback: Called with ``(device, advertisement_data)`` for every advertisement
+        :type detection_callback: Callable[[Any, Any], None]
+        """
+        self._transport = transport
+        self._detection_callback = detection_callback
+        self._task: Optional[asyncio.Task] = None
+
+    async def _advertise(self):
+        while True:
+            for bot in list(self._transport.bots.values()):
+                self._detection_callback(SimulatedDevice(bot.mac_address), bot.advertisement())
+            await asyncio.sleep(self._transport.advertise_interval_s)
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._advertise())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+class SimulatedTransport(SwitchBotTransport):
+    def __init__(
+        self,
+        bots: Iterable[SimulatedSwitchBot] = (),
+        connect_latency_s: float = 0.0,
+        write_response_latency_s: float = 0.0,
+        advertise_interval_s: float = 0.1,
+    ) -> None:
+        """
+        A transport to simulated SwitchBots, for tests and benchmarks without a radio
+
+        .. code-block:: python
+
+            transport = SimulatedTransport([SimulatedSwitchBot("AA:BB:CC:DD:EE:FF")])
+            bot = VirtualSwitchBot("AA:BB:CC:DD:EE:FF", transport=transport)
+
+        :param bots: The simulated bots reachable through the transport
+        :type bots: Iterable[SimulatedSwitchBot]
+        :param connect_latency_s: Time (seconds) a connection takes to establish
+        :type connect_latency_s: float
+        :param write_response_latency_s: ATT write response round trip (seconds) for writes with response
+        :type write_response_latency_s: float
+        :param advertise_interval_s: Time (seconds) between advertisements of each bot
+        :type advertise_interval_s: float
+        """
+        self.bots: Dict[str, SimulatedSwitchBot] = {bot.mac_address: bot for bot in bots}
+        self.connect_latency_s = connect_latency_s
+        self.write_response_latency_s = write_response_latency_s
+        self.advertise_interval_s = advertise_interval_s
+
+        # Connected clients of each bot, and until when (time.monotonic()) bots cannot be connected to
+        self._clients: Dict[str, Set[SimulatedClient]] = {}
+        self._unreachable_until: Dict[str, float] = {}
+        # Notifications of each bot still to be lost
+        self._notifications_to_drop: Dict[str, int] = {}
+
+    def drop_link(self, mac_address: str, unreachable_s: float = 0.0) -> int:
+        """
+        Drop the connections to a bot, like a radio link loss
+
+        :param mac_address: The MAC address of the bot
+        :type mac_address: str
+        :param unreachable_s: Time (seconds) connecting to the bot keeps failing afterwards
+        :type unreachable_s: float
+        :return: The number of connections dropped
+        :rtype: int
+        """
+        if unreachable_s > 0:
+            self._unreachable_until[mac_address] = time.monotonic() + unreachable_s
+        clients = list(self._clients.get(mac_address, ()))
+        for client in clients:
+            client.drop()
+        return len(clients)
+
+    def drop_notifications(self, mac_address: str, count: int = 1):
+        """
+        Lose the next response notifications of a bot (the requests are still handled), like radio packet loss
+
+        :param mac_address: The MAC address of the bot
+        :type mac_address: str
+        :param count: The number of notifications lost
+        :type count: int
+        """
+        self._notifications_to_drop[mac_address] = self._notifications_to_drop.get(mac_address, 0) + count
+
+    def _take_dropped_notification(self, mac_address: str) -> bool:
+        remaining = self._notifications_to_drop.get(mac_address, 0)
+        if remaining == 0:
+            return False
+        self._notifications_to_drop[mac_address] = remaining - 1
+        return True
+
+    def is_reachable(self, mac_address: str) -> bool:
+        return mac_address in self.bots and time.monotonic() >= self._unreachable_until.get(mac_address, 0.0)
+
+    def add_bot(self, bot: SimulatedSwitchBot) -> SimulatedSwitchBot:
+        self.bots[bot.mac_address] = bot
+        return bot
+
+    async def find_device(self, mac_address: str, timeout: float = 10.0) -> Optional[Any]:
+        if mac_address not in self.bots:
+            return None
+        return SimulatedDevice(mac_address)
+
+    def create_client(self, device: Any, disconnected_callback: Optional[Callable[[Any], None]] = None) -> Any:
+        address = device if isinstance(device, str) else device.address
+        return SimulatedClient(self.bots[address], self, disconnected_callback)
+
+    def create_scanner(self, detection_callback: Callable[[Any, Any], None], **kwargs: Any) -> Any:
+        return SimulatedScanner(self, detection_callback)
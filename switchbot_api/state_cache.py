@@ -0,0 +1,243 @@
+'''
+Python-Switchbot-BLE: A Python library for interfacing with Switchbot devices over Bluetooth Low Energy (BLE)
+Copyright (C) 2023  Benjamin Carlson
+'''
+
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+import asyncio
+import logging
+import time
+
+from .bot_types import SwitchBotMode
+from .bot_information import BotInformation
+from .bot_response import SwitchBotTimeoutError
+from .scan_session import SwitchBotAdvertisement, SwitchBotScanSession, default_scan_session
+
+_LOGGER = logging.getLogger(__name__)
+
+__all__ = ["CachedBotState", "SwitchBotStateCache"]
+
+
+@dataclass
+class CachedBotState:
+    '''
+    The last advertised state of a SwitchBot
+    '''
+
+    # The state decoded from the advertisement service data
+    info: BotInformation
+
+    # When the state was last advertised (time.monotonic())
+    updated_at: float
+
+    # Signal strength of the last advertisement
+    rssi: Optional[int] = None
+
+    @property
+    def age_s(self) -> float:
+        return time.monotonic() - self.updated_at
+
+
+class SwitchBotStateCache:
+    def __init__(self, session: Optional[SwitchBotScanSession] = None) -> None:
+        """
+        Per-SwitchBot state kept up to date from advertisements, readable without connecting
+
+        .. code-block:: python
+
+            async with SwitchBotStateCache() as cache:
+                ...
+                is_off = cache.is_off("F6:9A:4E:9C:3F:3B", max_age_s=60)
+
+        :param session: The scan session to listen to, defaults to the shared session
+        :type session: Optional[SwitchBotScanSession]
+        """
+        self._session = session if session is not None else default_scan_session()
+        self._states: Dict[str, CachedBotState] = {}
+        self._unsubscribe: Optional[Callable[[], None]] = None
+        # Callers of wait_until waiting for the next advertisement of a SwitchBot
+        self._update_waiters: Dict[str, List[asyncio.Future]] = {}
+
+    def _on_advertisement(self, advertisement: SwitchBotAdvertisement):
+        """
+        Session subscriber, updates the state of the advertising SwitchBot
+
+        :param advertisement: The SwitchBot advertisement received
+        :type advertisement: SwitchBotAdvertisement
+        """
+        state = self._states.get(advertisement.address)
+        info = state.info if state is not None else BotInformation()
+        try:
+            info.read_service_bytes(advertisement.service_data)
+        except (ValueError, IndexError) as err:
+            # Other SwitchBot models advertise service data the Bot decoder does not understand
+            _LOGGER.debug(
+                "Skipping undecodable advertisement from %s: %s",
+                advertisement.address,
+                err,
+                extra={"event": "advertisement_skipped", "mac_address": advertisement.address},
+            )
+            return
+
+        if state is None:
+            state = CachedBotState(info, advertisement.discovered_at)
+            self._states[advertisement.address] = state
+
+        state.updated_at = advertisement.discovered_at
+        state.rssi = advertisement.advertisement_data.rssi
+
+        waiters = self._update_waiters.pop(advertisement.address, None)
+        if waiters is not None:
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_result(None)
+
+    async def start(self):
+        """
+        Start following advertisements (starts the scan session if needed)
+        """
+        if self._unsubscribe is not None:
+            return
+
+        # Seed with what the session has already seen
+        for advertisement in self._session.candidates():
+            self._on_advertisement(advertisement)
+
+        self._unsubscribe = self._session.subscribe(self._on_advertisement)
+        await self._session.acquire()
+
+    async def stop(self):
+        """
+        Stop following advertisements, cached states are kept
+        """
+        if self._unsubscribe is None:
+            return
+
+        self._unsubscribe()
+        self._unsubscribe = None
+        await self._session.release()
+
+    def get(self, mac_address: str, max_age_s: Optional[float] = None) -> Optional[CachedBotState]:
+        """
+        The cached state of a SwitchBot
+
+        :param mac_address: The MAC address of the SwitchBot
+        :type mac_address: str
+        :param max_age_s: Ignore states older than this many seconds, None to accept any age
+        :type max_age_s: Optional[float]
+        :return: The cached state, None if unknown or too old
+        :rtype: Optional[CachedBotState]
+        """
+        state = self._states.get(mac_address)
+        if state is None:
+            return None
+        if max_age_s is not None and time.monotonic() - state.updated_at > max_age_s:
+            return None
+        return state
+
+    def is_off(self, mac_address: str, max_age_s: Optional[float] = None) -> Optional[bool]:
+        """
+        Whether the SwitchBot is off, from its last advertisement
+
+        :param mac_address: The MAC address of the SwitchBot
+        :type mac_address: str
+        :param max_age_s: Ignore states older than this many seconds, None to accept any age
+        :type max_age_s: Optional[float]
+        :return: True if off, None if unknown or too old
+        :rtype: Optional[bool]
+        """
+        state = self.get(mac_address, max_age_s)
+        return state.info.is_off if state is not None else None
+
+    def battery_percent(self, mac_address: str, max_age_s: Optional[float] = None) -> Optional[int]:
+        """
+        The remaining battery of the SwitchBot, from its last advertisement
+
+        :param mac_address: The MAC address of the SwitchBot
+        :type mac_address: str
+        :param max_age_s: Ignore states older than this many seconds, None to accept any age
+        :type max_age_s: Optional[float]
+        :return: Battery percent (0-100), None if unknown or too old
+        :rtype: Optional[int]
+        """
+        state = self.get(mac_address, max_age_s)
+        return state.info.remaining_battery_percent if state is not None else None
+
+    def bot_mode(self, mac_address: str, max_age_s: Optional[float] = None) -> Optional[SwitchBotMode]:
+        """
+        The mode of the SwitchBot, from its last advertisement
+
+        :param mac_address: The MAC address of the SwitchBot
+        :type mac_address: str
+        :param max_age_s: Ignore states older than this many seconds, None to accept any age
+        :type max_age_s: Optional[float]
+        :return: The bot mode, None if unknown or too old
+        :rtype: Optional[SwitchBotMode]
+        """
+        state = self.get(mac_address, max_age_s)
+        return state.info.bot_mode if state is not None else None
+
+    async def wait_until(
+        self,
+        mac_address: str,
+        predicate: Callable[[BotInformation], bool],
+        timeout: float,
+        since: Optional[float] = None,
+    ) -> CachedBotState:
+        """
+        Wait until a SwitchBot advertises a state matching ``predicate``
+
+        :param mac_address: The MAC address of the SwitchBot
+        :type mac_address: str
+        :param predicate: Returns True for the awaited state
+        :type predicate: Callable[[BotInformation], bool]
+        :param timeout: Time (seconds) to wait
+        :type timeout: float
+        :param since: Only accept states advertised at or after this ``time.monotonic()`` value, None for any
+        :type since: Optional[float]
+        :raises SwitchBotTimeoutError: The state was not advertised in time
+        :return: The matching state
+        :rtype: CachedBotState
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+
+        while True:
+            state = self._states.get(mac_address)
+            if state is not None and (since is None or state.updated_at >= since) and predicate(state.info):
+                return state
+
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise SwitchBotTimeoutError(None, timeout, f"state advertisement from {mac_address}")
+
+            waiter = loop.create_future()
+            self._update_waiters.setdefault(mac_address, []).append(waiter)
+            try:
+                await asyncio.wait_for(waiter, remaining)
+            except asyncio.TimeoutError:
+                raise SwitchBotTimeoutError(
+                    None, timeout, f"state advertisement from {mac_address}"
+                ) from None
+            finally:
+                waiters = self._update_waiters.get(mac_address)
+                if waiters is not None and waiter in waiters:
+                    waiters.remove(waiter)
+
+    @property
+    def addresses(self) -> List[str]:
+        """
+        Every SwitchBot with a cached state
+
+        :return: MAC addresses
+        :rtype: List[str]
+        """
+        return list(self._states)
+
+    async def __aenter__(self) -> "SwitchBotStateCache":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
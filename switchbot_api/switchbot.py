@@ -3,13 +3,19 @@ Python-Switchbot-BLE: A Python library for interfacing with Switchbot devices ov
 Copyright (C) 2023  Benjamin Carlson
 '''
 
-from bleak import BleakClient, BleakScanner, BLEDevice, BleakGATTCharacteristic
-from typing import Optional, List, Union, Tuple
+from typing import TYPE_CHECKING, Callable, Dict, Optional, List, Union, Tuple, Deque
+from collections import deque
 import asyncio
+import logging
+import struct
 import zlib
 import time
 import math
 
+if TYPE_CHECKING:
+    from bleak import BleakClient, BLEDevice, BleakGATTCharacteristic, AdvertisementData
+    from .connection_supervisor import SwitchBotSupervisor
+
 from .bot_types import (
     SwitchBotReqType,
     SwitchBotCommand,
@@ -17,10 +23,38 @@ from .bot_types import (
     SwitchBotAction,
     TimeManagementInfoSubCommand,
     SwitchBotMode,
-    f_bytes,
+    SwitchBotMetadata,
+    LazyHex,
 )
 from .bot_information import BotInformation
+from .bot_response import (
+    SwitchBotResponse,
+    SwitchBotError,
+    SwitchBotResponseError,
+    SwitchBotTimeoutError,
+    SwitchBotNotFoundError,
+    SwitchBotDisconnectedError,
+    SwitchBotDecodeError,
+)
 from .alarm_info import AlarmInfo
+from .state_cache import SwitchBotStateCache
+from .retry_policy import RetryPolicy, CircuitBreaker, RetryStats
+from .transport import SwitchBotTransport, default_transport
+from .response_decoders import decoders_for
+from .metrics import SwitchBotMetrics, default_metrics
+from .tracing import Span, Tracer, default_tracer
+
+_LOGGER = logging.getLogger(__name__)
+
+# The bot state (is_off) each action leaves the SwitchBot in, PRESS has no lasting state
+_ACTION_RESULT_IS_OFF = {
+    SwitchBotAction.ON: False,
+    SwitchBotAction.OFF: True,
+}
+
+# Actions a single run_action_set packet holds (the password checksum takes the room of one)
+MAX_ACTION_SET_ACTIONS = 9
+MAX_ENCRYPTED_ACTION_SET_ACTIONS = 8
 
 # Functionality to capture packets for
 #   - Custom Mode
@@ -28,154 +62,669 @@ from .alarm_info import AlarmInfo
 #   - Messages between 0x01 and 0x0F
 
 
+class _PendingRequest:
+    """
+    A request that has been written to the SwitchBot and is waiting for its notification
+    """
+
+    __slots__ = ("request_type", "subcommand", "future", "sent_at", "span", "abandoned", "overdue_at")
+
+    def __init__(
+        self,
+        request_type: SwitchBotReqType,
+        future: "asyncio.Future[SwitchBotResponse]",
+        subcommand: Optional[int] = None,
+        span: Optional[Span] = None,
+    ):
+        self.request_type = request_type
+        # Selects the response decoder together with the request type (e.g. TimeManagementInfoSubCommand)
+        self.subcommand = subcommand
+        self.future = future
+        # time.monotonic() when the request was written
+        self.sent_at = 0.0
+        # Span of the request attempt, the notification is recorded as its event
+        self.span = span if span is not None else Span()
+        # Set when the caller gave up after the write (timeout, cancel), the entry then stays queued
+        # to swallow its late response until the response is considered lost
+        self.abandoned = False
+        # time.monotonic() after which the response of an abandoned request is overdue
+        self.overdue_at = 0.0
+
+
 class VirtualSwitchBot:
     def __init__(
         self,
         mac_address: str,
-        device: Optional[BLEDevice] = None,
+        device: Optional[Union["BLEDevice", str]] = None,
         password_str: Optional[str] = None,
+        request_timeout: float = 5.0,
+        pipeline_depth: int = 1,
+        advertisement_data: Optional["AdvertisementData"] = None,
+        discovered_at: Optional[float] = None,
+        device_max_age: float = 30.0,
+        state_cache: Optional[SwitchBotStateCache] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        transport: Optional[SwitchBotTransport] = None,
+        write_with_response: bool = True,
+        metrics: Optional[SwitchBotMetrics] = None,
+        tracer: Optional[Tracer] = None,
     ):
         """
         A SwitchBot wrapper class for sending commands to/from the physical SwitchBot
 
         :param mac_address: The MAC address of the SwitchBot
         :type mac_address: str
-        :param device: Already found BLEDevice (avoids finding twice)
-        :type device: Optional[bleak.BLEDevice]
+        :param device: Already found BLEDevice (avoids finding twice), or the address of a known SwitchBot to connect to without ``find_device``
+        :type device: Optional[Union[bleak.BLEDevice, str]]
         :param password_str: The SwitchBot's password, None if no password is set
         :type password_str: Optional[str]
+        :param request_timeout: Default time (seconds) to wait for the response to a request
+        :type request_timeout: float
+        :param pipeline_depth: Maximum number of requests in flight (awaiting a response) at once
+        :type pipeline_depth: int
+        :param advertisement_data: The advertisement ``device`` was discovered with
+        :type advertisement_data: Optional[bleak.AdvertisementData]
+        :param discovered_at: When ``device`` was discovered (``time.monotonic()``), None if unknown
+        :type discovered_at: Optional[float]
+        :param device_max_age: Age (seconds) after which a discovered device is stale and is scanned for again
+        :type device_max_age: float
+        :param state_cache: Advertisement state cache used to confirm state changes, None to read basic info instead
+        :type state_cache: Optional[SwitchBotStateCache]
+        :param retry_policy: How requests answered with a transient status (e.g. BUSY) are retried, None to never retry
+        :type retry_policy: Optional[RetryPolicy]
+        :param circuit_breaker: Stops sending requests after repeated failures, None to always send
+        :type circuit_breaker: Optional[CircuitBreaker]
+        :param transport: How the SwitchBot is found and connected to, defaults to bleak
+        :type transport: Optional[SwitchBotTransport]
+        :param write_with_response: Wait for the ATT write response of each request, False to only wait for the response notification
+        :type write_with_response: bool
+        :param metrics: Metrics to record into, defaults to those enabled with ``enable_metrics`` (if any)
+        :type metrics: Optional[SwitchBotMetrics]
+        :param tracer: Tracer of the connect and request phases, defaults to the one enabled with ``enable_tracing`` (no-op otherwise)
+        :type tracer: Optional[Tracer]
         """
+        if pipeline_depth < 1:
+            raise ValueError(f"Invalid pipeline depth {pipeline_depth}, must be at least 1")
+
         self._address = mac_address
+        self._transport = transport if transport is not None else default_transport()
 
         # Used for setting up a pre-connected device, if available
         self._device = device
-        self._client: Optional[BleakClient] = None
+        self._advertisement_data = advertisement_data
+        self._discovered_at = discovered_at
+        self._device_max_age = device_max_age
+        self._client: Optional["BleakClient"] = None
 
         self._info = BotInformation()
 
-        # Used to know what request yielded which response
-        self._request_response_queue: Optional[asyncio.Queue] = None
+        # Packets of single actions, built for the password/encryption state of _packet_cache_generation
+        self._packet_cache: Dict[SwitchBotAction, bytes] = {}
+        self._packet_cache_generation = -1
+
+        self._request_timeout = request_timeout
+        self._pipeline_depth = pipeline_depth
+        self._write_with_response = write_with_response
+
+        # Requests awaiting a response, in the order they were written (responses arrive in the same order)
+        self._request_response_queue: Deque[_PendingRequest] = deque()
+        # Fastest write to response seen, None until a request has been answered
+        self._min_round_trip_s: Optional[float] = None
+        # Created on the first connect so they are bound to the running event loop, then kept across
+        # reconnects (requests waiting on them must keep counting against the same limits)
+        self._pipeline_slots: Optional[asyncio.Semaphore] = None
+        self._write_lock: Optional[asyncio.Lock] = None
+        self._pipeline_loop: Optional[asyncio.AbstractEventLoop] = None
+
+        # Metadata fetched since the last connect
+        self._loaded_metadata = SwitchBotMetadata.NONE
+
+        self._state_cache = state_cache
+
+        self._retry_policy = retry_policy if retry_policy is not None else RetryPolicy(max_attempts=1)
+        self._circuit_breaker = circuit_breaker
+        self._retry_stats = RetryStats()
+
+        # Called when the connection is lost (not when disconnect() is called)
+        self._disconnect_subscribers: List[Callable[[], None]] = []
+        self._supervisor: Optional["SwitchBotSupervisor"] = None
+
+        # None when metrics are disabled, every recording site checks it first
+        self._metrics = metrics if metrics is not None else default_metrics()
+        self._tracer = tracer if tracer is not None else default_tracer()
 
         if password_str is not None:
             self._info.password_str = password_str
 
-    async def connect(self):
+    async def connect(self, prefetch: SwitchBotMetadata = SwitchBotMetadata.ALL):
         """
         Find (if device has not been set), and connect to the SwitchBot
+
+        Metadata not prefetched can be loaded later with ``ensure_metadata``. Use
+        ``SwitchBotMetadata.NONE`` for the fastest connect (only the radio round trips).
+
+        :param prefetch: The metadata to fetch once connected
+        :type prefetch: SwitchBotMetadata
+        """
+        with self._tracer.start_span("switchbot.connect", mac_address=self._address):
+            if self._metrics is None:
+                await self._connect(prefetch)
+                return
+
+            started = time.monotonic()
+            try:
+                await self._connect(prefetch)
+            except BaseException:
+                self._metrics.connects.labels(self._address, "error").inc()
+                raise
+            self._metrics.connects.labels(self._address, "ok").inc()
+            self._metrics.connect_duration.labels(self._address).observe(time.monotonic() - started)
+
+    async def _connect(self, prefetch: SwitchBotMetadata):
+        """
+        Find (if needed) and connect to the SwitchBot, then prefetch its metadata
+
+        :param prefetch: The metadata to fetch once connected
+        :type prefetch: SwitchBotMetadata
+        """
+        self._request_response_queue.clear()
+        self._loaded_metadata = SwitchBotMetadata.NONE
+        loop = asyncio.get_running_loop()
+        if self._pipeline_loop is not loop:
+            # Waiters of a previous event loop can never run again
+            self._pipeline_slots = asyncio.Semaphore(self._pipeline_depth)
+            self._write_lock = asyncio.Lock()
+            self._pipeline_loop = loop
+
+        reused_device = self._device is not None and self._is_device_fresh()
+        if not reused_device:
+            await self._find_device()
+
+        try:
+            await self._connect_client()
+        except UserWarning:
+            if not reused_device:
+                raise
+            # The cached device may have moved or changed its advertisement, find it again once
+            _LOGGER.info(
+                "Could not connect to cached device for %s, scanning again",
+                self._address,
+                extra={"event": "reconnect_scan", "mac_address": self._address},
+            )
+            await self._find_device()
+            await self._connect_client()
+
+        _LOGGER.info("Connected to %s", self._address, extra={"event": "connected", "mac_address": self._address})
+
+        with self._tracer.start_span("switchbot.start_notify"):
+            await self._client.start_notify(
+                SwitchBotCommand.RESP_CHAR_UUID.value, self._notif_callback_handler
+            )
+
+        with self._tracer.start_span("switchbot.prefetch"):
+            await self.ensure_metadata(prefetch)
+
+    def _is_device_fresh(self) -> bool:
         """
-        self._request_response_queue = asyncio.Queue()
+        Whether the discovered device is recent enough to connect to without scanning again
 
+        :return: True if the device can be reused
+        :rtype: bool
+        """
         if self._device is None:
-            self._device = await BleakScanner.find_device_by_address(self._address)
-            if self._device is None:
-                print(f"Device not found for MAC Address {self._address}")
-                exit(1)
+            return False
+        # Devices given without a discovery time are trusted as-is
+        if self._discovered_at is None:
+            return True
+        return time.monotonic() - self._discovered_at <= self._device_max_age
 
-            print(f"Found SwitchBot {self._device.name} with specificed MAC Address ({self._device.address})")
+    async def _find_device(self):
+        """
+        Scan for the SwitchBot by its MAC address
 
-        self._client = BleakClient(self._device)
+        :raises SwitchBotNotFoundError: The SwitchBot is not advertising nearby
+        """
+        started = time.monotonic()
+        with self._tracer.start_span("switchbot.find_device"):
+            self._device = await self._transport.find_device(self._address)
+            if self._device is None:
+                raise SwitchBotNotFoundError(self._address)
+        if self._metrics is not None:
+            self._metrics.discovery_duration.labels("address").observe(time.monotonic() - started)
+
+        self._advertisement_data = None
+        self._discovered_at = time.monotonic()
+        _LOGGER.debug(
+            "Found SwitchBot %s (%s)",
+            self._device.name,
+            self._device.address,
+            extra={"event": "device_found", "mac_address": self._address},
+        )
+
+    async def _connect_client(self):
+        """
+        Connect a new client to the current device
+        """
+        client = self._transport.create_client(self._device, disconnected_callback=self._on_client_disconnected)
 
         try:
-            await self._client.connect()
-        except asyncio.TimeoutError:
-            raise UserWarning(f"Timeout connecting to {self._address}, try again")
-        print(f"Connected to {self._address}")
+            with self._tracer.start_span("switchbot.client_connect"):
+                await client.connect()
+        except Exception as err:
+            raise UserWarning(f"Could not connect to {self._address} ({err!r}), try again")
 
-        await self._client.start_notify(
-            SwitchBotCommand.RESP_CHAR_UUID.value, self._notif_callback_handler
-        )
+        # Only set once connected, requests sent meanwhile wait for the supervisor (if any) instead
+        self._client = client
 
-        await self.fetch_basic_device_info()
-        await asyncio.sleep(1)
-        await self.fetch_alarm_count()
-        await asyncio.sleep(1)
-        await self.fetch_system_time()
-        await asyncio.sleep(1)
+    async def ensure_metadata(self, metadata: SwitchBotMetadata = SwitchBotMetadata.ALL) -> BotInformation:
+        """
+        Fetch the requested metadata that has not been loaded since connecting
+
+        Each fetch completes as soon as its response arrives, multiple fetches are
+        pipelined when ``pipeline_depth`` allows it.
+
+        :param metadata: The metadata that must be loaded
+        :type metadata: SwitchBotMetadata
+        :return: SwitchBot Information
+        :rtype: BotInformation
+        """
+        missing = metadata & ~self._loaded_metadata
+
+        fetches = []
+        if SwitchBotMetadata.BASIC_INFO in missing:
+            fetches.append(self.fetch_basic_device_info())
+        if SwitchBotMetadata.ALARM_COUNT in missing:
+            fetches.append(self.fetch_alarm_count())
+        if SwitchBotMetadata.SYSTEM_TIME in missing:
+            fetches.append(self.fetch_system_time())
+
+        if len(fetches) > 0:
+            await asyncio.gather(*fetches)
+
+        return self._info
 
     async def disconnect(self):
         """
         Disconnect from SwitchBot
         """
         if self._client is None:
-            print("Client is not connected. Cannot disconnect.")
+            _LOGGER.debug("Client for %s is not connected, cannot disconnect", self._address)
+            return
+
+        _LOGGER.info(
+            "Disconnecting from SwitchBot (%s)",
+            self._address,
+            extra={"event": "disconnecting", "mac_address": self._address},
+        )
+        client = self._client
+        self._client = None
+        await client.disconnect()
+
+        self._fail_pending_requests(SwitchBotDisconnectedError(self._address))
+
+    def _on_client_disconnected(self, client: "BleakClient"):
+        """
+        Disconnected callback of the client, fails the requests in flight when the connection is lost
+
+        :param client: The client that disconnected
+        :type client: bleak.BleakClient
+        """
+        # Requested disconnects (and clients replaced since) already cleared _client
+        if client is not self._client:
             return
 
-        print(f"Disconnecting from SwitchBot ({self._address})")
-        await self._client.disconnect()
+        _LOGGER.warning(
+            "Lost connection to SwitchBot (%s)",
+            self._address,
+            extra={"event": "connection_lost", "mac_address": self._address},
+        )
+        self._client = None
+        self._fail_pending_requests(SwitchBotDisconnectedError(self._address))
+
+        # Copy so callbacks can unsubscribe while being notified
+        for callback in list(self._disconnect_subscribers):
+            callback()
+
+    def subscribe_disconnected(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """
+        Call ``callback`` whenever the connection to the SwitchBot is lost (not after ``disconnect()``)
 
-    async def _notif_callback_handler(
-        self, characteristic: BleakGATTCharacteristic, data: bytearray
+        :param callback: Called with no arguments, after the requests in flight have failed
+        :type callback: Callable[[], None]
+        :return: Function that unsubscribes the callback
+        :rtype: Callable[[], None]
+        """
+        self._disconnect_subscribers.append(callback)
+
+        def unsubscribe():
+            if callback in self._disconnect_subscribers:
+                self._disconnect_subscribers.remove(callback)
+
+        return unsubscribe
+
+    def _notif_callback_handler(
+        self, characteristic: "BleakGATTCharacteristic", data: bytearray
     ):
         """
+        Resolve the oldest pending request with the received response
 
         :param characteristic: The characteristic that was originally requested
         :type characteristic: bleak.BleakGATTCharacteristic
         :param data: The data received
         :type data: bytearray
-        :return:
-        :rtype:
         """
-        request_type: SwitchBotReqType = await self._request_response_queue.get()
+        now = time.monotonic()
+        while True:
+            if len(self._request_response_queue) == 0:
+                _LOGGER.warning(
+                    "Received unexpected response from %s (no pending request): %s",
+                    self._address,
+                    LazyHex(data),
+                    extra={"event": "unexpected_response", "mac_address": self._address},
+                )
+                return
+
+            pending = self._request_response_queue.popleft()
+            if not pending.abandoned:
+                round_trip_s = now - pending.sent_at
+                if self._min_round_trip_s is None or round_trip_s < self._min_round_trip_s:
+                    self._min_round_trip_s = round_trip_s
+                break
+            if not self._is_response_lost(pending, now):
+                break
+            # The response to an abandoned request never came, this one belongs to a later request
+            _LOGGER.debug(
+                "Response to abandoned %s request to %s was lost",
+                pending.request_type.name,
+                self._address,
+                extra={"event": "response_lost", "mac_address": self._address, "request_type": pending.request_type.name},
+            )
 
-        status_enum = SwitchBotRespStatus(data[0])
-        response_data = data[1:]
-        print(
-            f"Received response for {request_type.name} with status {status_enum.name} ({status_enum.value}): {f_bytes(response_data)}"
-        )
+        request_type = pending.request_type
+        metrics = self._metrics
 
-        if status_enum != SwitchBotRespStatus.OK:
+        try:
+            status_enum = SwitchBotRespStatus(data[0])
+        except ValueError:
+            status_enum = SwitchBotRespStatus.UNKNOWN
+        # Decoders read the payload in place, only the response keeps a copy
+        payload = memoryview(data)[1:]
+        response_data = bytes(payload)
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            _LOGGER.debug(
+                "Received %s response from %s with status %s: %s",
+                request_type.name,
+                self._address,
+                status_enum.name,
+                LazyHex(response_data),
+                extra={
+                    "event": "response_received",
+                    "mac_address": self._address,
+                    "request_type": request_type.name,
+                    "status": status_enum.name,
+                    "latency_s": now - pending.sent_at,
+                },
+            )
+
+        if metrics is not None:
+            metrics.record_response(self._address, request_type, status_enum, now - pending.sent_at)
+            metrics.pending_requests.labels(self._address).set(len(self._request_response_queue))
+        pending.span.add_event("notification", status=status_enum.name)
+
+        response = SwitchBotResponse(request_type, status_enum, response_data)
+
+        if pending.future.done():
+            # Caller gave up on the request (timeout, cancelled), the response is still consumed to keep alignment
             return
 
-        if request_type == SwitchBotReqType.SET_PASSWORD:
-            print(
-                f"Successfully set password to {self._info.password_str}"
-            )  # Current pass is new pass
+        if status_enum != SwitchBotRespStatus.OK:
+            pending.future.set_exception(SwitchBotResponseError(response))
             return
 
-        if request_type == SwitchBotReqType.COMMAND:
-            print(f"Successfully sent command to SwitchBot")
+        try:
+            response.value = decoders_for(self._info.device_type).decode(
+                request_type, pending.subcommand, payload, self._info
+            )
+        except SwitchBotError as err:
+            pending.future.set_exception(err)
             return
+        except (ValueError, IndexError, struct.error, UserWarning) as err:
+            pending.future.set_exception(SwitchBotDecodeError(response, err))
+            return
+
+        pending.future.set_result(response)
+
+    def _fail_pending_requests(self, error: Exception):
+        """
+        Fail (and forget) every request still waiting for a response
+
+        :param error: The error to raise in each waiting caller
+        :type error: Exception
+        """
+        while len(self._request_response_queue) > 0:
+            pending = self._request_response_queue.popleft()
+            if not pending.future.done():
+                pending.future.set_exception(error)
+        if self._metrics is not None:
+            self._metrics.pending_requests.labels(self._address).set(0)
+
+    def _discard_pending(self, pending: _PendingRequest):
+        """
+        Remove a request from the pending queue (no-op if already answered)
 
-        if request_type == SwitchBotReqType.GET_BASIC_INFO:
-            curr_password = self._info.password_str
-            self._info = BotInformation(response_data)
-            self._info.password_str = curr_password
-            print(f"Successfully retrieved basic information")
+        :param pending: The pending request to remove
+        :type pending: _PendingRequest
+        """
+        try:
+            self._request_response_queue.remove(pending)
+        except ValueError:
             return
+        if self._metrics is not None:
+            self._metrics.pending_requests.labels(self._address).set(len(self._request_response_queue))
 
-        if request_type == SwitchBotReqType.GET_TIME_MGMT_INFO:
-            resp_len = len(response_data)
-            if resp_len == 1:
-                self._info.alarm_count = response_data[0]
-                print(f"Successfully retrieved alarm count ({self._info.alarm_count})")
+    def _abandon_pending(self, pending: _PendingRequest, timeout: float):
+        """
+        Give up on a written request, keeping its queue entry to swallow a late response
 
-            if resp_len == 8:
-                self._info.system_timestamp = int.from_bytes(
-                    response_data, byteorder="big", signed=False
-                )
-                print(f"Successfully recieved system time ({self._info.system_timestamp})")
+        Removing the entry would hand its late response to the next request. The entry is dropped
+        instead once its response is considered lost (see ``_is_response_lost``).
 
-            if resp_len == 11:
-                print(f"Successfully recieved alarm info for index {response_data[1]}")
-                self._info.update_alarm(response_data)
+        :param pending: The pending request whose caller gave up
+        :type pending: _PendingRequest
+        :param timeout: Time (seconds) the request could wait for its response
+        :type timeout: float
+        """
+        if not pending.future.done():
+            pending.future.cancel()
+        pending.abandoned = True
+        pending.overdue_at = pending.sent_at + timeout
 
-    async def _send_request(self, message_bytes: bytearray, request_type: SwitchBotReqType):
+    def _is_response_lost(self, pending: _PendingRequest, now: float) -> bool:
+        """
+        Whether a response received now cannot belong to an abandoned request (popped from the queue)
+
+        The SwitchBot answers in order, so once the request is past its timeout and the next request
+        has been in flight for a round trip, the response is the next request's: the abandoned
+        request's response was lost.
+
+        :param pending: The abandoned request at the head of the queue
+        :type pending: _PendingRequest
+        :param now: When the response was received (``time.monotonic()``)
+        :type now: float
+        :return: True if the response belongs to a later request
+        :rtype: bool
         """
-        Send a request to the SwitchBot
+        if now < pending.overdue_at or len(self._request_response_queue) == 0:
+            return False
+        round_trip_s = self._min_round_trip_s if self._min_round_trip_s is not None else 0.0
+        return now - self._request_response_queue[0].sent_at >= round_trip_s
+
+    async def _send_request(
+        self,
+        message_bytes: Union[bytes, bytearray],
+        request_type: SwitchBotReqType,
+        timeout: Optional[float] = None,
+        subcommand: Optional[int] = None,
+    ) -> SwitchBotResponse:
+        """
+        Send a request to the SwitchBot and wait for its response, retrying per the retry policy
 
         :param message_bytes: The bytes of the message to send
-        :type message_bytes: bytearray
+        :type message_bytes: Union[bytes, bytearray]
         :param request_type: The type of request to send (used for figuring out which message was received)
         :type request_type: SwitchBotReqType
+        :param timeout: Time (seconds) to wait for each response, defaults to ``request_timeout``
+        :type timeout: Optional[float]
+        :param subcommand: The subcommand of the request, selects the response decoder
+        :type subcommand: Optional[int]
+        :raises SwitchBotResponseError: The SwitchBot responded with a fatal status (or retries ran out)
+        :raises SwitchBotTimeoutError: No response was received in time
+        :raises SwitchBotCircuitOpenError: The SwitchBot keeps failing, the request was not sent
+        :return: The decoded response
+        :rtype: SwitchBotResponse
         """
+        if self._circuit_breaker is not None:
+            # Not being connected is not a failure of the SwitchBot, so it is raised before the breaker counts
+            await self._wait_connected()
+            self._circuit_breaker.before_request()
+
+        attempt = 1
+        try:
+            while True:
+                try:
+                    response = await self._send_request_once(message_bytes, request_type, timeout, subcommand)
+                    break
+                except (SwitchBotResponseError, SwitchBotTimeoutError) as err:
+                    if attempt >= self._retry_policy.max_attempts or not self._retry_policy.is_retryable(err):
+                        self._retry_stats.record(request_type, attempt, success=False)
+                        raise
+
+                    backoff_s = self._retry_policy.backoff_s(attempt)
+                    _LOGGER.info(
+                        "%s request to %s failed (%s), retrying in %.2fs",
+                        request_type.name,
+                        self._address,
+                        err,
+                        backoff_s,
+                        extra={
+                            "event": "request_retry",
+                            "mac_address": self._address,
+                            "request_type": request_type.name,
+                            "attempt": attempt,
+                            "backoff_s": backoff_s,
+                        },
+                    )
+                    self._retry_stats.record_retry(err)
+                    attempt += 1
+                    await asyncio.sleep(backoff_s)
+        except (SwitchBotResponseError, SwitchBotTimeoutError):
+            # Only the SwitchBot failing to answer (properly) counts, not the link or the caller
+            if self._circuit_breaker is not None:
+                self._circuit_breaker.record_failure()
+            raise
+        except BaseException:
+            if self._circuit_breaker is not None:
+                self._circuit_breaker.record_inconclusive()
+            raise
+
+        self._retry_stats.record(request_type, attempt, success=True)
+        if self._circuit_breaker is not None:
+            self._circuit_breaker.record_success()
+        return response
+
+    async def _wait_connected(self):
+        """
+        Wait for a reconnect in progress (if supervised), then check the SwitchBot is connected
+
+        :raises SwitchBotError: The SwitchBot is not connected
+        :raises SwitchBotTimeoutError: The supervisor did not reconnect in time
+        """
+        if self._client is None and self._supervisor is not None:
+            # Reconnecting after a link loss, the request goes out once connected again
+            await self._supervisor.wait_connected()
+
         if self._client is None:
-            print("Client is not connected. Cannot send request.")
-            return
+            raise SwitchBotError("Client is not connected. Cannot send request.")
 
-        self._request_response_queue.put_nowait(request_type)
-        await self._client.write_gatt_char(
-            SwitchBotCommand.REQ_CHAR_UUID.value, message_bytes, response=True
-        )
+    async def _send_request_once(
+        self,
+        message_bytes: Union[bytes, bytearray],
+        request_type: SwitchBotReqType,
+        timeout: Optional[float] = None,
+        subcommand: Optional[int] = None,
+    ) -> SwitchBotResponse:
+        """
+        Send a request to the SwitchBot and wait for its response (single attempt)
+
+        Up to ``pipeline_depth`` requests may be in flight at once, their responses are
+        matched to the requests in the order they were written.
+
+        :param message_bytes: The bytes of the message to send
+        :type message_bytes: Union[bytes, bytearray]
+        :param request_type: The type of request to send (used for figuring out which message was received)
+        :type request_type: SwitchBotReqType
+        :param timeout: Time (seconds) to wait for the response, defaults to ``request_timeout``
+        :type timeout: Optional[float]
+        :param subcommand: The subcommand of the request, selects the response decoder
+        :type subcommand: Optional[int]
+        :raises SwitchBotResponseError: The SwitchBot responded with a non-OK status
+        :raises SwitchBotTimeoutError: No response was received in time
+        :return: The decoded response
+        :rtype: SwitchBotResponse
+        """
+        await self._wait_connected()
+
+        if timeout is None:
+            timeout = self._request_timeout
+
+        with self._tracer.start_span(
+            "switchbot.request", mac_address=self._address, request_type=request_type.name
+        ) as span:
+            async with self._pipeline_slots:
+                pending = _PendingRequest(request_type, asyncio.get_running_loop().create_future(), subcommand, span)
+
+                # Queue order must match write order for responses to line up
+                async with self._write_lock:
+                    client = self._client
+                    if client is None:
+                        # Lost while waiting for the lock
+                        raise SwitchBotDisconnectedError(self._address)
+                    if _LOGGER.isEnabledFor(logging.DEBUG):
+                        _LOGGER.debug(
+                            "Sending %s request to %s: %s",
+                            request_type.name,
+                            self._address,
+                            LazyHex(message_bytes),
+                            extra={
+                                "event": "request_sent",
+                                "mac_address": self._address,
+                                "request_type": request_type.name,
+                            },
+                        )
+                    pending.sent_at = time.monotonic()
+                    self._request_response_queue.append(pending)
+                    if self._metrics is not None:
+                        self._metrics.pending_requests.labels(self._address).set(len(self._request_response_queue))
+                    try:
+                        with self._tracer.start_span("switchbot.write"):
+                            await client.write_gatt_char(
+                                SwitchBotCommand.REQ_CHAR_UUID.value, message_bytes, response=self._write_with_response
+                            )
+                    except BaseException:
+                        self._discard_pending(pending)
+                        raise
+
+                try:
+                    return await asyncio.wait_for(pending.future, timeout)
+                except asyncio.TimeoutError:
+                    self._abandon_pending(pending, timeout)
+                    if self._metrics is not None:
+                        self._metrics.request_timeouts.labels(self._address, request_type.name).inc()
+                    raise SwitchBotTimeoutError(request_type, timeout) from None
+                except asyncio.CancelledError:
+                    self._abandon_pending(pending, timeout)
+                    raise
 
     def _check_append_pass_check(
         self, curr_payload: Union[bytearray, List[int]], preappend: bool = False
@@ -195,7 +744,6 @@ class VirtualSwitchBot:
             payload = bytearray(payload)
         if self._info.is_encrypted:
             if self._info.password_checksum is None:
-                print("Cannot send encrypted message without password checksum")
                 raise UserWarning("Cannot send encrypted message without password checksum")
             if preappend:
                 payload = self._info.password_checksum + payload
@@ -204,6 +752,26 @@ class VirtualSwitchBot:
 
         return payload
 
+    def _action_packet(self, action: SwitchBotAction) -> bytes:
+        """
+        The COMMAND packet of a single action, cached until the password or encryption changes
+
+        :param action: The action to send
+        :type action: SwitchBotAction
+        :return: Request packet bytes
+        :rtype: bytes
+        """
+        generation = self._info.security_generation
+        if generation != self._packet_cache_generation:
+            self._packet_cache.clear()
+            self._packet_cache_generation = generation
+
+        packet = self._packet_cache.get(action)
+        if packet is None:
+            payload = self._check_append_pass_check([action.value], preappend=True)
+            packet = self._packet_cache[action] = bytes(self._build_request_msg(SwitchBotReqType.COMMAND, payload))
+        return packet
+
     # | B_0  |                    B_1                      |    B_2    |    B_3    | ... |    B_15    |
     # | 0x57 | v_1 v_0 enc_1 enc_0 cmd_3 cmd_2 cmd_1 cmd_0 | payload_0 | payload_1 | ... | payload_15 |
     def _build_request_msg(
@@ -241,36 +809,41 @@ class VirtualSwitchBot:
 
         :param new_password: The new password string or None if clearing the password
         :type new_password: Optional[str]
+        :return: The response from the SwitchBot
+        :rtype: SwitchBotResponse
         """
         if new_password is None:
-            print("Clearing password...")
+            _LOGGER.debug("Clearing password of %s", self._address)
             payload = self._check_append_pass_check([])
             msg_packet = self._build_request_msg(SwitchBotReqType.CLEAR_PASSWORD, payload)
-            await self._send_request(msg_packet, SwitchBotReqType.CLEAR_PASSWORD)
+            response = await self._send_request(msg_packet, SwitchBotReqType.CLEAR_PASSWORD)
             self._info.password_str = None
-            return
+            return response
 
         new_pass_checksum = zlib.crc32(new_password.encode())
         new_pass_checksum_bytes = new_pass_checksum.to_bytes(4, byteorder="big")
 
         payload = self._check_append_pass_check([])
         if len(payload) > 0:
-            print(
-                f"A password is already set, attempting a password update (Old Pass Check={f_bytes(self._info.password_checksum)}, Old Pass={self._info.password_str}, New Pass={new_password})"
-            )
+            _LOGGER.debug("A password is already set on %s, attempting a password update", self._address)
 
         payload += bytes([0x01, 0x04])  # Unknown reason
         payload += new_pass_checksum_bytes
 
         msg_packet = self._build_request_msg(SwitchBotReqType.SET_PASSWORD, payload)
 
-        await self._send_request(msg_packet, SwitchBotReqType.SET_PASSWORD)
-
-        print(f"Sent password update message ({f_bytes(msg_packet)})!")
+        response = await self._send_request(msg_packet, SwitchBotReqType.SET_PASSWORD)
 
         self._info.password_str = new_password
 
-    async def set_bot_state(self, state: SwitchBotAction):
+        return response
+
+    async def set_bot_state(
+        self,
+        state: SwitchBotAction,
+        wait_for_state: bool = False,
+        state_timeout: float = 10.0,
+    ):
         """
         Sends a "set state" command
 
@@ -278,33 +851,52 @@ class VirtualSwitchBot:
 
         :param state: The action to take (PRESS, ON, and OFF)
         :type state: SwitchBotAction
+        :param wait_for_state: Also wait until the SwitchBot reports the new state (ON and OFF only, PRESS has no lasting state)
+        :type wait_for_state: bool
+        :param state_timeout: Time (seconds) to wait for the new state
+        :type state_timeout: float
+        :raises SwitchBotTimeoutError: The new state was not reported in time
+        :return: The response from the SwitchBot
+        :rtype: SwitchBotResponse
         """
         if state not in [
             SwitchBotAction.PRESS,
             SwitchBotAction.ON,
             SwitchBotAction.OFF,
         ]:
-            print(
-                f"Cannot send state {state.name} to SwitchBot. Only PRESS, ON, and OFF are supported right now."
+            _LOGGER.error(
+                "Cannot send state %s to SwitchBot. Only PRESS, ON, and OFF are supported right now.", state.name
             )
             return
 
-        payload = [state.value]
-
-        payload_bytes = self._check_append_pass_check(payload, preappend=True)
+        msg_packet = self._action_packet(state)
 
-        msg_packet = self._build_request_msg(SwitchBotReqType.COMMAND, payload_bytes)
+        sent_at = time.monotonic()
+        response = await self._send_request(msg_packet, SwitchBotReqType.COMMAND)
 
-        await self._send_request(msg_packet, SwitchBotReqType.COMMAND)
+        if wait_for_state and state in _ACTION_RESULT_IS_OFF:
+            await self.wait_for_state(_ACTION_RESULT_IS_OFF[state], state_timeout, since=sent_at)
 
-        print(f"Sent {state.name} message ({f_bytes(msg_packet)})!")
+        return response
 
-    async def run_action_set(self, action_set: List[Tuple[float, SwitchBotAction]]):
+    async def run_action_set(
+        self,
+        action_set: List[Tuple[float, SwitchBotAction]],
+        wait_for_state: bool = False,
+        state_timeout: float = 10.0,
+    ):
         """
-        Run a set of actions in order (no more than 8)
+        Run a set of actions in order (no more than 9, 8 when encrypted)
 
         :param action_set: The set of actions to run in order with delay (seconds) between them (first ignored)
         :type action_set: List[Tuple[float, SwitchBotAction]]
+        :param wait_for_state: Also wait until the SwitchBot reports the state of the last ON/OFF action
+        :type wait_for_state: bool
+        :param state_timeout: Time (seconds) to wait for the final state, on top of the action set delays
+        :type state_timeout: float
+        :raises SwitchBotTimeoutError: The final state was not reported in time
+        :return: The response from the SwitchBot
+        :rtype: SwitchBotResponse
         """
         actions = action_set.copy()
 
@@ -313,30 +905,97 @@ class VirtualSwitchBot:
 
         actions = actions[1:]
 
-        if len(actions) > 8:
-            print("Cannot send more than 9 actions in a single message")
+        if len(actions) > MAX_ACTION_SET_ACTIONS - 1:
+            _LOGGER.error("Cannot send more than %d actions in a single message", MAX_ACTION_SET_ACTIONS)
             return
         
-        if self._info.is_encrypted and len(actions) > 7:
-            print("Cannot send more than 8 actions in a single message when using encryption")
+        if self._info.is_encrypted and len(actions) > MAX_ENCRYPTED_ACTION_SET_ACTIONS - 1:
+            _LOGGER.error(
+                "Cannot send more than %d actions in a single message when using encryption",
+                MAX_ENCRYPTED_ACTION_SET_ACTIONS,
+            )
             return
 
         for delay, action in actions:
-            payload.append(delay)  # 1 second delay
+            payload.append(int(delay))  # Delay in seconds
             payload.append(action.value)
 
         payload_bytes = self._check_append_pass_check(payload, preappend=True)
 
         msg_packet = self._build_request_msg(SwitchBotReqType.COMMAND, payload_bytes)
-        await self._send_request(msg_packet, SwitchBotReqType.COMMAND)
+        sent_at = time.monotonic()
+        response = await self._send_request(msg_packet, SwitchBotReqType.COMMAND)
 
-        print(
-            f"Sent {len(action_set)} actions ({f_bytes(msg_packet)})"
-        )
+        if wait_for_state:
+            final_is_off = None
+            for _, action in action_set:
+                final_is_off = _ACTION_RESULT_IS_OFF.get(action, final_is_off)
+
+            if final_is_off is not None:
+                total_delay = sum(int(delay) for delay, _ in actions)
+                await self.wait_for_state(final_is_off, state_timeout + total_delay, since=sent_at)
+
+        return response
+
+    async def wait_for_state(
+        self,
+        is_off: bool,
+        timeout: float = 10.0,
+        since: Optional[float] = None,
+        poll_interval: float = 0.5,
+    ):
+        """
+        Wait until the SwitchBot reports being on/off
+
+        Uses the advertised status bit when a state cache is set, otherwise polls basic info.
+
+        :param is_off: The awaited state (True for off)
+        :type is_off: bool
+        :param timeout: Time (seconds) to wait
+        :type timeout: float
+        :param since: Only accept advertisements received at or after this ``time.monotonic()`` value
+        :type since: Optional[float]
+        :param poll_interval: Time (seconds) between basic info reads when there is no state cache
+        :type poll_interval: float
+        :raises SwitchBotTimeoutError: The state was not reported in time
+        """
+        state_name = "off" if is_off else "on"
+
+        if self._state_cache is not None:
+            try:
+                await self._state_cache.wait_until(
+                    self._address, lambda info: info.is_off == is_off, timeout, since=since
+                )
+            except SwitchBotTimeoutError:
+                raise SwitchBotTimeoutError(None, timeout, f"SwitchBot to turn {state_name}") from None
+            _LOGGER.debug("SwitchBot (%s) is %s", self._address, state_name)
+            return
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            try:
+                await self.fetch_basic_device_info()
+                if self._info.is_off == is_off:
+                    _LOGGER.debug("SwitchBot (%s) is %s", self._address, state_name)
+                    return
+            except SwitchBotResponseError as err:
+                # The SwitchBot may refuse requests while the arm is moving
+                if err.status != SwitchBotRespStatus.BUSY:
+                    raise
+            except SwitchBotTimeoutError:
+                pass
+
+            if loop.time() + poll_interval > deadline:
+                raise SwitchBotTimeoutError(None, timeout, f"SwitchBot to turn {state_name}")
+            await asyncio.sleep(poll_interval)
 
     async def set_basic_device_info(self, bot_mode : SwitchBotMode, is_inverse : bool):
         """
         Sends a set basic device info message
+
+        :return: The response from the SwitchBot
+        :rtype: SwitchBotResponse
         """
 
         act_mode_byte = 0x00
@@ -346,21 +1005,26 @@ class VirtualSwitchBot:
         payload = self._check_append_pass_check([100, act_mode_byte], preappend=True)
 
         msg_packet = self._build_request_msg(SwitchBotReqType.SET_BASIC_INFO, payload)
-        await self._send_request(msg_packet, SwitchBotReqType.SET_BASIC_INFO)
+        response = await self._send_request(msg_packet, SwitchBotReqType.SET_BASIC_INFO)
 
-        print(f"Sent basic device info set message ({f_bytes(msg_packet)})")
+        return response
 
 
-    async def fetch_basic_device_info(self):
+    async def fetch_basic_device_info(self) -> SwitchBotResponse[BotInformation]:
         """
         Update internal ``info`` object with basic info (after response is received)
+
+        :return: The response from the SwitchBot (``value`` is the updated ``info``)
+        :rtype: SwitchBotResponse[BotInformation]
         """
         payload = self._check_append_pass_check([])
 
         msg_packet = self._build_request_msg(SwitchBotReqType.GET_BASIC_INFO, payload)
-        await self._send_request(msg_packet, SwitchBotReqType.GET_BASIC_INFO)
+        response = await self._send_request(msg_packet, SwitchBotReqType.GET_BASIC_INFO)
 
-        print(f"Sent basic device info request ({f_bytes(msg_packet)})")
+        self._loaded_metadata |= SwitchBotMetadata.BASIC_INFO
+
+        return response
 
     def _build_set_dev_time_mgm_info_payload(
         self,
@@ -384,35 +1048,24 @@ class VirtualSwitchBot:
 
         if subcommand == TimeManagementInfoSubCommand.DEVICE_TIME:
             if len(payload) != 0 and len(payload) != 8:
-                print(
-                    f"Cannot set device time with payload length {len(payload)}, must be equal to 8!"
-                )
                 raise UserWarning(
                     f"Cannot set device time with payload length {len(payload)}, must be equal to 8!"
                 )
         elif subcommand == TimeManagementInfoSubCommand.ALARM_COUNT:
             if len(payload) != 0 and len(payload) != 1:
-                print(
-                    f"Cannot set alarm count with payload length {len(payload)}, must be equal to 1!"
-                )
                 raise UserWarning(
                     f"Cannot set alarm count with payload length {len(payload)}, must be equal to 1!"
                 )
         elif subcommand == TimeManagementInfoSubCommand.ALARM_INFO:
             if len(payload) != 0 and len(payload) != 11:
-                print(
-                    f"Cannot set alarm info with payload length {len(payload)}, must be equal to 11!"
-                )
                 raise UserWarning(
                     f"Cannot set alarm info with payload length {len(payload)}, must be equal to 11!"
                 )
 
             if alarm_id is None:
-                print("Cannot set alarm info without an alarm ID!")
                 raise UserWarning("Cannot set alarm info without an alarm ID!")
 
             if alarm_id < 0 or alarm_id > 4:
-                print(f"Cannot set alarm info with alarm ID {alarm_id}, must be between 0 and 4!")
                 raise UserWarning(
                     f"Cannot set alarm info with alarm ID {alarm_id}, must be between 0 and 4!"
                 )
@@ -426,6 +1079,9 @@ class VirtualSwitchBot:
     async def sync_time(self):
         """
         Sync unix timestamp between current device and SwitchBot
+
+        :return: The response from the SwitchBot
+        :rtype: SwitchBotResponse
         """
         unix_seconds = int(time.time())
         seconds_bytes = unix_seconds.to_bytes(8, byteorder="big")
@@ -435,9 +1091,9 @@ class VirtualSwitchBot:
         )
 
         msg_packet = self._build_request_msg(SwitchBotReqType.SET_TIME_MGMT_INFO, payload)
-        await self._send_request(msg_packet, SwitchBotReqType.SET_TIME_MGMT_INFO)
+        response = await self._send_request(msg_packet, SwitchBotReqType.SET_TIME_MGMT_INFO)
 
-        print(f"Sent sync timer request ({f_bytes(msg_packet)})")
+        return response
 
     async def update_alarm_count(self, alarm_count: int):
         """
@@ -445,9 +1101,10 @@ class VirtualSwitchBot:
 
         :param alarm_count: The number of alarms to set
         :type alarm_count: int
+        :return: The response from the SwitchBot
+        :rtype: SwitchBotResponse
         """
         if alarm_count < 0 or alarm_count > 4:
-            print(f"Cannot set alarm count to {alarm_count}, must be between 0 and 4!")
             raise UserWarning(f"Cannot set alarm count to {alarm_count}, must be between 0 and 4!")
 
         payload = self._build_set_dev_time_mgm_info_payload(
@@ -455,9 +1112,9 @@ class VirtualSwitchBot:
         )
 
         msg_packet = self._build_request_msg(SwitchBotReqType.SET_TIME_MGMT_INFO, payload)
-        await self._send_request(msg_packet, SwitchBotReqType.SET_TIME_MGMT_INFO)
+        response = await self._send_request(msg_packet, SwitchBotReqType.SET_TIME_MGMT_INFO)
 
-        print(f"Sent set alarm count request ({f_bytes(msg_packet)})")
+        return response
 
     async def update_alarm_info(self, alarm_id: int, alarm_info: AlarmInfo):
         """
@@ -467,7 +1124,11 @@ class VirtualSwitchBot:
         :type alarm_id: int
         :param alarm_info: The new alarm info
         :type alarm_info: AlarmInfo
+        :return: The response from the SwitchBot
+        :rtype: SwitchBotResponse
         """
+        await self.ensure_metadata(SwitchBotMetadata.ALARM_COUNT)
+
         payload = [self.info.alarm_count, alarm_id]
 
         repeat_byte = 0x00
@@ -499,16 +1160,15 @@ class VirtualSwitchBot:
         )
 
         if interval_hours > 5:
-            print(f"Cannot set alarm interval to {interval_hours} hours, must be less than 5!")
             raise UserWarning(
                 f"Cannot set alarm interval to {interval_hours} hours, must be less than 5!"
             )
 
         if interval_seconds % 10 != 0:
-            print(
-                f"Cannot set alarm interval to {interval_seconds} seconds, must be a multiple of 10!"
+            _LOGGER.warning(
+                "Cannot set alarm interval to %d seconds, must be a multiple of 10! Rounding down to the nearest multiple of 10",
+                interval_seconds,
             )
-            print("Rounding down to the nearest multiple of 10")
             interval_seconds = math.floor(interval_seconds / 10) * 10
 
         payload.append(interval_hours)  # Append hours
@@ -520,50 +1180,74 @@ class VirtualSwitchBot:
         )
 
         msg_packet = self._build_request_msg(SwitchBotReqType.SET_TIME_MGMT_INFO, payload)
-        await self._send_request(msg_packet, SwitchBotReqType.SET_TIME_MGMT_INFO)
+        response = await self._send_request(msg_packet, SwitchBotReqType.SET_TIME_MGMT_INFO)
 
-        print(f"Sent update alarm info request for alarm ID {alarm_id} ({f_bytes(msg_packet)})")
+        return response
 
-    async def fetch_system_time(self):
+    async def fetch_system_time(self) -> SwitchBotResponse[int]:
         """
         Fetch current unix timestamp from SwitchBot
+
+        :return: The response from the SwitchBot (``value`` is the unix timestamp)
+        :rtype: SwitchBotResponse[int]
         """
         payload = self._build_set_dev_time_mgm_info_payload(
             TimeManagementInfoSubCommand.DEVICE_TIME, bytearray()
         )
 
         msg_packet = self._build_request_msg(SwitchBotReqType.GET_TIME_MGMT_INFO, payload)
-        await self._send_request(msg_packet, SwitchBotReqType.GET_TIME_MGMT_INFO)
+        response = await self._send_request(
+            msg_packet,
+            SwitchBotReqType.GET_TIME_MGMT_INFO,
+            subcommand=TimeManagementInfoSubCommand.DEVICE_TIME.value,
+        )
+
+        self._loaded_metadata |= SwitchBotMetadata.SYSTEM_TIME
 
-        print(f"Sent fetch system time request ({f_bytes(msg_packet)})")
+        return response
 
-    async def fetch_alarm_count(self):
+    async def fetch_alarm_count(self) -> SwitchBotResponse[int]:
         """
         Fetch the number of alarms set
+
+        :return: The response from the SwitchBot (``value`` is the alarm count)
+        :rtype: SwitchBotResponse[int]
         """
         payload = self._build_set_dev_time_mgm_info_payload(
             TimeManagementInfoSubCommand.ALARM_COUNT, bytearray()
         )
 
         msg_packet = self._build_request_msg(SwitchBotReqType.GET_TIME_MGMT_INFO, payload)
-        await self._send_request(msg_packet, SwitchBotReqType.GET_TIME_MGMT_INFO)
+        response = await self._send_request(
+            msg_packet,
+            SwitchBotReqType.GET_TIME_MGMT_INFO,
+            subcommand=TimeManagementInfoSubCommand.ALARM_COUNT.value,
+        )
+
+        self._loaded_metadata |= SwitchBotMetadata.ALARM_COUNT
 
-        print(f"Sent fetch alarm count request ({f_bytes(msg_packet)})")
+        return response
 
-    async def fetch_alarm_info(self, alarm_id: int):
+    async def fetch_alarm_info(self, alarm_id: int) -> SwitchBotResponse[AlarmInfo]:
         """
         Fetch information for alarm information
         :param alarm_id: The ID of the alarm to fetch (0 <= id < # of alarms)
         :type alarm_id: int
+        :return: The response from the SwitchBot (``value`` is the AlarmInfo)
+        :rtype: SwitchBotResponse[AlarmInfo]
         """
         payload = self._build_set_dev_time_mgm_info_payload(
             TimeManagementInfoSubCommand.ALARM_INFO, bytearray(), alarm_id=alarm_id
         )
 
         msg_packet = self._build_request_msg(SwitchBotReqType.GET_TIME_MGMT_INFO, payload)
-        await self._send_request(msg_packet, SwitchBotReqType.GET_TIME_MGMT_INFO)
+        response = await self._send_request(
+            msg_packet,
+            SwitchBotReqType.GET_TIME_MGMT_INFO,
+            subcommand=TimeManagementInfoSubCommand.ALARM_INFO.value,
+        )
 
-        print(f"Sent fetch alarm info request for Alarm {alarm_id} ({f_bytes(msg_packet)})")
+        return response
 
     async def set_long_press_duration(self, duration_s: int):
         """
@@ -571,15 +1255,15 @@ class VirtualSwitchBot:
 
         :param duration_s: Duration in seconds
         :type duration_s: int
+        :return: The response from the SwitchBot
+        :rtype: SwitchBotResponse
         """
         payload = self._build_request_msg(SwitchBotReqType.EXTENDED_COMMAND, bytearray(duration_s))
 
         msg_packet = self._build_request_msg(SwitchBotReqType.EXTENDED_COMMAND, payload)
-        await self._send_request(msg_packet, SwitchBotReqType.EXTENDED_COMMAND)
+        response = await self._send_request(msg_packet, SwitchBotReqType.EXTENDED_COMMAND)
 
-        print(
-            f"Sent set long press duration request for duration {duration_s} ({f_bytes(msg_packet)})"
-        )
+        return response
 
     @property
     def mac_address(self) -> str:
@@ -591,6 +1275,66 @@ class VirtualSwitchBot:
         """
         return self._address
 
+    @property
+    def transport(self) -> SwitchBotTransport:
+        """
+        How the SwitchBot is found and connected to
+
+        :return: Transport
+        :rtype: SwitchBotTransport
+        """
+        return self._transport
+
+    @property
+    def is_connected(self) -> bool:
+        """
+        Whether there is a live connection to the SwitchBot
+
+        :return: True if connected
+        :rtype: bool
+        """
+        return self._client is not None and self._client.is_connected
+
+    @property
+    def device(self) -> Optional[Union["BLEDevice", str]]:
+        """
+        The discovered BLEDevice (or the address it was given instead), None if not found yet
+
+        :return: BLE Device
+        :rtype: Optional[Union[bleak.BLEDevice, str]]
+        """
+        return self._device
+
+    @property
+    def advertisement_data(self) -> Optional["AdvertisementData"]:
+        """
+        The advertisement the device was discovered with, None if unknown
+
+        :return: Advertisement data
+        :rtype: Optional[bleak.AdvertisementData]
+        """
+        return self._advertisement_data
+
+    @property
+    def discovered_at(self) -> Optional[float]:
+        """
+        When the device was discovered (``time.monotonic()``), None if unknown
+
+        :return: Discovery timestamp
+        :rtype: Optional[float]
+        """
+        return self._discovered_at
+
+    @property
+    def loaded_metadata(self) -> SwitchBotMetadata:
+        """
+        Metadata fetched since the last connect
+
+        :return: Loaded metadata flags
+        :rtype: SwitchBotMetadata
+        """
+        return self._loaded_metadata
+
     @property
     def info(self) -> BotInformation:
         """
@@ -600,3 +1344,93 @@ class VirtualSwitchBot:
         :rtype: BotInformation
         """
         return self._info
+
+    @property
+    def write_with_response(self) -> bool:
+        """
+        Whether requests wait for the ATT write response, or only for the response notification
+
+        :return: True if writes are acknowledged by the SwitchBot's Bluetooth stack
+        :rtype: bool
+        """
+        return self._write_with_response
+
+    @write_with_response.setter
+    def write_with_response(self, write_with_response: bool):
+        self._write_with_response = write_with_response
+
+    @property
+    def max_action_set_actions(self) -> int:
+        """
+        Actions ``run_action_set`` accepts in one packet, fewer when encrypted
+
+        :return: The maximum number of actions
+        :rtype: int
+        """
+        return MAX_ENCRYPTED_ACTION_SET_ACTIONS if self._info.is_encrypted else MAX_ACTION_SET_ACTIONS
+
+    @property
+    def retry_stats(self) -> RetryStats:
+        """
+        Attempts used by the requests sent so far
+
+        :return: Retry statistics
+        :rtype: RetryStats
+        """
+        return self._retry_stats
+
+    @property
+    def state_cache(self) -> Optional[SwitchBotStateCache]:
+        """
+        Advertisement state cache used to confirm state changes
+
+        :return: State cache, None if basic info is read instead
+        :rtype: Optional[SwitchBotStateCache]
+        """
+        return self._state_cache
+
+    @state_cache.setter
+    def state_cache(self, state_cache: Optional[SwitchBotStateCache]):
+        self._state_cache = state_cache
+
+    @property
+    def metrics(self) -> Optional[SwitchBotMetrics]:
+        """
+        Metrics the SwitchBot records into
+
+        :return: Metrics, None if disabled
+        :rtype: Optional[SwitchBotMetrics]
+        """
+        return self._metrics
+
+    @metrics.setter
+    def metrics(self, metrics: Optional[SwitchBotMetrics]):
+        self._metrics = metrics
+
+    @property
+    def tracer(self) -> Tracer:
+        """
+        Tracer of the SwitchBot's connect and request phases
+
+        :return: Tracer, a no-op Tracer if tracing is disabled
+        :rtype: Tracer
+        """
+        return self._tracer
+
+    @tracer.setter
+    def tracer(self, tracer: Optional[Tracer]):
+        self._tracer = tracer if tracer is not None else Tracer()
+
+    @property
+    def supervisor(self) -> Optional["SwitchBotSupervisor"]:
+        """
+        Supervisor reconnecting the SwitchBot, requests sent while it reconnects wait for it
+
+        :return: Supervisor, None if lost connections are not restored
+        :rtype: Optional[SwitchBotSupervisor]
+        """
+        return self._supervisor
+
+    @supervisor.setter
+    def supervisor(self, supervisor: Optional["SwitchBotSupervisor"]):
+        self._supervisor = supervisor
\ No newline at end of file
@@ -0,0 +1,159 @@
+'''
+Python-Switchbot-BLE: A Python library for interfacing with Switchbot devices over Bluetooth Low Energy (BLE)
+Copyright (C) 2023  Benjamin Carlson
+'''
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+import asyncio
+import logging
+import time
+
+from .bot_types import SwitchBotAction, SwitchBotRespStatus
+from .bot_response import SwitchBotResponse, SwitchBotResponseError
+from .switchbot import VirtualSwitchBot
+from .switchbot_pool import SwitchBotPool
+
+_LOGGER = logging.getLogger(__name__)
+
+__all__ = ["SwitchBotBatchResult", "run_batch"]
+
+BatchAction = Union[SwitchBotAction, List[Tuple[float, SwitchBotAction]]]
+
+
+@dataclass
+class SwitchBotBatchResult:
+    '''
+    The outcome of a batch command for one SwitchBot
+    '''
+
+    # The MAC address of the SwitchBot
+    mac_address: str
+
+    # Whether the SwitchBot acknowledged the command with an OK status
+    success: bool
+
+    # The response status, None if no response was received (not found, timeout, ...)
+    status: Optional[SwitchBotRespStatus]
+
+    # Time (seconds) from starting this SwitchBot (including connecting) to its response or failure
+    latency_s: float
+
+    # The response, None if no response was received
+    response: Optional[SwitchBotResponse] = None
+
+    # The error that stopped the command, None on success
+    error: Optional[Exception] = None
+
+
+async def _run_one(
+    pool: SwitchBotPool,
+    mac_address: str,
+    action: BatchAction,
+    slots: asyncio.Semaphore,
+    timeout: Optional[float],
+) -> SwitchBotBatchResult:
+    """
+    Run the batch command on one SwitchBot, capturing any failure in the result
+
+    :param pool: The pool providing connected bots
+    :type pool: SwitchBotPool
+    :param mac_address: The MAC address of the SwitchBot
+    :type mac_address: str
+    :param action: The action (or action set) to run
+    :type action: BatchAction
+    :param slots: Bounds how many SwitchBots are handled at once
+    :type slots: asyncio.Semaphore
+    :param timeout: Time (seconds) allowed per SwitchBot, None for no limit
+    :type timeout: Optional[float]
+    :return: The result for this SwitchBot
+    :rtype: SwitchBotBatchResult
+    """
+
+    async def run() -> Optional[SwitchBotResponse]:
+        async with pool.acquire(mac_address) as bot:
+            if isinstance(action, SwitchBotAction):
+                return await bot.set_bot_state(action)
+            return await bot.run_action_set(action)
+
+    async with slots:
+        start = time.perf_counter()
+        try:
+            response = await asyncio.wait_for(run(), timeout)
+        except asyncio.CancelledError:
+            raise
+        except SwitchBotResponseError as err:
+            return SwitchBotBatchResult(
+                mac_address, False, err.status, time.perf_counter() - start, err.response, err
+            )
+        except Exception as err:
+            _LOGGER.warning(
+                "Batch command failed for %s: %r",
+                mac_address,
+                err,
+                extra={"event": "batch_failed", "mac_address": mac_address},
+            )
+            return SwitchBotBatchResult(mac_address, False, None, time.perf_counter() - start, None, err)
+
+    latency_s = time.perf_counter() - start
+    if response is None:
+        # The action was rejected before anything was sent (e.g. unsupported state)
+        return SwitchBotBatchResult(mac_address, False, None, latency_s)
+    return SwitchBotBatchResult(mac_address, response.is_ok, response.status, latency_s, response)
+
+
+async def run_batch(
+    targets: Iterable[Union[str, VirtualSwitchBot]],
+    action: BatchAction,
+    max_concurrency: int = 3,
+    pool: Optional[SwitchBotPool] = None,
+    timeout: Optional[float] = None,
+) -> Dict[str, SwitchBotBatchResult]:
+    """
+    Run one action (or action set) on many SwitchBots concurrently
+
+    A SwitchBot that is unreachable or fails only affects its own result.
+
+    .. code-block:: python
+
+        results = await run_batch(["F6:9A:4E:9C:3F:3B", "C1:2B:3C:4D:5E:6F"], SwitchBotAction.ON)
+        failed = [r.mac_address for r in results.values() if not r.success]
+
+    :param targets: MAC addresses or VirtualSwitchBots to run the action on
+    :type targets: Iterable[Union[str, VirtualSwitchBot]]
+    :param action: The action, or an action set as accepted by ``run_action_set``
+    :type action: Union[SwitchBotAction, List[Tuple[float, SwitchBotAction]]]
+    :param max_concurrency: Maximum number of SwitchBots handled at once
+    :type max_concurrency: int
+    :param pool: Pool to take connections from (they stay open afterwards), None to connect and disconnect each SwitchBot
+    :type pool: Optional[SwitchBotPool]
+    :param timeout: Time (seconds) allowed per SwitchBot including connecting, None for no limit
+    :type timeout: Optional[float]
+    :return: The result for each SwitchBot, by MAC address
+    :rtype: Dict[str, SwitchBotBatchResult]
+    """
+    if max_concurrency < 1:
+        raise ValueError(f"Invalid max concurrency {max_concurrency}, must be at least 1")
+
+    owns_pool = pool is None
+    if pool is None:
+        pool = SwitchBotPool(max_connections=max_concurrency)
+
+    addresses: List[str] = []
+    for target in targets:
+        if isinstance(target, VirtualSwitchBot):
+            pool.add_bot(target)
+            target = target.mac_address
+        if target not in addresses:
+            addresses.append(target)
+
+    slots = asyncio.Semaphore(max_concurrency)
+    try:
+        results = await asyncio.gather(
+            *(_run_one(pool, address, action, slots, timeout) for address in addresses)
+        )
+    finally:
+        if owns_pool:
+            await pool.close()
+
+    return {result.mac_address: result for result in results}
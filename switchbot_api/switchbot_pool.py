@@ -0,0 +1,245 @@
+'''
+Python-Switchbot-BLE: A Python library for interfacing with Switchbot devices over Bluetooth Low Energy (BLE)
+Copyright (C) 2023  Benjamin Carlson
+'''
+
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Dict, List, Optional
+import asyncio
+import logging
+
+from .bot_types import SwitchBotMetadata
+from .switchbot import VirtualSwitchBot
+
+_LOGGER = logging.getLogger(__name__)
+
+__all__ = ["SwitchBotPool"]
+
+
+class SwitchBotPool:
+    def __init__(
+        self,
+        max_connections: int = 3,
+        prefetch: SwitchBotMetadata = SwitchBotMetadata.NONE,
+        bot_factory: Optional[Callable[[str], VirtualSwitchBot]] = None,
+    ) -> None:
+        """
+        Keeps connections to many SwitchBots open, bounded by what the BLE adapter supports
+
+        When ``max_connections`` bots are connected, the least recently used idle bot is
+        disconnected to make room. Evicted (or dropped) bots reconnect on their next use.
+
+        :param max_connections: Maximum number of simultaneous connections
+        :type max_connections: int
+        :param prefetch: The metadata to fetch whenever a bot (re)connects
+        :type prefetch: SwitchBotMetadata
+        :param bot_factory: Creates the VirtualSwitchBot for a MAC address not in the pool
+        :type bot_factory: Optional[Callable[[str], VirtualSwitchBot]]
+        """
+        if max_connections < 1:
+            raise ValueError(f"Invalid max connections {max_connections}, must be at least 1")
+
+        self._max_connections = max_connections
+        self._prefetch = prefetch
+        self._bot_factory = bot_factory if bot_factory is not None else VirtualSwitchBot
+
+        self._bots: Dict[str, VirtualSwitchBot] = {}
+        # Addresses holding a connection slot, least recently used first
+        self._connected: "OrderedDict[str, None]" = OrderedDict()
+        # Number of callers currently using each bot (bots in use are never evicted)
+        self._leases: Dict[str, int] = {}
+        self._connect_locks: Dict[str, asyncio.Lock] = {}
+
+        # Created lazily so it is bound to the running event loop
+        self._condition: Optional[asyncio.Condition] = None
+
+    def add_bot(self, bot: VirtualSwitchBot) -> VirtualSwitchBot:
+        """
+        Add an existing VirtualSwitchBot to the pool (the pooled bot is returned if the address is already known)
+
+        :param bot: The bot to add
+        :type bot: VirtualSwitchBot
+        :return: The pooled bot for the address
+        :rtype: VirtualSwitchBot
+        """
+        return self._bots.setdefault(bot.mac_address, bot)
+
+    def get_bot(self, mac_address: str) -> VirtualSwitchBot:
+        """
+        The pooled bot for an address (created, not connected, if unknown)
+
+        :param mac_address: The MAC address of the SwitchBot
+        :type mac_address: str
+        :return: The pooled bot
+        :rtype: VirtualSwitchBot
+        """
+        bot = self._bots.get(mac_address)
+        if bot is None:
+            bot = self._bot_factory(mac_address)
+            self._bots[mac_address] = bot
+        return bot
+
+    def _get_condition(self) -> asyncio.Condition:
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    def _find_idle_victim(self) -> Optional[str]:
+        """
+        The least recently used connected bot that nobody is using
+
+        :return: The address to evict, None if every connected bot is in use
+        :rtype: Optional[str]
+        """
+        for address in self._connected:
+            if self._leases.get(address, 0) == 0:
+                return address
+        return None
+
+    async def _lease(self, mac_address: str) -> VirtualSwitchBot:
+        """
+        Mark a bot as in use and make sure it is connected, evicting an idle bot if needed
+
+        :param mac_address: The MAC address of the SwitchBot
+        :type mac_address: str
+        :return: The connected bot
+        :rtype: VirtualSwitchBot
+        """
+        condition = self._get_condition()
+        victims: List[VirtualSwitchBot] = []
+
+        async with condition:
+            bot = self.get_bot(mac_address)
+            self._leases[mac_address] = self._leases.get(mac_address, 0) + 1
+
+            try:
+                while mac_address not in self._connected:
+                    if len(self._connected) < self._max_connections:
+                        self._connected[mac_address] = None
+                        break
+
+                    victim = self._find_idle_victim()
+                    if victim is None:
+                        # Every slot is in use, wait for a bot to be returned
+                        await condition.wait()
+                        continue
+
+                    del self._connected[victim]
+                    victims.append(self._bots[victim])
+            except BaseException:
+                self._leases[mac_address] -= 1
+                raise
+
+            self._connected.move_to_end(mac_address)
+
+        try:
+            for victim_bot in victims:
+                async with self._connect_lock(victim_bot.mac_address):
+                    if victim_bot.is_connected:
+                        _LOGGER.debug(
+                            "Evicting idle SwitchBot (%s) from the pool",
+                            victim_bot.mac_address,
+                            extra={"event": "pool_evict", "mac_address": victim_bot.mac_address},
+                        )
+                        await victim_bot.disconnect()
+
+            async with self._connect_lock(mac_address):
+                if not bot.is_connected:
+                    await bot.connect(self._prefetch)
+        except BaseException:
+            await self._return(mac_address, release_slot=not bot.is_connected)
+            raise
+
+        return bot
+
+    async def _return(self, mac_address: str, release_slot: bool = False):
+        """
+        Mark a bot as no longer in use by one caller
+
+        :param mac_address: The MAC address of the SwitchBot
+        :type mac_address: str
+        :param release_slot: Whether to give up the bot's connection slot (e.g. failed to connect)
+        :type release_slot: bool
+        """
+        condition = self._get_condition()
+        async with condition:
+            self._leases[mac_address] -= 1
+            if release_slot and self._leases[mac_address] == 0:
+                self._connected.pop(mac_address, None)
+            elif mac_address in self._connected:
+                self._connected.move_to_end(mac_address)
+            condition.notify_all()
+
+    def _connect_lock(self, mac_address: str) -> asyncio.Lock:
+        lock = self._connect_locks.get(mac_address)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._connect_locks[mac_address] = lock
+        return lock
+
+    @asynccontextmanager
+    async def acquire(self, mac_address: str) -> AsyncIterator[VirtualSwitchBot]:
+        """
+        Use a connected bot (reconnecting it if it was evicted or dropped)
+
+        .. code-block:: python
+
+            async with pool.acquire("F6:9A:4E:9C:3F:3B") as bot:
+                await bot.set_bot_state(SwitchBotAction.PRESS)
+
+        :param mac_address: The MAC address of the SwitchBot
+        :type mac_address: str
+        :return: The connected bot, only valid within the ``async with`` block
+        :rtype: AsyncIterator[VirtualSwitchBot]
+        """
+        bot = await self._lease(mac_address)
+        try:
+            yield bot
+        finally:
+            await self._return(mac_address)
+
+    async def close(self):
+        """
+        Disconnect every pooled bot
+        """
+        condition = self._get_condition()
+        async with condition:
+            addresses = list(self._connected)
+            self._connected.clear()
+
+        for address in addresses:
+            bot = self._bots[address]
+            async with self._connect_lock(address):
+                if bot.is_connected:
+                    await bot.disconnect()
+
+    @property
+    def bots(self) -> List[VirtualSwitchBot]:
+        """
+        Every bot known to the pool
+
+        :return: Pooled bots
+        :rtype: List[VirtualSwitchBot]
+        """
+        return list(self._bots.values())
+
+    @property
+    def connected_addresses(self) -> List[str]:
+        """
+        Addresses holding a connection slot, least recently used first
+
+        :return: MAC addresses
+        :rtype: List[str]
+        """
+        return list(self._connected)
+
+    @property
+    def max_connections(self) -> int:
+        return self._max_connections
+
+    async def __aenter__(self) -> "SwitchBotPool":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
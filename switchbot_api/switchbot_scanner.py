@@ -4,63 +4,117 @@ Copyright (C) 2023  Benjamin Carlson
 '''
 
 
-from bleak import BleakScanner, BLEDevice, AdvertisementData
-from typing import Tuple, Optional, List
+from typing import Optional, Set
 import asyncio
-import platform
+import logging
+import time
 
 from .switchbot import VirtualSwitchBot
+from .scan_session import SwitchBotAdvertisement, SwitchBotScanSession, default_scan_session
+from .metrics import SwitchBotMetrics, default_metrics
+from .tracing import Span, Tracer, default_tracer
+
+_LOGGER = logging.getLogger(__name__)
 
 
 class SwitchBotScanner:
     # Service UUID
-    UNKNOWN_SERVICE_DATA_UUID = "00000d00-0000-1000-8000-00805f9b34fb"
+    UNKNOWN_SERVICE_DATA_UUID = SwitchBotScanSession.UNKNOWN_SERVICE_DATA_UUID
     # Manufacturer ID for Nordic Semiconductors
-    NORDIC_MANUFACTURER_ID = 0x59
+    NORDIC_MANUFACTURER_ID = SwitchBotScanSession.NORDIC_MANUFACTURER_ID
 
 
-    def __init__(self, bot_count : int = 1) -> None:
+    def __init__(
+        self,
+        bot_count : int = 1,
+        session : Optional[SwitchBotScanSession] = None,
+        candidate_max_age_s : float = 30.0,
+        metrics : Optional[SwitchBotMetrics] = None,
+        tracer : Optional[Tracer] = None,
+    ) -> None:
+        """
+        Iterates over the SwitchBots found nearby
+
+        :param bot_count: Number of SwitchBots to find before stopping
+        :type bot_count: int
+        :param session: The scan session to find SwitchBots with, defaults to the shared session
+        :type session: Optional[SwitchBotScanSession]
+        :param candidate_max_age_s: SwitchBots the session saw within this many seconds are yielded without waiting
+        :type candidate_max_age_s: float
+        :param metrics: Metrics to record discovery times into, defaults to those enabled with ``enable_metrics`` (if any)
+        :type metrics: Optional[SwitchBotMetrics]
+        :param tracer: Tracer of the lookups (and of the SwitchBots found), defaults to the one enabled with ``enable_tracing``
+        :type tracer: Optional[Tracer]
+        """
         self._bot_count = bot_count
-        self._found_mac_addrs : List[str] = []
-
-    def _filter_device_adv(
-        self, device: BLEDevice, adv: AdvertisementData
-    ) -> Tuple[bool, Optional[bytearray]]:
+        self._session = session if session is not None else default_scan_session()
+        self._candidate_max_age_s = candidate_max_age_s
+        self._found_mac_addrs : Set[str] = set()
+        # SwitchBots matched by the session, waiting to be yielded
+        self._matches : Optional[asyncio.Queue] = None
+        self._metrics = metrics if metrics is not None else default_metrics()
+        self._tracer = tracer if tracer is not None else default_tracer()
+
+    def _on_advertisement(self, advertisement: SwitchBotAdvertisement):
         """
-        Determines if device is a SwitchBot or not
-
-        :param device: Device object
-        :type device: BLEDevice
-        :param adv: Device advertisement data
-        :type adv: AdvertisementData
-        :return: Whether the device is a SwitchBot and if so, the associated service data
-        :rtype: Tuple[bool, Optional[bytes]]
+        Session subscriber, queues SwitchBots that have not been yielded yet
+
+        :param advertisement: The SwitchBot advertisement received
+        :type advertisement: SwitchBotAdvertisement
         """
-        man_data = adv.manufacturer_data.get(self.NORDIC_MANUFACTURER_ID)
-        if man_data is None:
-            return False, None
+        if self._matches is None or advertisement.address in self._found_mac_addrs:
+            return
 
-        service_data = adv.service_data.get(self.UNKNOWN_SERVICE_DATA_UUID)
-        if service_data is None:
-            return False, None
+        # Claim the address now so repeated advertisements are not queued twice
+        self._found_mac_addrs.add(advertisement.address)
+        self._matches.put_nowait(advertisement)
 
-        mac_addr = device.address
+    def _make_bot(self, advertisement: SwitchBotAdvertisement) -> VirtualSwitchBot:
+        """
+        Create the VirtualSwitchBot for a discovered SwitchBot
 
-        # macOS does not provide the MAC address, only a "UUID", so we can't check it
-        if platform.system() != "Darwin":
-            # I am not sure if this is only for SwitchBot or is a general pattern
-            mac_bytes = bytearray(int(x, base=16) for x in mac_addr.split(":"))
-            if mac_bytes != man_data:
-                return False, None
+        :param advertisement: The SwitchBot advertisement
+        :type advertisement: SwitchBotAdvertisement
+        :return: The VirtualSwitchBot found
+        :rtype: VirtualSwitchBot
+        """
+        _LOGGER.info(
+            "Found SwitchBot: %s (%s), RSSI: %s",
+            advertisement.device.name,
+            advertisement.address,
+            advertisement.advertisement_data.rssi,
+            extra={
+                "event": "switchbot_found",
+                "mac_address": advertisement.address,
+                "rssi": advertisement.advertisement_data.rssi,
+            },
+        )
+
+        switch_bot = VirtualSwitchBot(
+            advertisement.address,
+            device=advertisement.device,
+            advertisement_data=advertisement.advertisement_data,
+            discovered_at=advertisement.discovered_at,
+            transport=self._session.transport,
+            metrics=self._metrics,
+            tracer=self._tracer,
+        )
+        switch_bot.info.read_service_bytes(advertisement.service_data)
+
+        return switch_bot
+
+    async def _wait_for_match(self) -> VirtualSwitchBot:
+        """
+        Wait for the session to match the next SwitchBot
 
-        print(f"Found SwitchBot: {device.name} ({mac_addr})")
-        print(f"  - RSSI: {adv.rssi}")
+        :return: The VirtualSwitchBot found
+        :rtype: VirtualSwitchBot
+        """
+        return self._make_bot(await self._matches.get())
 
-        return True, bytearray(service_data)
-    
     def __aiter__(self):
         return self
-    
+
     async def __anext__(self):
         """
         Scans for the next SwitchBot until the desired number of SwitchBots are found
@@ -68,38 +122,50 @@ class SwitchBotScanner:
         :return: The VirtualSwitchBot found
         :rtype: AsyncIterator[VirtualSwitchBot]
         """
-        async with BleakScanner() as scanner:
-
-            bots_found = 0
-
-            while True:
-
-                if bots_found >= self._bot_count:
-                    print(f"Found {bots_found} SwitchBots, stopping scanner...")
-                    raise StopAsyncIteration
+        if len(self._found_mac_addrs) >= self._bot_count:
+            _LOGGER.debug("Found %d SwitchBots, stopping scanner", len(self._found_mac_addrs))
+            raise StopAsyncIteration
 
-                await asyncio.sleep(1.0)
-                data = scanner.discovered_devices_and_advertisement_data
-                for _, (dis_device, dis_advertisement) in data.items():
+        with self._tracer.start_span("scanner.next_bot") as span:
+            bot = await self._next_bot(span)
+            span.set_attribute("mac_address", bot.mac_address)
+        return bot
 
-                    bot_address = dis_device.address
-                    # Ignore if we already found this device
-                    if bot_address in self._found_mac_addrs:
-                        continue
-
-                    is_switchbot, dev_service_data = self._filter_device_adv(
-                        dis_device, dis_advertisement
-                    )
-
-                    if is_switchbot:
-                        
-                        self._found_mac_addrs.append(bot_address)
+    async def _next_bot(self, span: Span) -> VirtualSwitchBot:
+        """
+        Find the next SwitchBot, from the session's recent advertisements or by scanning
 
-                        bots_found += 1
-                        switch_bot = VirtualSwitchBot(bot_address)
-                        switch_bot.info.read_service_bytes(dev_service_data)
+        :param span: Span of the lookup, gets its ``source`` (candidate or scan)
+        :type span: Span
+        :return: The VirtualSwitchBot found
+        :rtype: VirtualSwitchBot
+        """
+        started = time.monotonic()
+
+        # SwitchBots the session has already seen do not need to wait for another advertisement
+        for candidate in self._session.candidates(self._candidate_max_age_s):
+            if candidate.address not in self._found_mac_addrs:
+                self._found_mac_addrs.add(candidate.address)
+                if self._metrics is not None:
+                    self._metrics.discovery_duration.labels("candidate").observe(time.monotonic() - started)
+                span.set_attribute("source", "candidate")
+                return self._make_bot(candidate)
+
+        span.set_attribute("source", "scan")
+        self._matches = asyncio.Queue()
+        unsubscribe = self._session.subscribe(self._on_advertisement)
+        try:
+            async with self._session:
+                bot = await self._wait_for_match()
+            if self._metrics is not None:
+                self._metrics.discovery_duration.labels("scan").observe(time.monotonic() - started)
+            return bot
+        finally:
+            unsubscribe()
+            # Matches that were not yielded can be found again next time
+            while not self._matches.empty():
+                self._found_mac_addrs.discard(self._matches.get_nowait().address)
+            self._matches = None
 
-                        return switch_bot
-                    
     # Alias for easy use
     next_bot = __anext__
\ No newline at end of file
@@ -0,0 +1,296 @@
+'''
+Python-Switchbot-BLE: A Python library for interfacing with Switchbot devices over Bluetooth Low Energy (BLE)
+Copyright (C) 2023  Benjamin Carlson
+'''
+
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+import itertools
+import time
+
+__all__ = [
+    "Span",
+    "Tracer",
+    "RecordedSpan",
+    "RecordingTracer",
+    "enable_tracing",
+    "disable_tracing",
+    "default_tracer",
+]
+
+
+class Span:
+    '''
+    A phase being traced, ended when its ``with`` block exits (or by ``end()``)
+
+    The base class records nothing, it is what the no-op tracer hands out.
+    '''
+
+    __slots__ = ()
+
+    def set_attribute(self, key: str, value: Any):
+        """
+        Attach a value to the span (e.g. the status of a response)
+
+        :param key: Name of the attribute
+        :type key: str
+        :param value: The value
+        :type value: Any
+        """
+
+    def add_event(self, name: str, **attributes: Any):
+        """
+        Mark a point in time within the span
+
+        :param name: Name of the event
+        :type name: str
+        :param attributes: Values attached to the event
+        :type attributes: Any
+        """
+
+    def end(self, error: Optional[BaseException] = None):
+        """
+        End the span
+
+        :param error: The error the phase failed with, None if it succeeded
+        :type error: Optional[BaseException]
+        """
+
+    def __enter__(self) -> "Span":
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.end(exc)
+
+
+_NOOP_SPAN = Span()
+
+
+class Tracer:
+    '''
+    Creates the spans of the traced phases, the base class traces nothing (the default)
+
+    Subclasses override ``start_span`` to forward spans to a tracing system (e.g. OpenTelemetry).
+    Phases traced by the library:
+
+    * ``scanner.next_bot``: finding the next SwitchBot (``source`` is ``candidate`` or ``scan``)
+    * ``switchbot.connect``: all of ``VirtualSwitchBot.connect``, with the children
+      ``switchbot.find_device``, ``switchbot.client_connect``, ``switchbot.start_notify`` and ``switchbot.prefetch``
+    * ``switchbot.request``: one request attempt, from waiting for a pipeline slot to its response.
+      It has a ``switchbot.write`` child and a ``notification`` event (with the response ``status``)
+    '''
+
+    def start_span(self, name: str, **attributes: Any) -> Span:
+        """
+        Start a span, child of the span whose ``with`` block is running (if any)
+
+        :param name: Name of the phase
+        :type name: str
+        :param attributes: Values attached to the span (e.g. ``mac_address``)
+        :type attributes: Any
+        :return: The span, to be used as a context manager
+        :rtype: Span
+        """
+        return _NOOP_SPAN
+
+
+@dataclass
+class RecordedSpan:
+    '''
+    A span recorded by a RecordingTracer
+    '''
+
+    name: str
+
+    span_id: int
+
+    # The span this span ran within, None for root spans
+    parent_id: Optional[int]
+
+    # time.monotonic() when the span started and ended (None while running)
+    start: float
+    end: Optional[float] = None
+
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+    # (time.monotonic(), name, attributes) of each event
+    events: List[Tuple[float, str, Dict[str, Any]]] = field(default_factory=list)
+
+    # repr() of the error the span ended with, None if it succeeded
+    error: Optional[str] = None
+
+    @property
+    def duration(self) -> Optional[float]:
+        return None if self.end is None else self.end - self.start
+
+
+class _RecordingSpan(Span):
+    __slots__ = ("_tracer", "_record", "_token")
+
+    def __init__(self, tracer: "RecordingTracer", record: RecordedSpan):
+        self._tracer = tracer
+        self._record = record
+        self._token = None
+
+    def set_attribute(self, key: str, value: Any):
+        self._record.attributes[key] = value
+
+    def add_event(self, name: str, **attributes: Any):
+        self._record.events.append((time.monotonic(), name, attributes))
+
+    def end(self, error: Optional[BaseException] = None):
+        if self._record.end is None:
+            self._record.end = time.monotonic()
+            if error is not None:
+                self._record.error = repr(error)
+
+    def __enter__(self) -> "Span":
+        self._token = self._tracer._current.set(self._record.span_id)
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.end(exc)
+        if self._token is not None:
+            self._tracer._current.reset(self._token)
+            self._token = None
+
+
+class RecordingTracer(Tracer):
+    def __init__(self, max_spans: Optional[int] = 100000) -> None:
+        """
+        Keeps every span in memory, to dump the timeline of a slow operation
+
+        .. code-block:: python
+
+            tracer = RecordingTracer()
+            bot = VirtualSwitchBot(mac_address, tracer=tracer)
+            await bot.connect()
+            await bot.set_bot_state(SwitchBotAction.PRESS)
+            print(tracer.timeline())
+
+        :param max_spans: Spans kept, the oldest are dropped beyond it (None to keep all)
+        :type max_spans: Optional[int]
+        """
+        self._max_spans = max_spans
+        self._spans: List[RecordedSpan] = []
+        self._ids = itertools.count(1)
+        # Span of the running ``with`` block (per task)
+        self._current: ContextVar[Optional[int]] = ContextVar(f"switchbot_span_{id(self)}", default=None)
+
+    def start_span(self, name: str, **attributes: Any) -> Span:
+        record = RecordedSpan(name, next(self._ids), self._current.get(), time.monotonic(), attributes=attributes)
+        self._spans.append(record)
+        if self._max_spans is not None and len(self._spans) > self._max_spans:
+            del self._spans[: len(self._spans) - self._max_spans]
+        return _RecordingSpan(self, record)
+
+    @property
+    def spans(self) -> List[RecordedSpan]:
+        """
+        The recorded spans, in the order they started
+
+        :return: The spans
+        :rtype: List[RecordedSpan]
+        """
+        return list(self._spans)
+
+    def clear(self):
+        """
+        Forget the recorded spans
+        """
+        self._spans.clear()
+
+    def timeline(self, root: Optional[RecordedSpan] = None) -> str:
+        """
+        The spans as an indented timeline, with start offsets and durations in milliseconds
+
+        .. code-block:: text
+
+               0.000 ms  +  52.114 ms  switchbot.request request_type=COMMAND
+               0.015 ms  +   0.402 ms    switchbot.write
+              52.101 ms                  * notification status=OK
+
+        :param root: Only this span and its descendants, every span if None
+        :type root: Optional[RecordedSpan]
+        :return: One line per span and event
+        :rtype: str
+        """
+        spans = self._spans if root is None else self._descendants(root)
+        if len(spans) == 0:
+            return ""
+
+        children: Dict[Optional[int], List[RecordedSpan]] = {}
+        known = {span.span_id for span in spans}
+        for span in spans:
+            # Spans whose parent is not shown are listed as roots
+            parent_id = span.parent_id if span.parent_id in known else None
+            children.setdefault(parent_id, []).append(span)
+
+        origin = spans[0].start
+        lines: List[str] = []
+
+        def add(span: RecordedSpan, depth: int):
+            indent = "  " * depth
+            duration = f"+ {span.duration * 1000:9.3f} ms" if span.duration is not None else "+   running   "
+            attributes = "".join(f" {key}={value}" for key, value in span.attributes.items())
+            error = f" error={span.error}" if span.error is not None else ""
+            lines.append(f"{(span.start - origin) * 1000:10.3f} ms  {duration}  {indent}{span.name}{attributes}{error}")
+
+            entries: List[Tuple[float, Any]] = [(event[0], event) for event in span.events]
+            entries += [(child.start, child) for child in children.get(span.span_id, [])]
+            for _, entry in sorted(entries, key=lambda item: item[0]):
+                if isinstance(entry, RecordedSpan):
+                    add(entry, depth + 1)
+                else:
+                    at, name, event_attributes = entry
+                    details = "".join(f" {key}={value}" for key, value in event_attributes.items())
+                    lines.append(f"{(at - origin) * 1000:10.3f} ms  {'':14}  {indent}  * {name}{details}")
+
+        for span in children.get(None, []):
+            add(span, 0)
+        return "\n".join(lines)
+
+    def _descendants(self, root: RecordedSpan) -> List[RecordedSpan]:
+        ids = {root.span_id}
+        spans = []
+        for span in self._spans:
+            if span.span_id in ids or span.parent_id in ids:
+                ids.add(span.span_id)
+                spans.append(span)
+        return spans
+
+
+_default_tracer: Tracer = Tracer()
+
+
+def enable_tracing(tracer: Optional[Tracer] = None) -> Tracer:
+    """
+    Trace the SwitchBots and scanners created from now on
+
+    :param tracer: The tracer to use, a new RecordingTracer if None
+    :type tracer: Optional[Tracer]
+    :return: The tracer used
+    :rtype: Tracer
+    """
+    global _default_tracer
+    _default_tracer = tracer if tracer is not None else RecordingTracer()
+    return _default_tracer
+
+
+def disable_tracing():
+    """
+    Stop tracing the SwitchBots and scanners created from now on (they get the no-op tracer)
+    """
+    global _default_tracer
+    _default_tracer = Tracer()
+
+
+def default_tracer() -> Tracer:
+    """
+    The tracer new SwitchBots and scanners use
+
+    :return: The tracer, a no-op Tracer unless tracing was enabled
+    :rtype: Tracer
+    """
+    return _default_tracer
@@ -0,0 +1,100 @@
+'''
+Python-Switchbot-BLE: A Python library for interfacing with Switchbot devices over Bluetooth Low Energy (BLE)
+Copyright (C) 2023  Benjamin Carlson
+'''
+
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Optional
+
+__all__ = ["SwitchBotTransport", "BleakTransport", "default_transport"]
+
+
+class SwitchBotTransport(ABC):
+    '''
+    Where SwitchBots are found and connected to
+
+    Clients must provide the subset of the ``bleak.BleakClient`` interface used by
+    ``VirtualSwitchBot``: ``connect()``, ``disconnect()``, ``is_connected``,
+    ``start_notify(char, callback)`` and ``write_gatt_char(char, data, response)``.
+    Scanners must provide ``start()`` and ``stop()`` and call the detection callback
+    with ``(device, advertisement_data)`` for every advertisement.
+    '''
+
+    @abstractmethod
+    async def find_device(self, mac_address: str, timeout: float = 10.0) -> Optional[Any]:
+        """
+        Scan for a device by its MAC address
+
+        :param mac_address: The MAC address to find
+        :type mac_address: str
+        :param timeout: Time (seconds) to scan for
+        :type timeout: float
+        :return: The device, None if it was not found
+        :rtype: Optional[Any]
+        """
+
+    @abstractmethod
+    def create_client(self, device: Any, disconnected_callback: Optional[Callable[[Any], None]] = None) -> Any:
+        """
+        Create a (not yet connected) client for a device
+
+        :param device: A device returned by ``find_device`` or a scanner (or its address)
+        :type device: Any
+        :param disconnected_callback: Called with the client when its connection is closed or lost
+        :type disconnected_callback: Optional[Callable[[Any], None]]
+        :return: The client
+        :rtype: Any
+        """
+
+    @abstractmethod
+    def create_scanner(self, detection_callback: Callable[[Any, Any], None], **kwargs: Any) -> Any:
+        """
+        Create a (not yet started) scanner
+
+        :param detection_callback: Called with ``(device, advertisement_data)`` for every advertisement
+        :type detection_callback: Callable[[Any, Any], None]
+        :param kwargs: Transport specific scanner arguments
+        :type kwargs: Any
+        :return: The scanner
+        :rtype: Any
+        """
+
+
+class BleakTransport(SwitchBotTransport):
+    '''
+    The local Bluetooth adapter, through bleak
+
+    bleak is only imported once the transport is used, keeping it out of processes that
+    never touch a radio (simulation, replay, offline tooling).
+    '''
+
+    async def find_device(self, mac_address: str, timeout: float = 10.0) -> Optional[Any]:
+        from bleak import BleakScanner
+
+        return await BleakScanner.find_device_by_address(mac_address, timeout=timeout)
+
+    def create_client(self, device: Any, disconnected_callback: Optional[Callable[[Any], None]] = None) -> Any:
+        from bleak import BleakClient
+
+        return BleakClient(device, disconnected_callback=disconnected_callback)
+
+    def create_scanner(self, detection_callback: Callable[[Any, Any], None], **kwargs: Any) -> Any:
+        from bleak import BleakScanner
+
+        return BleakScanner(detection_callback=detection_callback, **kwargs)
+
+
+_default_transport: Optional[SwitchBotTransport] = None
+
+
+def default_transport() -> SwitchBotTransport:
+    """
+    The transport used when none is given (bleak)
+
+    :return: The default transport
+    :rtype: SwitchBotTransport
+    """
+    global _default_transport
+    if _default_transport is None:
+        _default_transport = BleakTransport()
+    return _default_transport
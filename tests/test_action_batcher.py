@@ -0,0 +1,54 @@
+'''
+Python-Switchbot-BLE: A Python library for interfacing with Switchbot devices over Bluetooth Low Energy (BLE)
+Copyright (C) 2023  Benjamin Carlson
+'''
+
+import asyncio
+
+from switchbot_api import SwitchBotActionBatcher, VirtualSwitchBot
+from switchbot_api.bot_types import SwitchBotAction, SwitchBotMetadata
+from switchbot_api.simulation import SimulatedSwitchBot, SimulatedTransport
+
+MAC = "F6:9A:4E:9C:3F:3B"
+
+
+def test_actions_within_the_window_are_packed():
+    async def run():
+        simulated = SimulatedSwitchBot(MAC)
+        bot = VirtualSwitchBot(MAC, transport=SimulatedTransport([simulated]))
+        await bot.connect(prefetch=SwitchBotMetadata.NONE)
+        batcher = SwitchBotActionBatcher(bot, window_s=0.1)
+
+        actions = [SwitchBotAction.ON, SwitchBotAction.OFF, SwitchBotAction.PRESS]
+        responses = await asyncio.gather(*(batcher.set_bot_state(action) for action in actions))
+
+        assert simulated.actions_executed == actions
+        assert simulated.requests_handled == 1
+        assert responses[0] is responses[1] is responses[2]
+        assert batcher.stats.actions == 3
+        assert batcher.stats.packets == 1
+        assert batcher.stats.writes_saved == 2
+        await batcher.close()
+        await bot.disconnect()
+
+    asyncio.run(run())
+
+
+def test_long_sequences_are_split_at_the_action_set_limit():
+    async def run():
+        simulated = SimulatedSwitchBot(MAC)
+        bot = VirtualSwitchBot(MAC, transport=SimulatedTransport([simulated]))
+        await bot.connect(prefetch=SwitchBotMetadata.NONE)
+        batcher = SwitchBotActionBatcher(bot, window_s=0.1)
+
+        count = bot.max_action_set_actions + 2
+        actions = [SwitchBotAction.ON if index % 2 == 0 else SwitchBotAction.OFF for index in range(count)]
+        await asyncio.gather(*(batcher.set_bot_state(action) for action in actions))
+
+        assert simulated.actions_executed == actions
+        assert batcher.stats.packets == 2
+        assert batcher.stats.writes_saved == count - 2
+        await batcher.close()
+        await bot.disconnect()
+
+    asyncio.run(run())
@@ -0,0 +1,75 @@
+'''
+Python-Switchbot-BLE: A Python library for interfacing with Switchbot devices over Bluetooth Low Energy (BLE)
+Copyright (C) 2023  Benjamin Carlson
+'''
+
+from datetime import timedelta
+
+from switchbot_api.alarm_info import AlarmExecAction, AlarmExecType, AlarmInfo, DayOfWeek
+from switchbot_api.bot_information import BotInformation
+from switchbot_api.simulation import SimulatedSwitchBot
+
+MAC = "F6:9A:4E:9C:3F:3B"
+
+
+def _basic_info(password_str=None) -> bytes:
+    # Get Information payload of a simulated bot (without the status byte)
+    return SimulatedSwitchBot(MAC, password_str=password_str)._handle_get_basic_info(b"")[1:]
+
+
+def test_security_generation_only_changes_with_the_password():
+    info = BotInformation()
+    info.password_str = "secret"
+    generation = info.security_generation
+
+    # Basic info reads re-assign the same password
+    info.update_basic_info(_basic_info("secret"))
+    info.update_basic_info(_basic_info("secret"))
+    info.password_str = "secret"
+    assert info.security_generation == generation
+    assert info.is_encrypted
+
+    info.password_str = "other"
+    assert info.security_generation != generation
+
+    generation = info.security_generation
+    info.password_str = None
+    assert info.security_generation != generation
+    assert not info.is_encrypted
+    assert info.password_checksum is None
+
+
+def test_service_bytes_round_trip():
+    info = BotInformation()
+    info.update_basic_info(_basic_info())
+    assert info.remaining_battery_percent == 100
+    assert BotInformation(bytearray(info.basic_info_bytes())).basic_info_bytes() == info.basic_info_bytes()
+
+
+def test_alarm_days_and_times_are_decoded_when_read():
+    payload = bytes.fromhex("02 01 15 08 1e 01 02 03 00 05 0a")
+    info = BotInformation()
+    alarm = info.update_alarm(memoryview(payload))
+
+    assert alarm._valid_days is None
+    assert alarm == AlarmInfo(
+        True,
+        [DayOfWeek.MONDAY, DayOfWeek.WEDNESDAY, DayOfWeek.FRIDAY],
+        timedelta(hours=8, minutes=30),
+        AlarmExecType.REPEAT_N_TIMES_AT_INTERVAL,
+        AlarmExecAction.OFF,
+        3,
+        timedelta(minutes=5, seconds=10),
+    )
+    assert info.alarm_info_bytes(1) == payload
+
+
+def test_unencrypted_report_does_not_change_the_security_generation():
+    info = BotInformation()
+    info.password_str = "secret"
+    generation = info.security_generation
+
+    # The device reports no encryption, the password set locally still applies
+    info.update_basic_info(_basic_info())
+    assert info.is_encrypted
+    assert info.security_generation == generation
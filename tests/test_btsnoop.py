@@ -0,0 +1,53 @@
+'''
+Python-Switchbot-BLE: A Python library for interfacing with Switchbot devices over Bluetooth Low Energy (BLE)
+Copyright (C) 2023  Benjamin Carlson
+'''
+
+import os
+
+from switchbot_api.bot_types import SwitchBotReqType, TimeManagementInfoSubCommand
+from switchbot_api.btsnoop import CapturedAdvertisement, CapturedRequest, CapturedResponse, read_capture
+
+NOTES = os.path.join(os.path.dirname(__file__), os.pardir, "notes")
+CHECKSUM = bytes.fromhex("deadbeef")
+
+
+def _request(data: bytes) -> CapturedRequest:
+    return CapturedRequest(0.0, 0x40, 0x10, data)
+
+
+def test_subcommand_offsets():
+    alarm_count = TimeManagementInfoSubCommand.ALARM_COUNT.value
+    # Reads: the subcommand follows the header (and the password checksum)
+    assert _request(bytes([0x57, 0x08, alarm_count])).subcommand == alarm_count
+    assert _request(bytes([0x57, 0x18]) + CHECKSUM + bytes([alarm_count])).subcommand == alarm_count
+    # Updates as captured from the official app
+    assert _request(bytes([0x57, 0x09, alarm_count, 0x05])).subcommand == alarm_count
+    # Updates as written by VirtualSwitchBot, with the 0x08 byte before the payload
+    assert _request(bytes([0x57, 0x09, 0x08, alarm_count, 0x05])).subcommand == alarm_count
+    assert _request(bytes([0x57, 0x19, 0x08]) + CHECKSUM + bytes([alarm_count, 0x05])).subcommand == alarm_count
+    # Other requests have none
+    assert _request(bytes([0x57, 0x01])).subcommand is None
+    assert _request(bytes([0x57, 0x09])).subcommand is None
+
+
+def test_capture_events():
+    events = list(read_capture(os.path.join(NOTES, "switchbot_fresh_pass.log")))
+    requests = [event for event in events if isinstance(event, CapturedRequest)]
+    responses = [event for event in events if isinstance(event, CapturedResponse)]
+
+    assert len(requests) == len(responses) > 0
+    assert all(response.request is not None for response in responses)
+    set_time = [request for request in requests if request.request_type == SwitchBotReqType.SET_TIME_MGMT_INFO]
+    assert [request.subcommand for request in set_time] == [TimeManagementInfoSubCommand.DEVICE_TIME.value]
+
+
+def test_advertiser_state_is_bounded():
+    path = os.path.join(NOTES, "switchbot_isolated.log")
+    unbounded = [event for event in read_capture(path, include_att=False)]
+    bounded = [event for event in read_capture(path, include_att=False, max_advertisers=4)]
+
+    # Every report is still yielded, only the merged scan response state of evicted advertisers is lost
+    assert len(bounded) == len(unbounded)
+    assert all(isinstance(event, CapturedAdvertisement) for event in bounded)
+    assert [event.address for event in bounded] == [event.address for event in unbounded]
@@ -0,0 +1,69 @@
+'''
+Python-Switchbot-BLE: A Python library for interfacing with Switchbot devices over Bluetooth Low Energy (BLE)
+Copyright (C) 2023  Benjamin Carlson
+'''
+
+import asyncio
+
+from switchbot_api import SwitchBotCommandQueue, VirtualSwitchBot
+from switchbot_api.bot_types import SwitchBotAction, SwitchBotMetadata
+from switchbot_api.simulation import SimulatedSwitchBot, SimulatedTransport
+
+MAC = "F6:9A:4E:9C:3F:3B"
+
+
+def test_unsent_on_off_commands_are_coalesced():
+    async def run():
+        simulated = SimulatedSwitchBot(MAC, response_latency_s=0.05)
+        bot = VirtualSwitchBot(MAC, transport=SimulatedTransport([simulated]))
+        await bot.connect(prefetch=SwitchBotMetadata.NONE)
+        queue = SwitchBotCommandQueue(bot)
+
+        # The PRESS is sent right away, the ON/OFF queued behind it collapse into the last one
+        first = asyncio.ensure_future(queue.set_bot_state(SwitchBotAction.PRESS))
+        await asyncio.sleep(0.01)
+        responses = await asyncio.gather(
+            queue.set_bot_state(SwitchBotAction.ON),
+            queue.set_bot_state(SwitchBotAction.OFF),
+            queue.set_bot_state(SwitchBotAction.ON),
+        )
+        await first
+
+        assert simulated.actions_executed == [SwitchBotAction.PRESS, SwitchBotAction.ON]
+        # Coalesced commands get the response of the command that superseded them
+        assert responses[0] is responses[1] is responses[2]
+        assert queue.stats.submitted == 4
+        assert queue.stats.sent == 2
+        assert queue.stats.coalesced == 2
+        await queue.close()
+        await bot.disconnect()
+
+    asyncio.run(run())
+
+
+def test_press_and_action_sets_are_never_coalesced():
+    async def run():
+        simulated = SimulatedSwitchBot(MAC, response_latency_s=0.05)
+        bot = VirtualSwitchBot(MAC, transport=SimulatedTransport([simulated]))
+        await bot.connect(prefetch=SwitchBotMetadata.NONE)
+        queue = SwitchBotCommandQueue(bot)
+
+        await asyncio.gather(
+            queue.set_bot_state(SwitchBotAction.PRESS),
+            queue.set_bot_state(SwitchBotAction.PRESS),
+            queue.run_action_set([(0, SwitchBotAction.ON), (0, SwitchBotAction.OFF)]),
+            queue.set_bot_state(SwitchBotAction.PRESS),
+        )
+
+        assert simulated.actions_executed == [
+            SwitchBotAction.PRESS,
+            SwitchBotAction.PRESS,
+            SwitchBotAction.ON,
+            SwitchBotAction.OFF,
+            SwitchBotAction.PRESS,
+        ]
+        assert queue.stats.coalesced == 0
+        await queue.close()
+        await bot.disconnect()
+
+    asyncio.run(run())
@@ -0,0 +1,92 @@
+'''
+Python-Switchbot-BLE: A Python library for interfacing with Switchbot devices over Bluetooth Low Energy (BLE)
+Copyright (C) 2023  Benjamin Carlson
+'''
+
+import asyncio
+
+import pytest
+
+from switchbot_api import SwitchBotDisconnectedError, SwitchBotSupervisor, VirtualSwitchBot
+from switchbot_api.bot_types import SwitchBotAction, SwitchBotMetadata
+from switchbot_api.simulation import SimulatedSwitchBot, SimulatedTransport
+
+MAC = "F6:9A:4E:9C:3F:3B"
+
+
+def test_pending_request_fails_when_the_link_drops():
+    async def run():
+        transport = SimulatedTransport([SimulatedSwitchBot(MAC, response_latency_s=1.0)])
+        bot = VirtualSwitchBot(MAC, transport=transport)
+        await bot.connect(prefetch=SwitchBotMetadata.NONE)
+
+        request = asyncio.ensure_future(bot.set_bot_state(SwitchBotAction.PRESS))
+        await asyncio.sleep(0.05)
+        transport.drop_link(MAC)
+
+        # Fails right away instead of waiting for the request timeout
+        with pytest.raises(SwitchBotDisconnectedError):
+            await asyncio.wait_for(request, 0.5)
+
+    asyncio.run(run())
+
+
+def test_supervisor_reconnects_and_commands_wait_for_it():
+    async def run():
+        simulated = SimulatedSwitchBot(MAC)
+        transport = SimulatedTransport([simulated])
+        bot = VirtualSwitchBot(MAC, transport=transport)
+        supervisor = SwitchBotSupervisor(bot, base_delay_s=0.05, max_delay_s=0.1, jitter=0, wait_timeout_s=5)
+        await bot.connect(prefetch=SwitchBotMetadata.NONE)
+        await supervisor.start()
+
+        transport.drop_link(MAC, unreachable_s=0.2)
+        await asyncio.sleep(0)
+        assert supervisor.is_reconnecting
+
+        # Sent while the bot is unreachable, runs once the supervisor has reconnected
+        await bot.set_bot_state(SwitchBotAction.PRESS)
+
+        assert simulated.actions_executed == [SwitchBotAction.PRESS]
+        assert not supervisor.is_reconnecting
+        assert supervisor.stats.disconnects == 1
+        assert supervisor.stats.reconnects == 1
+        assert supervisor.stats.failed_attempts >= 1
+        await supervisor.close()
+
+    asyncio.run(run())
+
+
+def test_pipeline_depth_holds_across_a_reconnect():
+    async def run():
+        transport = SimulatedTransport([SimulatedSwitchBot(MAC, response_latency_s=0.05)])
+        bot = VirtualSwitchBot(MAC, pipeline_depth=1, transport=transport)
+        supervisor = SwitchBotSupervisor(bot, base_delay_s=0.01, jitter=0, wait_timeout_s=5)
+        await bot.connect(prefetch=SwitchBotMetadata.NONE)
+        await supervisor.start()
+
+        in_flight = []
+
+        async def watch():
+            while True:
+                in_flight.append(len(bot._request_response_queue))
+                await asyncio.sleep(0.001)
+
+        watcher = asyncio.ensure_future(watch())
+        # One request in flight, the others waiting for the pipeline slot when the link drops
+        before = [asyncio.ensure_future(bot.fetch_system_time()) for _ in range(10)]
+        await asyncio.sleep(0.01)
+        transport.drop_link(MAC)
+        await asyncio.sleep(0)
+        await supervisor.wait_connected()
+        after = [asyncio.ensure_future(bot.fetch_system_time()) for _ in range(5)]
+
+        await asyncio.gather(*before, return_exceptions=True)
+        for request in after:
+            await request
+        watcher.cancel()
+
+        assert max(in_flight) == 1
+        await supervisor.close()
+
+    asyncio.run(run())
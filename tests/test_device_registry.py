@@ -0,0 +1,67 @@
+'''
+Python-Switchbot-BLE: A Python library for interfacing with Switchbot devices over Bluetooth Low Energy (BLE)
+Copyright (C) 2023  Benjamin Carlson
+'''
+
+import asyncio
+import json
+
+from switchbot_api import SwitchBotRegistry
+from switchbot_api.bot_types import SwitchBotMode
+from switchbot_api.simulation import SimulatedSwitchBot, SimulatedTransport
+
+MAC = "F6:9A:4E:9C:3F:3B"
+
+
+def test_registry_round_trip_skips_metadata_fetch(tmp_path):
+    path = tmp_path / "switchbots.json"
+
+    async def run():
+        simulated = SimulatedSwitchBot(MAC, password_str="secret", bot_mode=SwitchBotMode.ONE_STATE, firmware_version=4.9)
+        simulated.alarm_count = 2
+        transport = SimulatedTransport([simulated])
+
+        # First process: metadata is fetched and recorded
+        registry = SwitchBotRegistry(path)
+        bot = await registry.connect(MAC, password_str="secret", transport=transport)
+        await bot.disconnect()
+        assert registry.save()
+        assert "secret" not in path.read_text()
+
+        # Next process: restored from the file, connected without fetching anything
+        requests_before = simulated.requests_handled
+        restored = SwitchBotRegistry(path)
+        assert restored.load() == 1
+        bot = await restored.connect(MAC, password_str="secret", transport=transport)
+        assert simulated.requests_handled == requests_before
+        assert bot.info.bot_mode == SwitchBotMode.ONE_STATE
+        assert bot.info.alarm_count == 2
+        assert abs(bot.info.firmware_version - 4.9) < 1e-6
+        await bot.disconnect()
+
+    asyncio.run(run())
+
+
+def test_stale_record_is_fetched_again(tmp_path):
+    path = tmp_path / "switchbots.json"
+
+    async def run():
+        simulated = SimulatedSwitchBot(MAC)
+        transport = SimulatedTransport([simulated])
+        registry = SwitchBotRegistry(path)
+        await (await registry.connect(MAC, transport=transport)).disconnect()
+        registry.save()
+
+        data = json.loads(path.read_text())
+        data["bots"][MAC]["updated_at"] = 0
+        path.write_text(json.dumps(data))
+
+        restored = SwitchBotRegistry(path, max_age=60)
+        restored.load()
+        assert restored.is_stale(MAC)
+        requests_before = simulated.requests_handled
+        await (await restored.connect(MAC, transport=transport)).disconnect()
+        assert simulated.requests_handled > requests_before
+        assert not restored.is_stale(MAC)
+
+    asyncio.run(run())
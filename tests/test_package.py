@@ -0,0 +1,34 @@
+'''
+Python-Switchbot-BLE: A Python library for interfacing with Switchbot devices over Bluetooth Low Energy (BLE)
+Copyright (C) 2023  Benjamin Carlson
+'''
+
+import os
+import subprocess
+import sys
+
+import switchbot_api
+
+
+def test_optional_subsystems_are_imported_lazily():
+    code = (
+        "import sys, switchbot_api\n"
+        "print(' '.join(sorted(m for m in sys.modules if m.startswith(('switchbot_api.', 'bleak')))))"
+    )
+    loaded = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=os.path.join(os.path.dirname(__file__), os.pardir),
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    ).stdout.split()
+
+    for module in ("simulation", "btsnoop", "replay", "switchbot_pool", "device_registry", "connection_supervisor"):
+        assert f"switchbot_api.{module}" not in loaded
+    assert not any(module.startswith("bleak") for module in loaded)
+
+
+def test_every_exported_name_resolves():
+    for name in switchbot_api.__all__:
+        assert getattr(switchbot_api, name) is not None
+    assert switchbot_api.SwitchBotPool.__module__ == "switchbot_api.switchbot_pool"
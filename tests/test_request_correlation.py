@@ -0,0 +1,76 @@
+'''
+Python-Switchbot-BLE: A Python library for interfacing with Switchbot devices over Bluetooth Low Energy (BLE)
+Copyright (C) 2023  Benjamin Carlson
+'''
+
+import asyncio
+import time
+
+import pytest
+
+from switchbot_api import SwitchBotTimeoutError, VirtualSwitchBot
+from switchbot_api.bot_types import SwitchBotAction, SwitchBotMetadata, SwitchBotReqType
+from switchbot_api.simulation import SimulatedSwitchBot, SimulatedTransport
+
+MAC = "F6:9A:4E:9C:3F:3B"
+
+
+def test_pipelined_requests_get_their_own_responses():
+    async def run():
+        transport = SimulatedTransport([SimulatedSwitchBot(MAC, response_latency_s=0.01)])
+        bot = VirtualSwitchBot(MAC, pipeline_depth=4, transport=transport)
+        await bot.connect(prefetch=SwitchBotMetadata.NONE)
+
+        basic_info, system_time, alarm_count = await asyncio.gather(
+            bot.fetch_basic_device_info(), bot.fetch_system_time(), bot.fetch_alarm_count()
+        )
+        assert basic_info.request_type == SwitchBotReqType.GET_BASIC_INFO
+        assert basic_info.value.remaining_battery_percent == 100
+        assert abs(system_time.value - time.time()) < 5
+        assert alarm_count.value == 0
+        await bot.disconnect()
+
+    asyncio.run(run())
+
+
+def test_late_response_is_not_handed_to_the_next_request():
+    async def run():
+        simulated = SimulatedSwitchBot(MAC, response_latency_s=0.15)
+        transport = SimulatedTransport([simulated])
+        bot = VirtualSwitchBot(MAC, request_timeout=0.2, transport=transport)
+        await bot.connect(prefetch=SwitchBotMetadata.NONE)
+        # Measures the round trip: the late response below comes sooner than that after the next write
+        await bot.fetch_system_time()
+
+        simulated.response_latency_s = 0.3
+        with pytest.raises(SwitchBotTimeoutError):
+            await bot.set_bot_state(SwitchBotAction.PRESS)
+
+        # Answered after the late PRESS response, which must be swallowed by the timed out request
+        simulated.response_latency_s = 0.15
+        system_time = await bot.fetch_system_time()
+        assert abs(system_time.value - time.time()) < 5
+        assert len(bot._request_response_queue) == 0
+        await bot.disconnect()
+
+    asyncio.run(run())
+
+
+def test_lost_response_does_not_fail_the_next_requests():
+    async def run():
+        transport = SimulatedTransport([SimulatedSwitchBot(MAC, response_latency_s=0.01)])
+        bot = VirtualSwitchBot(MAC, request_timeout=0.2, transport=transport)
+        await bot.connect(prefetch=SwitchBotMetadata.NONE)
+
+        transport.drop_notifications(MAC)
+        with pytest.raises(SwitchBotTimeoutError):
+            await bot.fetch_system_time()
+
+        # The timed out request must not take the responses of the following ones
+        for _ in range(5):
+            system_time = await bot.fetch_system_time()
+            assert abs(system_time.value - time.time()) < 5
+        assert len(bot._request_response_queue) == 0
+        await bot.disconnect()
+
+    asyncio.run(run())
@@ -0,0 +1,58 @@
+'''
+Python-Switchbot-BLE: A Python library for interfacing with Switchbot devices over Bluetooth Low Energy (BLE)
+Copyright (C) 2023  Benjamin Carlson
+'''
+
+import asyncio
+
+import pytest
+
+from switchbot_api import SwitchBotDecodeError, SwitchBotError, SwitchBotResponseError, VirtualSwitchBot
+from switchbot_api.bot_types import SwitchBotMetadata, SwitchBotReqType, SwitchBotRespStatus
+from switchbot_api.simulation import SimulatedSwitchBot, SimulatedTransport
+
+MAC = "F6:9A:4E:9C:3F:3B"
+
+
+class _TruncatingSwitchBot(SimulatedSwitchBot):
+    # Answers time management reads with a payload too short to decode
+    def handle_request(self, data: bytes) -> bytes:
+        response = super().handle_request(data)
+        if data[1] & 0x0F == SwitchBotReqType.GET_TIME_MGMT_INFO.value:
+            return response[:3]
+        return response
+
+
+def _connected_bot(simulated: SimulatedSwitchBot) -> VirtualSwitchBot:
+    return VirtualSwitchBot(MAC, transport=SimulatedTransport([simulated]))
+
+
+def test_malformed_response_raises_decode_error_with_payload():
+    async def run():
+        bot = _connected_bot(_TruncatingSwitchBot(MAC))
+        await bot.connect(prefetch=SwitchBotMetadata.NONE)
+
+        with pytest.raises(SwitchBotDecodeError) as excinfo:
+            await bot.fetch_system_time()
+        assert isinstance(excinfo.value, SwitchBotError)
+        assert excinfo.value.response.request_type == SwitchBotReqType.GET_TIME_MGMT_INFO
+        assert len(excinfo.value.data) == 2
+
+        # The connection is still usable
+        assert (await bot.fetch_basic_device_info()).is_ok
+        await bot.disconnect()
+
+    asyncio.run(run())
+
+
+def test_error_status_raises_response_error():
+    async def run():
+        bot = _connected_bot(SimulatedSwitchBot(MAC, password_str="secret"))
+        await bot.connect(prefetch=SwitchBotMetadata.NONE)
+
+        with pytest.raises(SwitchBotResponseError) as excinfo:
+            await bot.fetch_basic_device_info()
+        assert excinfo.value.status == SwitchBotRespStatus.PASSWORD_ERROR
+        await bot.disconnect()
+
+    asyncio.run(run())
@@ -0,0 +1,142 @@
+'''
+Python-Switchbot-BLE: A Python library for interfacing with Switchbot devices over Bluetooth Low Energy (BLE)
+Copyright (C) 2023  Benjamin Carlson
+'''
+
+import asyncio
+
+import pytest
+
+from switchbot_api import (
+    CircuitBreaker,
+    RetryPolicy,
+    SwitchBotCircuitOpenError,
+    SwitchBotDisconnectedError,
+    SwitchBotError,
+    SwitchBotResponse,
+    SwitchBotResponseError,
+    VirtualSwitchBot,
+)
+from switchbot_api.bot_types import SwitchBotAction, SwitchBotMetadata, SwitchBotReqType, SwitchBotRespStatus
+from switchbot_api.simulation import SimulatedSwitchBot, SimulatedTransport
+
+MAC = "F6:9A:4E:9C:3F:3B"
+
+
+def _error(request_type: SwitchBotReqType, status: SwitchBotRespStatus) -> SwitchBotResponseError:
+    return SwitchBotResponseError(SwitchBotResponse(request_type, status, b""))
+
+
+def test_commands_are_only_retried_when_busy():
+    policy = RetryPolicy()
+    assert policy.is_retryable(_error(SwitchBotReqType.COMMAND, SwitchBotRespStatus.BUSY))
+    assert not policy.is_retryable(_error(SwitchBotReqType.COMMAND, SwitchBotRespStatus.ERROR))
+    assert not policy.is_retryable(_error(SwitchBotReqType.COMMAND, SwitchBotRespStatus.UNKNOWN))
+    # Reads are safe to repeat
+    assert policy.is_retryable(_error(SwitchBotReqType.GET_BASIC_INFO, SwitchBotRespStatus.ERROR))
+
+
+def test_busy_command_is_retried_until_the_arm_is_free():
+    async def run():
+        simulated = SimulatedSwitchBot(MAC, actuation_s=0.05)
+        bot = VirtualSwitchBot(
+            MAC,
+            transport=SimulatedTransport([simulated]),
+            retry_policy=RetryPolicy(max_attempts=5, base_delay_s=0.03, jitter=0),
+        )
+        await bot.connect(prefetch=SwitchBotMetadata.NONE)
+
+        await bot.set_bot_state(SwitchBotAction.PRESS)
+        await bot.set_bot_state(SwitchBotAction.PRESS)
+
+        assert simulated.actions_executed == [SwitchBotAction.PRESS, SwitchBotAction.PRESS]
+        assert bot.retry_stats.retries_by_cause.get("BUSY", 0) >= 1
+        await bot.disconnect()
+
+    asyncio.run(run())
+
+
+def test_breaker_opens_after_repeated_failures_and_closes_after_a_trial():
+    async def run():
+        simulated = SimulatedSwitchBot(MAC, busy_probability=1.0)
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout_s=0.05)
+        bot = VirtualSwitchBot(MAC, transport=SimulatedTransport([simulated]), circuit_breaker=breaker)
+        await bot.connect(prefetch=SwitchBotMetadata.NONE)
+
+        for _ in range(2):
+            with pytest.raises(SwitchBotResponseError):
+                await bot.fetch_basic_device_info()
+        assert breaker.is_open
+        with pytest.raises(SwitchBotCircuitOpenError):
+            await bot.fetch_basic_device_info()
+
+        simulated.busy_probability = 0.0
+        await asyncio.sleep(0.06)
+        assert (await bot.fetch_basic_device_info()).is_ok
+        assert not breaker.is_open
+        await bot.disconnect()
+
+    asyncio.run(run())
+
+
+def test_cancelled_trial_does_not_reopen_the_breaker():
+    async def run():
+        simulated = SimulatedSwitchBot(MAC, busy_probability=1.0)
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout_s=0.05)
+        bot = VirtualSwitchBot(MAC, transport=SimulatedTransport([simulated]), circuit_breaker=breaker)
+        await bot.connect(prefetch=SwitchBotMetadata.NONE)
+
+        with pytest.raises(SwitchBotResponseError):
+            await bot.fetch_basic_device_info()
+        assert breaker.is_open
+
+        # The half open trial is cancelled before its response arrives
+        simulated.busy_probability = 0.0
+        simulated.response_latency_s = 0.2
+        await asyncio.sleep(0.06)
+        trial = asyncio.ensure_future(bot.fetch_basic_device_info())
+        await asyncio.sleep(0.01)
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+
+        # The next request is let through as the trial instead of being rejected
+        assert breaker.consecutive_failures == 1
+        assert (await bot.fetch_basic_device_info()).is_ok
+        assert not breaker.is_open
+        await bot.disconnect()
+
+    asyncio.run(run())
+
+
+def test_requests_while_disconnected_do_not_count_as_failures():
+    async def run():
+        breaker = CircuitBreaker(failure_threshold=1)
+        bot = VirtualSwitchBot(
+            MAC, transport=SimulatedTransport([SimulatedSwitchBot(MAC)]), circuit_breaker=breaker
+        )
+        with pytest.raises(SwitchBotError):
+            await bot.fetch_basic_device_info()
+        assert not breaker.is_open
+        assert breaker.consecutive_failures == 0
+
+    asyncio.run(run())
+
+
+def test_lost_connection_does_not_count_as_a_failure():
+    async def run():
+        transport = SimulatedTransport([SimulatedSwitchBot(MAC, response_latency_s=0.2)])
+        breaker = CircuitBreaker(failure_threshold=1)
+        bot = VirtualSwitchBot(MAC, transport=transport, circuit_breaker=breaker)
+        await bot.connect(prefetch=SwitchBotMetadata.NONE)
+
+        request = asyncio.ensure_future(bot.fetch_basic_device_info())
+        await asyncio.sleep(0.05)
+        transport.drop_link(MAC)
+        with pytest.raises(SwitchBotDisconnectedError):
+            await request
+
+        assert not breaker.is_open
+        assert breaker.consecutive_failures == 0
+
+    asyncio.run(run())
@@ -0,0 +1,96 @@
+'''
+Python-Switchbot-BLE: A Python library for interfacing with Switchbot devices over Bluetooth Low Energy (BLE)
+Copyright (C) 2023  Benjamin Carlson
+'''
+
+import asyncio
+
+import pytest
+
+from switchbot_api import SwitchBotScanSession
+from switchbot_api.simulation import SimulatedSwitchBot, SimulatedTransport
+
+MAC = "F6:9A:4E:9C:3F:3B"
+
+
+class _FlakyTransport(SimulatedTransport):
+    # The first scanner fails to start
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.scanners_created = 0
+
+    def create_scanner(self, detection_callback, **kwargs):
+        self.scanners_created += 1
+        scanner = super().create_scanner(detection_callback, **kwargs)
+        if self.scanners_created == 1:
+            async def fail():
+                raise OSError("adapter busy")
+
+            scanner.start = fail
+        return scanner
+
+
+def _transport() -> SimulatedTransport:
+    return SimulatedTransport([SimulatedSwitchBot(MAC)], advertise_interval_s=0.01)
+
+
+def test_failed_start_does_not_leak_a_consumer():
+    async def run():
+        transport = _FlakyTransport([SimulatedSwitchBot(MAC)], advertise_interval_s=0.01)
+        session = SwitchBotScanSession(linger_s=0, transport=transport)
+
+        with pytest.raises(OSError):
+            await session.acquire()
+        assert not session.is_scanning
+
+        async with session:
+            assert session.is_scanning
+        assert not session.is_scanning
+
+    asyncio.run(run())
+
+
+def test_scan_lingers_then_stops():
+    async def run():
+        session = SwitchBotScanSession(linger_s=0.05, transport=_transport())
+
+        async with session:
+            pass
+        assert session.is_scanning
+
+        # Acquired again within the linger time, the scan keeps running
+        async with session:
+            await asyncio.sleep(0.1)
+            assert session.is_scanning
+
+        await asyncio.sleep(0.1)
+        assert not session.is_scanning
+
+    asyncio.run(run())
+
+
+def test_close_stops_a_lingering_scan():
+    async def run():
+        session = SwitchBotScanSession(linger_s=10, transport=_transport())
+        async with session:
+            pass
+        await session.close()
+        assert not session.is_scanning
+
+    asyncio.run(run())
+
+
+def test_session_rescans_in_a_new_event_loop():
+    session = SwitchBotScanSession(linger_s=10, transport=_transport())
+
+    async def scan():
+        seen = []
+        unsubscribe = session.subscribe(seen.append)
+        async with session:
+            await asyncio.sleep(0.05)
+        unsubscribe()
+        return seen
+
+    # The first loop ends while the scan lingers
+    assert len(asyncio.run(scan())) > 0
+    assert len(asyncio.run(scan())) > 0
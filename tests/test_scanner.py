@@ -0,0 +1,51 @@
+'''
+Python-Switchbot-BLE: A Python library for interfacing with Switchbot devices over Bluetooth Low Energy (BLE)
+Copyright (C) 2023  Benjamin Carlson
+'''
+
+import asyncio
+
+from switchbot_api import MetricsRegistry, SwitchBotMetrics, SwitchBotScanner, SwitchBotScanSession
+from switchbot_api.bot_types import SwitchBotAction, SwitchBotMetadata
+from switchbot_api.simulation import SimulatedSwitchBot, SimulatedTransport
+
+MACS = ["F6:9A:4E:9C:3F:3B", "F6:9A:4E:9C:3F:3C"]
+
+
+def test_scanner_finds_and_drives_simulated_bots():
+    async def run():
+        transport = SimulatedTransport([SimulatedSwitchBot(mac) for mac in MACS], advertise_interval_s=0.01)
+        session = SwitchBotScanSession(linger_s=0, transport=transport)
+        metrics = SwitchBotMetrics(MetricsRegistry())
+
+        found = []
+        async for bot in SwitchBotScanner(bot_count=2, session=session, metrics=metrics):
+            # Bots found through the session connect through the same transport
+            assert bot.transport is transport
+            assert bot.metrics is metrics
+            await bot.connect(prefetch=SwitchBotMetadata.NONE)
+            await bot.set_bot_state(SwitchBotAction.ON)
+            await bot.disconnect()
+            found.append(bot.mac_address)
+
+        assert sorted(found) == MACS
+        assert all(transport.bots[mac].actions_executed == [SwitchBotAction.ON] for mac in MACS)
+        assert not session.is_scanning
+
+    asyncio.run(run())
+
+
+def test_scanner_yields_recent_candidates_without_rescanning():
+    async def run():
+        transport = SimulatedTransport([SimulatedSwitchBot(MACS[0])], advertise_interval_s=0.01)
+        session = SwitchBotScanSession(linger_s=0, transport=transport)
+
+        async with session:
+            await asyncio.sleep(0.05)
+        assert [adv.address for adv in session.candidates()] == MACS[:1]
+
+        bots = [bot async for bot in SwitchBotScanner(session=session)]
+        assert [bot.mac_address for bot in bots] == MACS[:1]
+        assert not session.is_scanning
+
+    asyncio.run(run())
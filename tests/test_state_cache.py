@@ -0,0 +1,69 @@
+'''
+Python-Switchbot-BLE: A Python library for interfacing with Switchbot devices over Bluetooth Low Energy (BLE)
+Copyright (C) 2023  Benjamin Carlson
+'''
+
+import asyncio
+
+from switchbot_api import SwitchBotScanSession, SwitchBotStateCache
+from switchbot_api.simulation import SimulatedDevice, SimulatedSwitchBot, SimulatedTransport
+
+MAC = "F6:9A:4E:9C:3F:3B"
+OTHER_MAC = "F6:9A:4E:9C:3F:3C"
+
+
+def _advertise(session: SwitchBotScanSession, bot: SimulatedSwitchBot, service_data: bytes = None):
+    advertisement = bot.advertisement()
+    if service_data is not None:
+        advertisement.service_data[SwitchBotScanSession.UNKNOWN_SERVICE_DATA_UUID] = service_data
+    session._on_detection(SimulatedDevice(bot.mac_address), advertisement)
+
+
+def test_cache_follows_advertised_state():
+    async def run():
+        bot = SimulatedSwitchBot(MAC, is_off=True)
+        session = SwitchBotScanSession(linger_s=0, transport=SimulatedTransport([bot], advertise_interval_s=0.01))
+
+        async with SwitchBotStateCache(session) as cache:
+            await asyncio.sleep(0.03)
+            assert cache.is_off(MAC) is True
+
+            bot.is_off = False
+            await asyncio.sleep(0.03)
+            assert cache.is_off(MAC) is False
+
+    asyncio.run(run())
+
+
+def test_undecodable_advertisements_are_skipped():
+    session = SwitchBotScanSession(transport=SimulatedTransport())
+    cache = SwitchBotStateCache(session)
+    unsubscribe = session.subscribe(cache._on_advertisement)
+    received = []
+    session.subscribe(received.append)
+
+    other_model = SimulatedSwitchBot(OTHER_MAC)
+    _advertise(session, other_model, service_data=bytes(6))
+    assert cache.get(OTHER_MAC) is None
+
+    bot = SimulatedSwitchBot(MAC, is_off=False)
+    _advertise(session, bot)
+    _advertise(session, bot, service_data=bytes(6))
+    assert cache.is_off(MAC) is False
+
+    # Later subscribers still received every advertisement
+    assert [adv.address for adv in received] == [OTHER_MAC, MAC, MAC]
+    unsubscribe()
+
+
+def test_failing_subscriber_does_not_stop_delivery():
+    session = SwitchBotScanSession(transport=SimulatedTransport())
+    received = []
+
+    def fail(advertisement):
+        raise RuntimeError("subscriber bug")
+
+    session.subscribe(fail)
+    session.subscribe(received.append)
+    _advertise(session, SimulatedSwitchBot(MAC))
+    assert [adv.address for adv in received] == [MAC]